@@ -4,17 +4,19 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_cors import CORS
 from dotenv import load_dotenv
+from app.session import RoutingSession
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 
 def create_app(test_config=None):
     """Create and configure the Flask application"""
     app = Flask(__name__, instance_relative_config=True)
+    from app.utils.db_pool import get_engine_options, configure_engine
     
     # Configure the app
     if test_config is None:
@@ -26,13 +28,58 @@ def create_app(test_config=None):
         if database_url and database_url.startswith("postgres://"):
             database_url = database_url.replace("postgres://", "postgresql://", 1)
         
+        # Optional read replicas for safe GET handlers, comma separated
+        replica_urls = [
+            url.strip().replace("postgres://", "postgresql://", 1)
+            for url in os.environ.get("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+        ]
+        
         # Load the instance config from environment variables
         app.config.from_mapping(
             SECRET_KEY=os.environ.get("SECRET_KEY", "dev"),
             SQLALCHEMY_DATABASE_URI=database_url,
             SQLALCHEMY_TRACK_MODIFICATIONS=False,
+            SQLALCHEMY_ENGINE_OPTIONS=get_engine_options(database_url),
+            DB_PGBOUNCER=os.environ.get("DB_PGBOUNCER", "false").lower() == "true",
+            DB_STATEMENT_TIMEOUT=int(os.environ.get("DB_STATEMENT_TIMEOUT", 0)) or None,
+            DATABASE_REPLICA_URLS=replica_urls,
+            DB_REPLICA_CHECK_INTERVAL=int(os.environ.get("DB_REPLICA_CHECK_INTERVAL", 5)),
+            DB_REPLICA_MAX_LAG=float(os.environ.get("DB_REPLICA_MAX_LAG", 10)),
+            DB_REPLICA_WRITE_WINDOW=float(os.environ.get("DB_REPLICA_WRITE_WINDOW", 10)),
             JWT_SECRET_KEY=os.environ.get("JWT_SECRET_KEY", "dev"),
             UPLOAD_FOLDER=os.environ.get("UPLOAD_FOLDER", "instance/uploads"),
+            MAX_CONTENT_LENGTH=int(os.environ.get("MAX_CONTENT_LENGTH", 0)) or None,
+            STREAMING_UPLOADS=os.environ.get("STREAMING_UPLOADS", "false").lower() == "true",
+            UPLOAD_CHUNK_SIZE=int(os.environ.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)),
+            UPLOAD_MAX_SIZE=int(os.environ.get("UPLOAD_MAX_SIZE", 10 * 1024 ** 3)),
+            UPLOAD_MAX_CHUNKS=int(os.environ.get("UPLOAD_MAX_CHUNKS", 10000)),
+            UPLOAD_SESSION_TTL=int(os.environ.get("UPLOAD_SESSION_TTL", 24 * 60 * 60)),
+            UPLOAD_SESSION_GC_INTERVAL=int(os.environ.get("UPLOAD_SESSION_GC_INTERVAL", 10 * 60)),
+            DOWNLOAD_OFFLOAD=os.environ.get("DOWNLOAD_OFFLOAD", ""),
+            DOWNLOAD_OFFLOAD_PREFIX=os.environ.get("DOWNLOAD_OFFLOAD_PREFIX", "/protected-uploads/"),
+            DOWNLOAD_URL_SECRET=os.environ.get("DOWNLOAD_URL_SECRET"),
+            DOWNLOAD_URL_TTL=int(os.environ.get("DOWNLOAD_URL_TTL", 300)),
+            STORAGE_COMPRESSION=os.environ.get("STORAGE_COMPRESSION", ""),
+            STORAGE_COMPRESSION_LEVEL=int(os.environ.get("STORAGE_COMPRESSION_LEVEL", 0)) or None,
+            STORAGE_COMPRESSION_TYPES=[t.strip() for t in os.environ.get("STORAGE_COMPRESSION_TYPES", "").split(",") if t.strip()],
+            BATCH_UPLOAD_WORKERS=int(os.environ.get("BATCH_UPLOAD_WORKERS", 4)),
+            BATCH_UPLOAD_MAX_FILES=int(os.environ.get("BATCH_UPLOAD_MAX_FILES", 500)),
+            CONTENT_INDEXING=os.environ.get("CONTENT_INDEXING", "true").lower() == "true",
+            CONTENT_INDEX_INTERVAL=int(os.environ.get("CONTENT_INDEX_INTERVAL", 60)),
+            CONTENT_INDEX_MAX_CHARS=int(os.environ.get("CONTENT_INDEX_MAX_CHARS", 200000)),
+            CONTENT_EXTRACTION_WORKERS=int(os.environ.get("CONTENT_EXTRACTION_WORKERS", 0)) or None,
+            COUNT_CACHE_TTL=int(os.environ.get("COUNT_CACHE_TTL", 60)),
+            COUNT_CACHE_SIZE=int(os.environ.get("COUNT_CACHE_SIZE", 256)),
+            COUNT_ESTIMATE_THRESHOLD=int(os.environ.get("COUNT_ESTIMATE_THRESHOLD", 10000)),
+            SEARCH_FUZZY_THRESHOLD=float(os.environ["SEARCH_FUZZY_THRESHOLD"]) if os.environ.get("SEARCH_FUZZY_THRESHOLD") else None,
+            AUTH_CACHE_TTL=int(os.environ.get("AUTH_CACHE_TTL", 30)),
+            AUTH_CACHE_SIZE=int(os.environ.get("AUTH_CACHE_SIZE", 1024)),
+            PERMISSION_CACHE_TTL=int(os.environ.get("PERMISSION_CACHE_TTL", 30)),
+            PERMISSION_CACHE_SIZE=int(os.environ.get("PERMISSION_CACHE_SIZE", 1024)),
+            PASSWORD_HASH_METHOD=os.environ.get("PASSWORD_HASH_METHOD", "pbkdf2"),
+            PASSWORD_HASH_WORKERS=int(os.environ.get("PASSWORD_HASH_WORKERS", 2)),
+            # Leave at least half of each worker's request threads for other requests
+            PASSWORD_HASH_QUEUE_SIZE=int(os.environ.get("PASSWORD_HASH_QUEUE_SIZE", max(int(os.environ.get("GUNICORN_THREADS", 8)) // 2, 1))),
         )
     else:
         # Load the test config if passed in
@@ -48,15 +95,36 @@ def create_app(test_config=None):
     # Initialize extensions with the app
     db.init_app(app)
     migrate.init_app(app, db)
+    with app.app_context():
+        configure_engine(db.engine, app.config)
+    
+    # Route safe GET handlers to read replicas when configured
+    from app.utils.replicas import init_replicas
+    init_replicas(app)
     
     # Enable CORS
     CORS(app, resources={r"/api/*": {"origins": "*"}})
     
     # Register blueprints
-    from app.routes import users, documents, folders
+    from app.routes import users, documents, folders, uploads, groups, metrics
     app.register_blueprint(users.bp)
     app.register_blueprint(documents.bp)
     app.register_blueprint(folders.bp)
+    app.register_blueprint(uploads.bp)
+    app.register_blueprint(groups.bp)
+    app.register_blueprint(metrics.bp)
+    
+    # Register CLI commands
+    from app.commands import storage_cli
+    app.cli.add_command(storage_cli)
+    
+    # Garbage-collect abandoned resumable uploads in the background
+    from app.utils.upload_sessions import start_session_gc
+    start_session_gc(app)
+    
+    # Extract text from uploaded files for search in the background
+    from app.utils.content_index import start_content_indexer
+    start_content_indexer(app)
     
     # A simple route to confirm the app is working
     @app.route("/api/health")
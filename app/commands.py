@@ -0,0 +1,120 @@
+import os
+import shutil
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app import db
+from app.models.blob import Blob
+from app.models.document import Document
+from app.utils.file_handler import get_blob_path, get_blob_sha256
+from app.utils.content_index import create_executor, index_documents
+
+storage_cli = AppGroup("storage", help="Manage uploaded files.")
+
+def _link_or_copy(src, dst):
+    """Make ``dst`` refer to the same bytes as ``src`` without removing it"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+@storage_cli.command("migrate-layout")
+@click.option("--batch-size", default=500, show_default=True, help="Documents updated per transaction.")
+@click.option("--start-id", default=0, show_default=True, help="Resume after this document id.")
+@click.option("--dry-run", is_flag=True, help="Report what would move without changing anything.")
+def migrate_layout(batch_size, start_id, dry_run):
+    """Move uploaded files from the flat folder into the sharded layout
+    
+    Each file is first linked at its new path, then the documents pointing
+    at it are updated and committed, and only then is the old path removed,
+    so downloads keep working while the migration runs. The command can be
+    stopped at any time and simply run again, or resumed with --start-id.
+    """
+    last_id = start_id
+    moved = 0
+    missing = 0
+    
+    while True:
+        documents = Document.query.filter(Document.id > last_id).order_by(Document.id).limit(batch_size).all()
+        if not documents:
+            break
+        
+        released = set()
+        for document in documents:
+            last_id = document.id
+            
+            old_path = document.file_path
+            if not os.path.isabs(old_path):
+                old_path = os.path.normpath(os.path.join(current_app.root_path, '..', old_path))
+            name = os.path.basename(old_path)
+            new_path = get_blob_path(name)
+            if old_path == new_path:
+                continue
+            
+            if not os.path.exists(new_path):
+                if not os.path.exists(old_path):
+                    click.echo(f"Missing file for document {document.id}: {old_path}")
+                    missing += 1
+                    continue
+                if not dry_run:
+                    _link_or_copy(old_path, new_path)
+            
+            moved += 1
+            if dry_run:
+                continue
+            
+            # Keep updated_at untouched, the content did not change
+            Document.query.filter_by(id=document.id).update(
+                {"file_path": new_path, "updated_at": Document.updated_at},
+                synchronize_session=False
+            )
+            Blob.query.filter_by(sha256=get_blob_sha256(name)).update({"file_path": new_path}, synchronize_session=False)
+            released.add(old_path)
+        
+        if dry_run:
+            continue
+        
+        db.session.commit()
+        
+        # Old paths can go once no document refers to them anymore
+        still_used = {
+            path for (path,) in db.session.query(Document.file_path).filter(Document.file_path.in_(released))
+        }
+        for old_path in released - still_used:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+        
+        click.echo(f"Migrated up to document {last_id} ({moved} moved, {missing} missing)")
+    
+    click.echo(f"Done: {moved} {'would move' if dry_run else 'moved'}, {missing} missing")
+
+@storage_cli.command("index-content")
+@click.option("--reindex", is_flag=True, help="Extract every document again, not just new or changed ones.")
+@click.option("--workers", default=0, help="Extraction processes (defaults to CONTENT_EXTRACTION_WORKERS or the CPU count).")
+@click.option("--batch-size", default=100, show_default=True, help="Documents extracted per transaction.")
+def index_content(reindex, workers, batch_size):
+    """Extract searchable text from uploaded files
+    
+    Only documents without extracted text, or whose file changed since it
+    was extracted, are processed unless --reindex is given.
+    """
+    executor = None
+    
+    def get_executor():
+        nonlocal executor
+        executor = create_executor(workers or None)
+        return executor
+    
+    try:
+        counts = index_documents(get_executor, batch_size=batch_size, reindex=reindex)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    if counts is None:
+        click.echo("Another process is indexing document contents, try again later")
+        return
+    click.echo(f"Done: {', '.join(f'{count} {status}' for status, count in sorted(counts.items())) or 'nothing to index'}")
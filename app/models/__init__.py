@@ -1,3 +1,7 @@
 from app.models.user import User
 from app.models.document import Document
-from app.models.folder import Folder 
\ No newline at end of file
+from app.models.folder import Folder
+from app.models.group import Group, GroupMembership
+from app.models.blob import Blob
+from app.models.upload_session import UploadSession
+from app.models.document_content import DocumentContent
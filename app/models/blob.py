@@ -0,0 +1,20 @@
+from datetime import datetime
+from app import db
+
+class Blob(db.Model):
+    """Content-addressed file stored once on disk and shared by documents"""
+    
+    __tablename__ = "blobs"
+    
+    sha256 = db.Column(db.String(64), primary_key=True)  # Hex digest of the file content
+    file_path = db.Column(db.String(255), nullable=False)  # Absolute path of the stored bytes
+    size = db.Column(db.BigInteger, nullable=False)  # Size in bytes
+    stored_size = db.Column(db.BigInteger, nullable=True)  # Size on disk after compression
+    encoding = db.Column(db.String(20), nullable=True)  # Storage codec ('gzip', 'zstd') or None when stored raw
+    content_type = db.Column(db.String(100), nullable=True)  # MIME type of the first upload
+    compress_time = db.Column(db.Float, nullable=True)  # CPU seconds spent compressing
+    ref_count = db.Column(db.Integer, nullable=False, default=0)  # Number of documents pointing at the blob
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<Blob {self.sha256} refs={self.ref_count}>"
@@ -1,11 +1,22 @@
 from datetime import datetime
 from app import db
-from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.dialects.postgresql import ARRAY, TSVECTOR
 
 class Document(db.Model):
     """Document model for file storage and management"""
     
     __tablename__ = "documents"
+    __table_args__ = (
+        db.Index("ix_documents_search_vector", "search_vector", postgresql_using="gin"),
+        db.Index("ix_documents_title_trgm", "title", postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}),
+        db.Index("ix_documents_description_trgm", "description", postgresql_using="gin", postgresql_ops={"description": "gin_trgm_ops"}),
+        db.Index("ix_documents_tags", "tags", postgresql_using="gin"),
+        db.Index("ix_documents_folder_id_id", "folder_id", "id"),
+        db.Index("ix_documents_created_by", "created_by"),
+        db.Index("ix_documents_created_at_id", "created_at", "id"),
+        db.Index("ix_documents_updated_at_id", "updated_at", "id"),
+        db.Index("ix_documents_content_pending", "id", postgresql_where=db.text("content_pending")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -13,12 +24,14 @@ class Document(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     file_url = db.Column(db.String(255), nullable=False)
     file_type = db.Column(db.String(100), nullable=False)
-    file_size = db.Column(db.Integer, nullable=False)  # Size in bytes
+    file_size = db.Column(db.BigInteger, nullable=False)  # Size in bytes
     tags = db.Column(ARRAY(db.String(50)), nullable=True, default=[])  # Make sure nullable is True and store tags as an array
     folder_id = db.Column(db.Integer, db.ForeignKey("folders.id"), nullable=True)  # The folder this document belongs to
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    search_vector = db.deferred(db.Column(TSVECTOR, nullable=True))  # Maintained by the documents_search_vector trigger
+    content_pending = db.Column(db.Boolean, default=True, server_default=db.true(), nullable=False)  # File text not extracted yet
     
     # Relationships
     creator = db.relationship("User", back_populates="documents")
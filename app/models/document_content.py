@@ -0,0 +1,26 @@
+from datetime import datetime
+from app import db
+from sqlalchemy.dialects.postgresql import TSVECTOR
+
+class DocumentContent(db.Model):
+    """Text extracted from a document's file, indexed for search"""
+    
+    __tablename__ = "document_contents"
+    __table_args__ = (
+        db.Index("ix_document_contents_search_vector", "search_vector", postgresql_using="gin"),
+    )
+    
+    document_id = db.Column(db.Integer, db.ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)  # Blob the text was extracted from
+    status = db.Column(db.String(20), nullable=False)  # 'indexed', 'empty', 'unsupported' or 'failed'
+    body = db.deferred(db.Column(db.Text, nullable=True))  # Extracted text, compressed by Postgres TOAST
+    search_vector = db.deferred(db.Column(TSVECTOR, nullable=True))
+    error = db.Column(db.String(500), nullable=True)  # Why extraction failed
+    extract_time = db.Column(db.Float, nullable=True)  # Seconds spent extracting
+    extracted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    document = db.relationship("Document", backref=db.backref("content", uselist=False, passive_deletes=True))
+    
+    def __repr__(self):
+        return f"<DocumentContent {self.document_id} {self.status}>"
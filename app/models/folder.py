@@ -5,6 +5,9 @@ class Folder(db.Model):
     """Folder model for organizing documents"""
     
     __tablename__ = "folders"
+    __table_args__ = (
+        db.Index("ix_folders_created_by", "created_by"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -39,6 +42,10 @@ class FolderPermission(db.Model):
     """Permissions for folder access"""
     
     __tablename__ = "folder_permissions"
+    __table_args__ = (
+        db.UniqueConstraint("folder_id", "user_id", name="uq_folder_permissions_folder_id_user_id"),
+        db.Index("ix_folder_permissions_user_id_folder_id", "user_id", "folder_id"),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     folder_id = db.Column(db.Integer, db.ForeignKey("folders.id"), nullable=False)
@@ -51,4 +58,46 @@ class FolderPermission(db.Model):
     user = db.relationship("User", backref=db.backref("folder_permissions", cascade="all, delete-orphan"))
     
     def __repr__(self):
-        return f"<FolderPermission folder_id={self.folder_id} user_id={self.user_id} type={self.permission_type}>" 
\ No newline at end of file
+        return f"<FolderPermission folder_id={self.folder_id} user_id={self.user_id} type={self.permission_type}>" 
+
+class FolderGroupPermission(db.Model):
+    """Permissions for folder access granted to every member of a group"""
+    
+    __tablename__ = "folder_group_permissions"
+    __table_args__ = (
+        db.UniqueConstraint("folder_id", "group_id", name="uq_folder_group_permissions_folder_id_group_id"),
+        db.Index("ix_folder_group_permissions_group_id", "group_id"),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    folder_id = db.Column(db.Integer, db.ForeignKey("folders.id", ondelete="CASCADE"), nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
+    permission_type = db.Column(db.String(50), nullable=False, default="read")  # 'read', 'write', 'admin'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    folder = db.relationship("Folder", backref=db.backref("group_permissions", cascade="all, delete-orphan"))
+    group = db.relationship("Group", back_populates="folder_permissions")
+    
+    def __repr__(self):
+        return f"<FolderGroupPermission folder_id={self.folder_id} group_id={self.group_id} type={self.permission_type}>"
+
+
+class EffectiveFolderAccess(db.Model):
+    """Strongest access each user holds on each folder, from ownership, user and group grants
+    
+    Maintained incrementally by app.utils.permissions whenever its sources
+    change, so access checks and listings need one indexed lookup or join.
+    """
+    
+    __tablename__ = "effective_folder_access"
+    __table_args__ = (
+        db.Index("ix_effective_folder_access_folder_id", "folder_id", "user_id", postgresql_include=["level"]),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    folder_id = db.Column(db.Integer, db.ForeignKey("folders.id", ondelete="CASCADE"), primary_key=True)
+    level = db.Column(db.String(20), nullable=False)  # 'read', 'write', 'admin' or 'owner'
+    
+    def __repr__(self):
+        return f"<EffectiveFolderAccess user_id={self.user_id} folder_id={self.folder_id} level={self.level}>"
@@ -0,0 +1,45 @@
+from datetime import datetime
+from app import db
+
+class Group(db.Model):
+    """Group of users that folders can be shared with at once"""
+    
+    __tablename__ = "groups"
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), unique=True, nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
+    
+    # Relationships
+    creator = db.relationship("User")
+    memberships = db.relationship("GroupMembership", back_populates="group", cascade="all, delete-orphan")
+    folder_permissions = db.relationship("FolderGroupPermission", back_populates="group", cascade="all, delete-orphan")
+    
+    def __repr__(self):
+        return f"<Group {self.name}>"
+
+
+class GroupMembership(db.Model):
+    """Membership of a user in a group"""
+    
+    __tablename__ = "group_memberships"
+    __table_args__ = (
+        db.UniqueConstraint("group_id", "user_id", name="uq_group_memberships_group_id_user_id"),
+        db.Index("ix_group_memberships_user_id", "user_id"),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    group_id = db.Column(db.Integer, db.ForeignKey("groups.id", ondelete="CASCADE"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    role = db.Column(db.String(20), nullable=False, default="member")  # 'member' or 'manager'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    group = db.relationship("Group", back_populates="memberships")
+    user = db.relationship("User", backref=db.backref("group_memberships", cascade="all, delete-orphan"))
+    
+    def __repr__(self):
+        return f"<GroupMembership group_id={self.group_id} user_id={self.user_id} role={self.role}>"
@@ -0,0 +1,33 @@
+from datetime import datetime
+from app import db
+from sqlalchemy.dialects.postgresql import ARRAY
+
+class UploadSession(db.Model):
+    """Resumable upload whose chunks are stored on disk until finalized"""
+    
+    __tablename__ = "upload_sessions"
+    
+    id = db.Column(db.String(32), primary_key=True)  # Random hex identifier used in URLs
+    filename = db.Column(db.String(255), nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    tags = db.Column(ARRAY(db.String(50)), nullable=True, default=[])
+    folder_id = db.Column(db.Integer, db.ForeignKey("folders.id"), nullable=True)  # Folder the document goes into
+    total_size = db.Column(db.BigInteger, nullable=False)  # Size of the assembled file in bytes
+    chunk_size = db.Column(db.Integer, nullable=False)  # Size of every chunk except the last one
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    
+    @property
+    def total_chunks(self):
+        """Number of chunks needed to transfer the whole file"""
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def expected_chunk_size(self, index):
+        """Return the exact size chunk ``index`` must have"""
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+    
+    def __repr__(self):
+        return f"<UploadSession {self.id} {self.filename}>"
@@ -1,11 +1,14 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
 
 class User(db.Model):
     """User model for authentication and user management"""
     
     __tablename__ = "users"
+    __table_args__ = (
+        db.Index("ix_users_username_trgm", "username", postgresql_using="gin", postgresql_ops={"username": "gin_trgm_ops"}),
+        db.Index("ix_users_email_trgm", "email", postgresql_using="gin", postgresql_ops={"email": "gin_trgm_ops"}),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
@@ -14,6 +17,7 @@ class User(db.Model):
     first_name = db.Column(db.String(50), nullable=True)
     last_name = db.Column(db.String(50), nullable=True)
     role = db.Column(db.String(20), default="user", nullable=False)
+    token_version = db.Column(db.Integer, default=0, server_default="0", nullable=False)  # Bumped to revoke issued tokens
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -28,12 +32,28 @@ class User(db.Model):
     
     @password.setter
     def password(self, password):
-        """Set password to a hashed password"""
-        self.password_hash = generate_password_hash(password)
+        """Set password to a hashed password, revoking tokens issued for the old one"""
+        from app.utils.passwords import hash_password
+        self.password_hash = hash_password(password)
+        self.token_version = (self.token_version or 0) + 1
     
     def verify_password(self, password):
         """Check if password matches the hashed password"""
-        return check_password_hash(self.password_hash, password)
+        from app.utils.passwords import verify_password
+        return verify_password(self.password_hash, password)
+    
+    def upgrade_password_hash(self, password):
+        """Rehash a verified password if it was hashed with outdated parameters
+        
+        The hash is replaced directly rather than through the password
+        setter, so tokens issued for the same password stay valid.
+        Returns True if the hash changed.
+        """
+        from app.utils.passwords import hash_password, needs_rehash
+        if not needs_rehash(self.password_hash):
+            return False
+        self.password_hash = hash_password(password)
+        return True
     
     def to_dict(self):
         """Return a dict representation of the user"""
@@ -1,22 +1,104 @@
 import os
-from flask import Blueprint, request, jsonify, current_app, send_file
-from marshmallow import ValidationError
+import json
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import func, insert
+from marshmallow import ValidationError, EXCLUDE
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from app import db
 from app.models.document import Document
+from app.models.blob import Blob
 from app.schemas import DocumentSchema, DocumentUpdateSchema
 from app.utils.auth import token_required, admin_required
-from app.utils.file_handler import save_file, delete_file, get_file_type
+from app.utils.file_handler import (
+    save_file, write_file, get_file_type, get_blob_path, get_flat_path,
+    resolve_blob_path, acquire_blobs, get_blob_info
+)
+from app.utils.upload_stream import parse_streamed_upload
+from app.utils.downloads import send_document_file, get_document_etag, make_etag
+from app.utils.signed_urls import generate_download_url, verify_download_url
+from app.utils.pagination import wants_cursor, keyset_paginate, InvalidCursor
+from app.utils.counts import count_rows
+from app.utils.serializers import compile_schema, json_response, parse_fields, load_only_options
+from app.utils.permissions import can_manage_document, filter_accessible_documents
+from app.utils.replicas import replica_reads
+from app.utils.search import (
+    SEARCH_MODES, get_tsquery, match_documents, rank_documents, get_highlights, substring_filter, fuzzy_filter
+)
 
 bp = Blueprint("documents", __name__, url_prefix="/api/documents")
 
 # Schemas
 document_schema = DocumentSchema()
-documents_schema = DocumentSchema(many=True)
 document_update_schema = DocumentUpdateSchema()
+documents_serializer = compile_schema(DocumentSchema)
+
+TAG_MODES = ("all", "any")
+
+# Document listings cover every document, or only those the user can read
+DOCUMENT_SCOPES = ("all", "accessible")
+
+# Non-null columns cursor pagination can seek on
+CURSOR_SORT_COLUMNS = ("created_at", "updated_at", "title", "file_size", "id")
+
+def parse_tags(args):
+    """Collect tags from repeated and/or comma-separated ``tags`` parameters"""
+    tags = []
+    for value in args.getlist("tags"):
+        tags.extend(tag.strip() for tag in value.split(",") if tag.strip())
+    return list(dict.fromkeys(tags))
+
+def filter_documents(query, args, user):
+    """Apply the scope, search and tag filters shared by the document listings
+    
+    ``scope=accessible`` keeps documents the user created or can read
+    through their folder. Returns ``(query, similarity)`` where similarity is the ranking
+    expression of a fuzzy search, or None. Raises ValueError for invalid
+    parameters.
+    """
+    scope = args.get("scope", "all")
+    if scope not in DOCUMENT_SCOPES:
+        raise ValueError(f"scope must be one of: {', '.join(DOCUMENT_SCOPES)}")
+    if scope == "accessible":
+        query = filter_accessible_documents(query, user)
+    
+    search = args.get("search")
+    search_mode = args.get("searchMode", "fulltext")
+    if search_mode not in SEARCH_MODES:
+        raise ValueError(f"searchMode must be one of: {', '.join(SEARCH_MODES)}")
+    
+    similarity = None
+    if search and search_mode == "substring":
+        query = query.filter(substring_filter([Document.title, Document.description], search))
+    elif search and search_mode == "fuzzy":
+        condition, similarity = fuzzy_filter([Document.title], search)
+        query = query.filter(condition)
+    elif search:
+        tsquery = get_tsquery(search)
+        if tsquery is None:
+            query = query.filter(db.false())
+        else:
+            query = match_documents(query, tsquery)
+    
+    # Tag filters use the GIN index on tags through @> (all) and && (any)
+    tags = parse_tags(args)
+    tags_mode = args.get("tagsMode", "all")
+    if tags_mode not in TAG_MODES:
+        raise ValueError(f"tagsMode must be one of: {', '.join(TAG_MODES)}")
+    if tags and tags_mode == "all":
+        query = query.filter(Document.tags.contains(tags))
+    elif tags:
+        query = query.filter(Document.tags.overlap(tags))
+    
+    return query, similarity
 
 @bp.route("", methods=["GET"])
 @token_required
+@replica_reads
 def get_documents(current_user):
     """Get all documents with pagination and filtering"""
     # Parse pagination parameters
@@ -25,36 +107,108 @@ def get_documents(current_user):
     sort_by = request.args.get("sortBy", "created_at")
     sort_order = request.args.get("sortOrder", "desc")
     
-    # Build query
-    query = Document.query
+    # Build query with the requested filters and fields
+    try:
+        query, similarity = filter_documents(Document.query, request.args, current_user)
+        fieldset = parse_fields(request.args, DocumentSchema)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    serializer = compile_schema(DocumentSchema, only=fieldset)
+    page_options = load_only_options(Document, fieldset)
     
-    # Apply filters if provided
-    if request.args.get("search"):
-        search_term = f"%{request.args.get('search')}%"
-        query = query.filter(Document.title.ilike(search_term) | Document.description.ilike(search_term))
+    # Cursor pagination seeks past the sort value and id of the last row
+    if wants_cursor(request.args):
+        if similarity is not None and "sortBy" not in request.args:
+            keys = [("similarity", similarity), ("id", Document.id)]
+            descending = True
+        elif sort_by in CURSOR_SORT_COLUMNS:
+            keys = [(sort_by, getattr(Document, sort_by)), ("id", Document.id)] if sort_by != "id" else [("id", Document.id)]
+            descending = sort_order == "desc"
+        else:
+            return jsonify({
+                "message": f"sortBy must be one of {', '.join(CURSOR_SORT_COLUMNS)} with cursor pagination",
+                "status": 400
+            }), 400
+        
+        try:
+            documents, next_cursor, prev_cursor = keyset_paginate(
+                query.options(*page_options), keys, descending, max(per_page, 1), request.args.get("cursor")
+            )
+        except InvalidCursor as e:
+            return jsonify({
+                "message": str(e),
+                "status": 400
+            }), 400
+        
+        return json_response({
+            "message": "Documents retrieved successfully",
+            "status": 200,
+            "items": serializer.dump_many(documents),
+            "pageSize": per_page,
+            "nextCursor": next_cursor,
+            "prevCursor": prev_cursor
+        })
     
-    # Apply sorting
-    if sort_order == "desc":
+    # Apply sorting, closest fuzzy matches first unless asked otherwise
+    if similarity is not None and "sortBy" not in request.args:
+        query = query.order_by(similarity.desc(), Document.id.desc())
+    elif sort_order == "desc":
         query = query.order_by(getattr(Document, sort_by).desc())
     else:
         query = query.order_by(getattr(Document, sort_by))
     
-    # Get paginated documents
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Get paginated documents, counting them as cheaply as allowed
+    pagination = query.options(*page_options).paginate(page=page, per_page=per_page, error_out=False, count=False)
+    pagination.total, total_exact = count_rows(query, exact=request.args.get("exact") == "true")
     documents = pagination.items
     
-    return jsonify({
+    return json_response({
         "message": "Documents retrieved successfully",
         "status": 200,
-        "items": documents_schema.dump(documents),
+        "items": serializer.dump_many(documents),
         "total": pagination.total,
+        "totalExact": total_exact,
         "page": page,
         "pageSize": per_page,
         "totalPages": pagination.pages
+    })
+
+@bp.route("/facets", methods=["GET"])
+@token_required
+@replica_reads
+def get_document_facets(current_user):
+    """Get per-tag document counts for the current filters"""
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    
+    # Count every tag of the matching documents in a single aggregate
+    tag = func.unnest(Document.tags).table_valued("tag").render_derived()
+    try:
+        query, _ = filter_documents(Document.query.join(tag, db.true()), request.args, current_user)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    
+    count = func.count().label("count")
+    rows = query.with_entities(tag.c.tag, count).group_by(tag.c.tag).order_by(
+        count.desc(), tag.c.tag
+    ).limit(limit).all()
+    
+    return jsonify({
+        "message": "Facets retrieved successfully",
+        "status": 200,
+        "data": {
+            "tags": [{"tag": name, "count": n} for name, n in rows]
+        }
     }), 200
 
 @bp.route("/<int:document_id>", methods=["GET"])
 @token_required
+@replica_reads
 def get_document(current_user, document_id):
     """Get a document by ID"""
     document = Document.query.get(document_id)
@@ -74,15 +228,23 @@ def get_document(current_user, document_id):
 @token_required
 def create_document(current_user):
     """Create a new document"""
+    upload = None
     try:
+        # Either stream the body straight to disk or let Werkzeug parse it
+        if current_app.config.get("STREAMING_UPLOADS"):
+            form, upload = parse_streamed_upload("file")
+            file = upload
+        else:
+            form = request.form
+            file = request.files.get("file")
+        
         # Check if file is present in the request
-        if "file" not in request.files:
+        if file is None:
             return jsonify({
                 "message": "No file part in the request",
                 "status": 400
             }), 400
             
-        file = request.files["file"]
         if file.filename == "":
             return jsonify({
                 "message": "No file selected",
@@ -90,38 +252,38 @@ def create_document(current_user):
             }), 400
             
         # Get form data
-        title = request.form.get("title")
-        description = request.form.get("description", "")
+        title = form.get("title")
+        description = form.get("description", "")
         
         # Extract tags from form data
         tags = []
-        print("Form data:", list(request.form.items()))
+        print("Form data:", list(form.items()))
         
         # Look for both formats: tags[] and tags[0], tags[1], etc.
-        if "tags[]" in request.form:
-            tags = request.form.getlist("tags[]")
+        if "tags[]" in form:
+            tags = form.getlist("tags[]")
             print("Found tags[] format:", tags)
         else:
             # Check for indexed tags (tags[0], tags[1], etc.)
-            tag_keys = [k for k in request.form.keys() if k.startswith('tags[') and k.endswith(']')]
+            tag_keys = [k for k in form.keys() if k.startswith('tags[') and k.endswith(']')]
             if tag_keys:
                 # Sort by index to preserve order
                 tag_keys.sort(key=lambda k: int(k.replace('tags[', '').replace(']', '')))
-                tags = [request.form[k] for k in tag_keys]
+                tags = [form[k] for k in tag_keys]
                 print("Found indexed tags format:", tags)
                 
         # Also check for tags as a JSON array
-        if not tags and request.form.get("tags"):
+        if not tags and form.get("tags"):
             try:
                 import json
-                tags = json.loads(request.form.get("tags"))
+                tags = json.loads(form.get("tags"))
                 print("Found JSON tags format:", tags)
             except:
                 pass
                 
         print("Final tags to save:", tags)
         
-        folder_id = request.form.get("folder_id")
+        folder_id = form.get("folder_id")
         
         # Validate required fields
         if not title:
@@ -131,7 +293,10 @@ def create_document(current_user):
             }), 400
             
         # Save the file and get the file info
-        filename, file_path, file_url = save_file(file)
+        if upload is not None:
+            filename, file_path, file_url, file_size = upload.save()
+        else:
+            filename, file_path, file_url, file_size = save_file(file)
         if not filename:
             return jsonify({
                 "message": "Invalid file or file type not allowed",
@@ -145,7 +310,7 @@ def create_document(current_user):
             file_path=file_path,
             file_url=file_url,
             file_type=get_file_type(file.filename),
-            file_size=os.path.getsize(file_path),
+            file_size=file_size,
             tags=tags,  # Store tags directly in the document
             folder_id=folder_id if folder_id else None,
             created_by=current_user.id
@@ -163,6 +328,129 @@ def create_document(current_user):
             "document": document_schema.dump(document)
         }), 201
         
+    except RequestEntityTooLarge:
+        return jsonify({
+            "message": "File exceeds the maximum upload size",
+            "status": 413
+        }), 413
+    except Exception as e:
+        db.session.rollback()
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+    finally:
+        # Remove the streamed file if it was never saved
+        if upload is not None:
+            upload.discard()
+
+@bp.route("/batch", methods=["POST"])
+@token_required
+def create_documents_batch(current_user):
+    """Create many documents from one multipart request
+    
+    Files are sent as repeated ``files`` parts. An optional ``metadata``
+    field holds a JSON array with a ``title``, ``description`` and ``tags``
+    object per file, in the same order; the title defaults to the file name.
+    """
+    futures = []
+    try:
+        files = request.files.getlist("files")
+        if not files:
+            return jsonify({
+                "message": "No files in the request",
+                "status": 400
+            }), 400
+        
+        max_files = current_app.config.get("BATCH_UPLOAD_MAX_FILES", 500)
+        if len(files) > max_files:
+            return jsonify({
+                "message": f"At most {max_files} files can be uploaded at once",
+                "status": 400
+            }), 400
+        
+        try:
+            metadata = json.loads(request.form.get("metadata") or "[]")
+        except ValueError:
+            metadata = None
+        if not isinstance(metadata, list) or not all(isinstance(item, dict) for item in metadata):
+            return jsonify({
+                "message": "Metadata must be a JSON array of objects",
+                "status": 400
+            }), 400
+        
+        folder_id = request.form.get("folder_id") or None
+        
+        # Write the files with bounded parallelism; threads need their own app context
+        app = current_app._get_current_object()
+        
+        def write(file):
+            with app.app_context():
+                return write_file(file)
+        
+        workers = current_app.config.get("BATCH_UPLOAD_WORKERS", 4)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(write, file) for file in files]
+        
+        results = []
+        rows = []
+        writers = []
+        for index, (file, future) in enumerate(zip(files, futures)):
+            item = metadata[index] if index < len(metadata) else {}
+            try:
+                writer = future.result()
+            except Exception as e:
+                results.append({"index": index, "filename": file.filename, "status": 500, "message": f"Error: {str(e)}"})
+                continue
+            if writer is None:
+                results.append({"index": index, "filename": file.filename, "status": 400, "message": "Invalid file or file type not allowed"})
+                continue
+            try:
+                item = document_update_schema.load({k: v for k, v in item.items() if v not in (None, "")}, unknown=EXCLUDE)
+            except ValidationError as e:
+                results.append({"index": index, "filename": file.filename, "status": 400, "message": "Validation error", "errors": e.messages})
+                continue
+            
+            writers.append((file, item, writer))
+            results.append({"index": index, "filename": file.filename, "status": 201})
+        
+        # Reference the blobs and insert every document in one transaction
+        if writers:
+            acquire_blobs([writer for _, _, writer in writers])
+            for file, item, writer in writers:
+                filename, file_path, file_url, file_size = get_blob_info(writer)
+                rows.append({
+                    "title": item.get("title", file.filename[:255]),
+                    "description": item.get("description", ""),
+                    "file_path": file_path,
+                    "file_url": file_url,
+                    "file_type": get_file_type(file.filename),
+                    "file_size": file_size,
+                    "tags": item.get("tags", []),
+                    "folder_id": folder_id,
+                    "created_by": current_user.id
+                })
+            documents = db.session.scalars(insert(Document).returning(Document, sort_by_parameter_order=True), rows).all()
+            db.session.commit()
+            
+            created = iter(documents_serializer.dump_many(documents))
+            for result in results:
+                if result["status"] == 201:
+                    result["document"] = next(created)
+        
+        return jsonify({
+            "message": f"{len(rows)} of {len(files)} documents created",
+            "status": 201 if rows else 400,
+            "results": results
+        }), 201 if rows else 400
+        
+    except RequestEntityTooLarge:
+        return jsonify({
+            "message": "Upload exceeds the maximum request size",
+            "status": 413
+        }), 413
     except Exception as e:
         db.session.rollback()
         import traceback
@@ -171,6 +459,11 @@ def create_document(current_user):
             "message": f"Error: {str(e)}",
             "status": 500
         }), 500
+    finally:
+        # Remove written files that never made it into the blob store
+        for future in futures:
+            if future.exception() is None and future.result() is not None:
+                future.result().abort()
 
 @bp.route("/<int:document_id>", methods=["PUT"])
 @token_required
@@ -184,7 +477,7 @@ def update_document(current_user, document_id):
         }), 404
         
     # Check if the user owns the document or is an admin
-    if current_user.role != "admin" and document.created_by != current_user.id:
+    if not can_manage_document(current_user, document):
         return jsonify({
             "message": "Not authorized to update this document",
             "status": 403
@@ -242,18 +535,14 @@ def delete_document(current_user, document_id):
         }), 404
         
     # Check if the user owns the document or is an admin
-    if current_user.role != "admin" and document.created_by != current_user.id:
+    if not can_manage_document(current_user, document):
         return jsonify({
             "message": "Not authorized to delete this document",
             "status": 403
         }), 403
         
     try:
-        # Delete the file from disk
-        file_name = os.path.basename(document.file_path)
-        delete_file(file_name)
-        
-        # Delete document from database
+        # Delete document from database; its file is released on flush
         db.session.delete(document)
         db.session.commit()
         
@@ -270,17 +559,99 @@ def delete_document(current_user, document_id):
             "status": 500
         }), 500
 
-@bp.route("/<int:document_id>/download", methods=["GET"])
+# CORS headers for downloads
+download_headers = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, HEAD, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, Range, If-None-Match, If-Modified-Since, If-Range',
+    'Access-Control-Expose-Headers': 'Content-Disposition, Content-Length, Content-Range, Accept-Ranges, ETag, Last-Modified'
+}
+
+@bp.route("/<int:document_id>/download-url", methods=["POST"])
+@token_required
+def create_download_url(current_user, document_id):
+    """Create a short-lived signed URL for downloading a document"""
+    document = Document.query.get(document_id)
+    if not document:
+        return jsonify({
+            "message": "Document not found",
+            "status": 404
+        }), 404
+    
+    # Signed URLs can only point at files inside the upload folder
+    file_name = os.path.basename(document.file_path or "")
+    if not file_name or os.path.abspath(document.file_path) not in (get_blob_path(file_name), get_flat_path(file_name)):
+        return jsonify({
+            "message": "Document file cannot be shared with a signed URL",
+            "status": 400
+        }), 400
+    
+    data = request.get_json(silent=True) or {}
+    download_name = data.get("filename") or secure_filename(document.title)
+    # The name ends up in the Content-Disposition header of the download
+    if not isinstance(download_name, str) or any(unicodedata.category(char) == "Cc" for char in download_name):
+        return jsonify({
+            "message": "filename must be a string without control characters",
+            "status": 400
+        }), 400
+    expires_in = data.get("expiresIn")
+    if not isinstance(expires_in, int) or expires_in <= 0:
+        expires_in = None
+    url, expires_at = generate_download_url(document, download_name, expires_in)
+    
+    return jsonify({
+        "message": "Download URL created successfully",
+        "status": 201,
+        "data": {
+            "url": url,
+            "expiresAt": expires_at
+        }
+    }), 201
+
+@bp.route("/<int:document_id>/download", methods=["GET", "HEAD"])
+def download_document(document_id):
+    """Download a document file using a signed URL or an authentication token"""
+    if "sig" in request.args:
+        return download_signed_document(document_id)
+    return download_authenticated_document(document_id)
+
+def download_signed_document(document_id):
+    """Serve a download from a signed URL without touching the database"""
+    params = verify_download_url(document_id, request.args)
+    if not params:
+        return jsonify({
+            "message": "Invalid or expired download link",
+            "status": 403
+        }), 403, download_headers
+    
+    abs_file_path = resolve_blob_path(params["v"])
+    if not os.path.exists(abs_file_path):
+        return jsonify({
+            "message": "File not found on server",
+            "status": 404
+        }), 404, download_headers
+    
+    # The URL is the credential, so shared caches may keep it until it expires
+    headers = dict(download_headers)
+    headers["Cache-Control"] = f"public, max-age={max(0, params['exp'] - int(time.time()))}"
+    
+    return send_document_file(
+        abs_file_path,
+        mimetype=params["t"],
+        download_name=params["n"],
+        etag=make_etag(params["v"], params["s"], params["m"]),
+        last_modified=datetime.fromtimestamp(params["m"]),
+        size=params["s"],
+        headers=headers
+    )
+
 @token_required
-def download_document(current_user, document_id):
+@replica_reads
+def download_authenticated_document(current_user, document_id):
     """Download a document file"""
     try:
         # Add CORS headers for the download
-        response_headers = {
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization'
-        }
+        response_headers = download_headers
         
         document = Document.query.get(document_id)
         if not document:
@@ -313,30 +684,18 @@ def download_document(current_user, document_id):
         print(f"Original file path: {document.file_path}")
         print(f"Resolved absolute path: {abs_file_path}")
         
+        # Files being moved to the sharded layout may briefly live elsewhere
+        if not os.path.exists(abs_file_path):
+            abs_file_path = resolve_blob_path(os.path.basename(abs_file_path))
+        
         # Check if file exists at path
         if not os.path.exists(abs_file_path):
             print(f"File not found on disk: {abs_file_path}")
-            print(f"Current working directory: {os.getcwd()}")
-            
-            # Try to list uploads directory
-            upload_dir = os.path.dirname(abs_file_path)
-            try:
-                print(f"Listing contents of {upload_dir}:")
-                for file in os.listdir(upload_dir):
-                    print(f"  - {file}")
-            except Exception as list_err:
-                print(f"Error listing directory: {str(list_err)}")
-                
             return jsonify({
                 "message": f"File not found on server: {abs_file_path}",
                 "status": 404
             }), 404, response_headers
             
-        print(f"Attempting to send file: {abs_file_path}")
-        print(f"File exists: {os.path.exists(abs_file_path)}")
-        print(f"File size: {os.path.getsize(abs_file_path)}")
-        print(f"File mimetype: {document.file_type}")
-        
         # Check if a custom filename was provided in the request
         custom_filename = request.args.get('filename')
         if custom_filename:
@@ -348,21 +707,18 @@ def download_document(current_user, document_id):
             download_name = secure_filename(document.title)
             print(f"Using document title as filename: {download_name}")
         
-        # Use explicit attachment_filename to avoid compatibility issues
+        # Send the file, honouring Range, conditional and HEAD requests
         try:
-            response = send_file(
-                abs_file_path, 
+            return send_document_file(
+                abs_file_path,
                 mimetype=document.file_type,
                 download_name=download_name,
-                as_attachment=True
+                etag=get_document_etag(document),
+                last_modified=document.updated_at,
+                size=document.file_size,
+                headers=response_headers
             )
             
-            # Add CORS headers to the response
-            for header, value in response_headers.items():
-                response.headers[header] = value
-                
-            return response
-            
         except Exception as send_err:
             print(f"Error sending file: {str(send_err)}")
             return jsonify({
@@ -380,8 +736,47 @@ def download_document(current_user, document_id):
             "status": 500
         }), 500
 
+@bp.route("/storage/stats", methods=["GET"])
+@admin_required
+def get_storage_stats(current_user):
+    """Report compression ratios and CPU cost per file type (admin only)"""
+    rows = db.session.query(
+        Blob.content_type,
+        Blob.encoding,
+        func.count(Blob.sha256),
+        func.sum(Blob.size),
+        func.sum(Blob.stored_size),
+        func.sum(Blob.compress_time)
+    ).group_by(Blob.content_type, Blob.encoding).all()
+    
+    items = []
+    for content_type, encoding, blobs, original_bytes, stored_bytes, compress_time in rows:
+        original_bytes = int(original_bytes or 0)
+        stored_bytes = int(stored_bytes or original_bytes)
+        compress_time = float(compress_time or 0)
+        items.append({
+            "contentType": content_type,
+            "encoding": encoding,
+            "blobs": blobs,
+            "originalBytes": original_bytes,
+            "storedBytes": stored_bytes,
+            "ratio": round(original_bytes / stored_bytes, 2) if stored_bytes else None,
+            "compressSeconds": round(compress_time, 3),
+            "compressMBps": round(original_bytes / compress_time / 1e6, 1) if encoding and compress_time else None
+        })
+    
+    return jsonify({
+        "message": "Storage statistics retrieved successfully",
+        "status": 200,
+        "data": {
+            "compression": current_app.config.get("STORAGE_COMPRESSION") or None,
+            "items": items
+        }
+    }), 200
+
 @bp.route("/search", methods=["GET"])
 @token_required
+@replica_reads
 def search_documents(current_user):
     """Search documents by title, description or tags"""
     # Get search query
@@ -392,38 +787,85 @@ def search_documents(current_user):
             "status": 400
         }), 400
         
-    # Parse pagination parameters
+    # Parse pagination parameters and fields
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("pageSize", 10, type=int)
+    try:
+        fieldset = parse_fields(request.args, DocumentSchema)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    page_options = load_only_options(Document, fieldset)
     
-    # Build the search query
-    search_pattern = f"%{search_term}%"
-    query = Document.query.filter(
-        Document.title.ilike(search_pattern) | 
-        Document.description.ilike(search_pattern)
-    )
-    
-    # Get documents that match by tags
-    tag_document_ids = db.session.query(Document.id).filter(
-        Document.tags.ilike(search_pattern)
-    ).all()
-    tag_document_ids = [id[0] for id in tag_document_ids]
+    # Build the search query, most relevant first
+    tsquery = get_tsquery(search_term)
+    if tsquery is None:
+        return jsonify({
+            "message": "Search query must contain at least one word to match",
+            "status": 400
+        }), 400
     
-    if tag_document_ids:
-        query = query.union(Document.query.filter(Document.id.in_(tag_document_ids)))
+    # q is the search here, so only the scope and tag filters are shared with the listing
+    filters = request.args.copy()
+    filters.pop("search", None)
+    filters.pop("searchMode", None)
+    try:
+        query, _ = filter_documents(match_documents(Document.query, tsquery), filters, current_user)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    rank = rank_documents(tsquery)
     
     # Get paginated documents
-    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-    documents = pagination.items
+    if wants_cursor(request.args):
+        try:
+            documents, next_cursor, prev_cursor = keyset_paginate(
+                query.options(*page_options), [("rank", rank), ("id", Document.id)], True,
+                max(per_page, 1), request.args.get("cursor")
+            )
+        except InvalidCursor as e:
+            return jsonify({
+                "message": str(e),
+                "status": 400
+            }), 400
+    else:
+        pagination = query.options(*page_options).order_by(rank.desc(), Document.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False, count=False
+        )
+        pagination.total, total_exact = count_rows(query, exact=request.args.get("exact") == "true")
+        documents = pagination.items
     
-    return jsonify({
+    # Highlight matches on the current page only
+    highlights = get_highlights([document.id for document in documents], tsquery)
+    items = compile_schema(DocumentSchema, only=fieldset).dump_many(documents)
+    for document, item in zip(documents, items):
+        item["highlight"] = highlights.get(document.id)
+    
+    if wants_cursor(request.args):
+        return json_response({
+            "message": "Search results",
+            "status": 200,
+            "data": {
+                "items": items,
+                "pageSize": per_page,
+                "nextCursor": next_cursor,
+                "prevCursor": prev_cursor
+            }
+        })
+    
+    return json_response({
         "message": "Search results",
         "status": 200,
         "data": {
-            "items": documents_schema.dump(documents),
+            "items": items,
             "total": pagination.total,
+            "totalExact": total_exact,
             "page": page,
             "pageSize": per_page,
             "totalPages": pagination.pages
         }
-    }), 200 
\ No newline at end of file
+    }) 
\ No newline at end of file
@@ -1,64 +1,82 @@
-from flask import Blueprint, request, jsonify
+import os
+import zipfile
+from flask import Blueprint, request, jsonify, current_app, Response
+from werkzeug.utils import secure_filename
 from marshmallow import ValidationError
 from app import db
-from app.models.folder import Folder, FolderPermission
+from app.models.folder import Folder, FolderGroupPermission, EffectiveFolderAccess
+from app.models.group import Group
 from app.models.document import Document
-from app.schemas import FolderSchema, FolderUpdateSchema, DocumentSchema
+from app.schemas import FolderSchema, FolderUpdateSchema, DocumentSchema, FolderGroupPermissionSchema
 from app.utils.auth import token_required, admin_required
-from sqlalchemy import or_
+from app.utils.archive import iter_zip, archive_name
+from app.utils.codecs import DEFAULT_COMPRESSIBLE_TYPES
+from app.utils.file_handler import resolve_blob_path
+from app.utils.pagination import wants_cursor, keyset_paginate, InvalidCursor
+from app.utils.serializers import compile_schema, json_response, parse_fields, load_only_options
+from app.utils.permissions import can_read_folder, can_manage_folder
+from app.utils.replicas import replica_reads
 
 bp = Blueprint("folders", __name__, url_prefix="/api/folders")
 
 # Schemas
 folder_schema = FolderSchema()
-folders_schema = FolderSchema(many=True)
 folder_update_schema = FolderUpdateSchema()
-documents_schema = DocumentSchema(many=True)
 document_schema = DocumentSchema()
-
-# Helper functions
-def has_folder_permission(user, folder):
-    """Check if user has permission to access a folder"""
-    # Allow folder owner
-    if folder.created_by == user.id:
-        return True
-    
-    # Allow admins
-    if user.role == "admin":
-        return True
-    
-    # Allow users with explicit permissions
-    permission = FolderPermission.query.filter_by(
-        folder_id=folder.id,
-        user_id=user.id
-    ).first()
-    
-    return permission is not None
+folder_group_permission_schema = FolderGroupPermissionSchema()
 
 @bp.route("", methods=["GET"])
 @token_required
+@replica_reads
 def get_folders(current_user):
     """Get all folders for the current user"""
-    # Get folders with permission: owned or shared
-    folders = Folder.query.filter(
-        or_(
-            Folder.created_by == current_user.id,
-            Folder.id.in_(
-                db.session.query(FolderPermission.folder_id)
-                .filter_by(user_id=current_user.id)
-                .subquery()
-            )
+    # Only load and return the requested fields
+    try:
+        fieldset = parse_fields(request.args, FolderSchema)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    serializer = compile_schema(FolderSchema, only=fieldset)
+    
+    # Get folders with permission: owned, shared directly or through a group
+    query = Folder.query.join(
+        EffectiveFolderAccess,
+        (EffectiveFolderAccess.folder_id == Folder.id) & (EffectiveFolderAccess.user_id == current_user.id)
+    ).options(*load_only_options(Folder, fieldset))
+    
+    # All folders at once unless a cursor page is requested
+    if not wants_cursor(request.args):
+        return json_response({
+            "message": "Folders retrieved successfully",
+            "status": 200,
+            "folders": serializer.dump_many(query.all())
+        })
+    
+    per_page = request.args.get("pageSize", 50, type=int)
+    try:
+        folders, next_cursor, prev_cursor = keyset_paginate(
+            query, [("id", Folder.id)], False, max(per_page, 1), request.args.get("cursor")
         )
-    ).all()
+    except InvalidCursor as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
     
-    return jsonify({
+    return json_response({
         "message": "Folders retrieved successfully",
         "status": 200,
-        "folders": folders_schema.dump(folders)
-    }), 200
+        "folders": serializer.dump_many(folders),
+        "pageSize": per_page,
+        "nextCursor": next_cursor,
+        "prevCursor": prev_cursor
+    })
 
 @bp.route("/<int:folder_id>", methods=["GET"])
 @token_required
+@replica_reads
 def get_folder(current_user, folder_id):
     """Get a folder by ID"""
     folder = Folder.query.get(folder_id)
@@ -69,7 +87,7 @@ def get_folder(current_user, folder_id):
         }), 404
     
     # Check if the user owns the folder or is an admin
-    if current_user.role != "admin" and folder.created_by != current_user.id:
+    if not can_manage_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to access this folder",
             "status": 403
@@ -131,7 +149,7 @@ def update_folder(current_user, folder_id):
         }), 404
         
     # Check if the user owns the folder or is an admin
-    if current_user.role != "admin" and folder.created_by != current_user.id:
+    if not can_manage_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to update this folder",
             "status": 403
@@ -181,7 +199,7 @@ def delete_folder(current_user, folder_id):
         }), 404
         
     # Check if the user owns the folder or is an admin
-    if current_user.role != "admin" and folder.created_by != current_user.id:
+    if not can_manage_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to delete this folder",
             "status": 403
@@ -207,6 +225,7 @@ def delete_folder(current_user, folder_id):
 
 @bp.route("/<int:folder_id>/documents", methods=["GET"])
 @token_required
+@replica_reads
 def get_folder_documents(current_user, folder_id):
     """Get all documents in a folder"""
     folder = Folder.query.get(folder_id)
@@ -217,20 +236,100 @@ def get_folder_documents(current_user, folder_id):
         }), 404
     
     # Check if user has permission to access this folder
-    if not has_folder_permission(current_user, folder):
+    if not can_read_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to access this folder",
             "status": 403
         }), 403
     
+    # Only load and return the requested fields
+    try:
+        fieldset = parse_fields(request.args, DocumentSchema)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    serializer = compile_schema(DocumentSchema, only=fieldset)
+    
     # Get documents directly through the relationship
-    documents = Document.query.filter_by(folder_id=folder_id).all()
+    query = Document.query.filter_by(folder_id=folder_id).options(*load_only_options(Document, fieldset))
     
-    return jsonify({
+    # All documents at once unless a cursor page is requested
+    if not wants_cursor(request.args):
+        return json_response({
+            "message": "Folder documents retrieved successfully",
+            "status": 200,
+            "documents": serializer.dump_many(query.all())
+        })
+    
+    per_page = request.args.get("pageSize", 50, type=int)
+    try:
+        documents, next_cursor, prev_cursor = keyset_paginate(
+            query, [("id", Document.id)], False, max(per_page, 1), request.args.get("cursor")
+        )
+    except InvalidCursor as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    
+    return json_response({
         "message": "Folder documents retrieved successfully",
         "status": 200,
-        "documents": documents_schema.dump(documents)
-    }), 200
+        "documents": serializer.dump_many(documents),
+        "pageSize": per_page,
+        "nextCursor": next_cursor,
+        "prevCursor": prev_cursor
+    })
+
+@bp.route("/<int:folder_id>/archive", methods=["GET"])
+@token_required
+@replica_reads
+def download_folder_archive(current_user, folder_id):
+    """Download all documents in a folder as a streamed ZIP archive"""
+    folder = Folder.query.get(folder_id)
+    if not folder:
+        return jsonify({
+            "message": "Folder not found",
+            "status": 404
+        }), 404
+    
+    # One permission check covers every document in the archive
+    if not can_read_folder(current_user, folder):
+        return jsonify({
+            "message": "Not authorized to access this folder",
+            "status": 403
+        }), 403
+    
+    documents = db.session.query(
+        Document.title, Document.file_path, Document.file_type, Document.updated_at
+    ).filter_by(folder_id=folder_id).order_by(Document.id).all()
+    
+    # Resolve everything up front so the stream needs no app context
+    compressible_types = current_app.config.get("STORAGE_COMPRESSION_TYPES") or DEFAULT_COMPRESSIBLE_TYPES
+    used_names = set()
+    entries = []
+    for title, file_path, file_type, updated_at in documents:
+        if not os.path.isabs(file_path):
+            file_path = os.path.normpath(os.path.join(current_app.root_path, '..', file_path))
+        if not os.path.exists(file_path):
+            file_path = resolve_blob_path(os.path.basename(file_path))
+        entries.append((
+            archive_name(title, file_type, used_names),
+            file_path,
+            updated_at,
+            zipfile.ZIP_DEFLATED if file_type in compressible_types else zipfile.ZIP_STORED
+        ))
+    archive_filename = f"{secure_filename(folder.name) or 'folder'}.zip"
+    
+    # Release the database connection before the potentially long transfer
+    db.session.close()
+    
+    response = Response(iter_zip(entries), mimetype="application/zip")
+    response.headers.set("Content-Disposition", "attachment", filename=archive_filename)
+    response.headers["Access-Control-Expose-Headers"] = "Content-Disposition"
+    return response
 
 @bp.route("/<int:folder_id>/documents", methods=["POST"])
 @token_required
@@ -244,7 +343,7 @@ def add_document_to_folder(current_user, folder_id):
         }), 404
     
     # Check if the user owns the folder or is an admin
-    if current_user.role != "admin" and folder.created_by != current_user.id:
+    if not can_manage_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to modify this folder",
             "status": 403
@@ -331,7 +430,7 @@ def remove_document_from_folder(current_user, folder_id, document_id):
         }), 404
     
     # Check if the user owns the folder or is an admin
-    if current_user.role != "admin" and folder.created_by != current_user.id:
+    if not can_manage_folder(current_user, folder):
         return jsonify({
             "message": "Not authorized to modify this folder",
             "status": 403
@@ -370,4 +469,137 @@ def remove_document_from_folder(current_user, folder_id, document_id):
         return jsonify({
             "message": f"Error: {str(e)}",
             "status": 500
-        }), 500 
\ No newline at end of file
+        }), 500
+
+@bp.route("/<int:folder_id>/groups", methods=["GET"])
+@token_required
+@replica_reads
+def get_folder_groups(current_user, folder_id):
+    """Get the groups a folder is shared with"""
+    folder = Folder.query.get(folder_id)
+    if not folder:
+        return jsonify({
+            "message": "Folder not found",
+            "status": 404
+        }), 404
+    
+    if not can_read_folder(current_user, folder):
+        return jsonify({
+            "message": "Not authorized to access this folder",
+            "status": 403
+        }), 403
+    
+    rows = db.session.query(FolderGroupPermission, Group.name).join(Group).filter(
+        FolderGroupPermission.folder_id == folder_id
+    ).order_by(Group.name)
+    
+    return jsonify({
+        "message": "Folder groups retrieved successfully",
+        "status": 200,
+        "groups": [
+            {"groupId": permission.group_id, "name": name, "permissionType": permission.permission_type}
+            for permission, name in rows
+        ]
+    }), 200
+
+@bp.route("/<int:folder_id>/groups", methods=["POST"])
+@token_required
+def share_folder_with_group(current_user, folder_id):
+    """Grant every member of a group access to a folder"""
+    folder = Folder.query.get(folder_id)
+    if not folder:
+        return jsonify({
+            "message": "Folder not found",
+            "status": 404
+        }), 404
+    
+    # Check if the user owns the folder or is an admin
+    if not can_manage_folder(current_user, folder):
+        return jsonify({
+            "message": "Not authorized to modify this folder",
+            "status": 403
+        }), 403
+    
+    try:
+        # Validate request data
+        data = folder_group_permission_schema.load(request.get_json())
+        
+        if not Group.query.get(data["group_id"]):
+            return jsonify({
+                "message": "Group not found",
+                "status": 404
+            }), 404
+        
+        # Sharing again with the same group changes its permission
+        permission = FolderGroupPermission.query.filter_by(folder_id=folder_id, group_id=data["group_id"]).first()
+        if permission is None:
+            permission = FolderGroupPermission(folder_id=folder_id, group_id=data["group_id"])
+            db.session.add(permission)
+        permission.permission_type = data["permission_type"]
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Folder shared with group successfully",
+            "status": 200,
+            "data": {
+                "folderId": folder_id,
+                "groupId": permission.group_id,
+                "permissionType": permission.permission_type
+            }
+        }), 200
+        
+    except ValidationError as e:
+        return jsonify({
+            "message": "Validation error",
+            "errors": e.messages,
+            "status": 400
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<int:folder_id>/groups/<int:group_id>", methods=["DELETE"])
+@token_required
+def unshare_folder_with_group(current_user, folder_id, group_id):
+    """Revoke a group's access to a folder"""
+    folder = Folder.query.get(folder_id)
+    if not folder:
+        return jsonify({
+            "message": "Folder not found",
+            "status": 404
+        }), 404
+    
+    # Check if the user owns the folder or is an admin
+    if not can_manage_folder(current_user, folder):
+        return jsonify({
+            "message": "Not authorized to modify this folder",
+            "status": 403
+        }), 403
+    
+    permission = FolderGroupPermission.query.filter_by(folder_id=folder_id, group_id=group_id).first()
+    if not permission:
+        return jsonify({
+            "message": "Folder is not shared with this group",
+            "status": 404
+        }), 404
+    
+    try:
+        db.session.delete(permission)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Folder unshared with group successfully",
+            "status": 200,
+            "data": None
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
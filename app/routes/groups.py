@@ -0,0 +1,297 @@
+from flask import Blueprint, request, jsonify
+from marshmallow import ValidationError
+from app import db
+from app.models.user import User
+from app.models.group import Group, GroupMembership
+from app.schemas import GroupSchema, GroupUpdateSchema, GroupMembershipSchema
+from app.utils.auth import token_required
+from app.utils.permissions import can_manage_group
+
+bp = Blueprint("groups", __name__, url_prefix="/api/groups")
+
+# Schemas
+group_schema = GroupSchema()
+groups_schema = GroupSchema(many=True)
+group_update_schema = GroupUpdateSchema()
+membership_schema = GroupMembershipSchema()
+
+def dump_members(group):
+    """Return the members of a group with their usernames"""
+    rows = db.session.query(GroupMembership.user_id, GroupMembership.role, User.username).join(
+        User, User.id == GroupMembership.user_id
+    ).filter(GroupMembership.group_id == group.id).order_by(User.username)
+    return [
+        {"userId": user_id, "username": username, "role": role}
+        for user_id, role, username in rows
+    ]
+
+@bp.route("", methods=["GET"])
+@token_required
+def get_groups(current_user):
+    """Get the groups the current user belongs to, or every group for admins"""
+    query = Group.query
+    if current_user.role != "admin":
+        query = query.filter(Group.id.in_(
+            db.session.query(GroupMembership.group_id).filter_by(user_id=current_user.id)
+        ))
+    
+    return jsonify({
+        "message": "Groups retrieved successfully",
+        "status": 200,
+        "groups": groups_schema.dump(query.order_by(Group.name).all())
+    }), 200
+
+@bp.route("", methods=["POST"])
+@token_required
+def create_group(current_user):
+    """Create a group managed by the current user"""
+    try:
+        # Validate request data
+        data = group_schema.load(request.get_json())
+        
+        if Group.query.filter_by(name=data["name"]).first():
+            return jsonify({
+                "message": "Group with this name already exists",
+                "status": 400
+            }), 400
+        
+        # The creator manages the group from the start
+        group = Group(name=data["name"], description=data.get("description"), created_by=current_user.id)
+        group.memberships.append(GroupMembership(user_id=current_user.id, role="manager"))
+        
+        db.session.add(group)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Group created successfully",
+            "status": 201,
+            "group": group_schema.dump(group)
+        }), 201
+    
+    except ValidationError as e:
+        return jsonify({
+            "message": "Validation error",
+            "errors": e.messages,
+            "status": 400
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<int:group_id>", methods=["GET"])
+@token_required
+def get_group(current_user, group_id):
+    """Get a group with its members"""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({
+            "message": "Group not found",
+            "status": 404
+        }), 404
+    
+    # Only members and admins can see who is in a group
+    if current_user.role != "admin" and not GroupMembership.query.filter_by(
+        group_id=group.id, user_id=current_user.id
+    ).first():
+        return jsonify({
+            "message": "Not authorized to access this group",
+            "status": 403
+        }), 403
+    
+    return jsonify({
+        "message": "Group retrieved successfully",
+        "status": 200,
+        "group": {**group_schema.dump(group), "members": dump_members(group)}
+    }), 200
+
+@bp.route("/<int:group_id>", methods=["PUT"])
+@token_required
+def update_group(current_user, group_id):
+    """Update a group"""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({
+            "message": "Group not found",
+            "status": 404
+        }), 404
+    
+    if not can_manage_group(current_user, group):
+        return jsonify({
+            "message": "Not authorized to update this group",
+            "status": 403
+        }), 403
+    
+    try:
+        # Validate request data
+        data = group_update_schema.load(request.get_json())
+        
+        if "name" in data and data["name"] != group.name and Group.query.filter_by(name=data["name"]).first():
+            return jsonify({
+                "message": "Group with this name already exists",
+                "status": 400
+            }), 400
+        
+        # Update group fields
+        if "name" in data:
+            group.name = data["name"]
+        if "description" in data:
+            group.description = data["description"]
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Group updated successfully",
+            "status": 200,
+            "group": group_schema.dump(group)
+        }), 200
+    
+    except ValidationError as e:
+        return jsonify({
+            "message": "Validation error",
+            "errors": e.messages,
+            "status": 400
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<int:group_id>", methods=["DELETE"])
+@token_required
+def delete_group(current_user, group_id):
+    """Delete a group, revoking the folder access it granted"""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({
+            "message": "Group not found",
+            "status": 404
+        }), 404
+    
+    # Only the creator or an admin can delete a group
+    if current_user.role != "admin" and group.created_by != current_user.id:
+        return jsonify({
+            "message": "Not authorized to delete this group",
+            "status": 403
+        }), 403
+    
+    try:
+        db.session.delete(group)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Group deleted successfully",
+            "status": 200,
+            "data": None
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<int:group_id>/members", methods=["POST"])
+@token_required
+def add_group_member(current_user, group_id):
+    """Add a user to a group, or change their role in it"""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({
+            "message": "Group not found",
+            "status": 404
+        }), 404
+    
+    if not can_manage_group(current_user, group):
+        return jsonify({
+            "message": "Not authorized to modify this group",
+            "status": 403
+        }), 403
+    
+    try:
+        # Validate request data
+        data = membership_schema.load(request.get_json())
+        
+        if not User.query.get(data["user_id"]):
+            return jsonify({
+                "message": "User not found",
+                "status": 404
+            }), 404
+        
+        membership = GroupMembership.query.filter_by(group_id=group_id, user_id=data["user_id"]).first()
+        created = membership is None
+        if created:
+            membership = GroupMembership(group_id=group_id, user_id=data["user_id"])
+            db.session.add(membership)
+        membership.role = data["role"]
+        
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Member added successfully" if created else "Member updated successfully",
+            "status": 201 if created else 200,
+            "data": {
+                "groupId": group_id,
+                "userId": membership.user_id,
+                "role": membership.role
+            }
+        }), 201 if created else 200
+    
+    except ValidationError as e:
+        return jsonify({
+            "message": "Validation error",
+            "errors": e.messages,
+            "status": 400
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<int:group_id>/members/<int:user_id>", methods=["DELETE"])
+@token_required
+def remove_group_member(current_user, group_id, user_id):
+    """Remove a user from a group; members may always leave"""
+    group = Group.query.get(group_id)
+    if not group:
+        return jsonify({
+            "message": "Group not found",
+            "status": 404
+        }), 404
+    
+    if current_user.id != user_id and not can_manage_group(current_user, group):
+        return jsonify({
+            "message": "Not authorized to modify this group",
+            "status": 403
+        }), 403
+    
+    membership = GroupMembership.query.filter_by(group_id=group_id, user_id=user_id).first()
+    if not membership:
+        return jsonify({
+            "message": "User is not a member of this group",
+            "status": 404
+        }), 404
+    
+    try:
+        db.session.delete(membership)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Member removed successfully",
+            "status": 200,
+            "data": None
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
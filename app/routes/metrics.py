@@ -0,0 +1,40 @@
+from flask import Blueprint, jsonify
+from sqlalchemy import text
+from app import db
+from app.utils.auth import admin_required
+from app.utils.user_cache import user_cache
+from app.utils.permissions import permission_cache
+from app.utils.passwords import password_hasher
+from app.utils.db_pool import get_pool_stats
+from app.utils.replicas import get_replicas
+
+bp = Blueprint("metrics", __name__, url_prefix="/api/metrics")
+
+def get_server_connections():
+    """Return the server's connection limit and how many connections are open, if reachable"""
+    try:
+        max_connections = int(db.session.execute(text("SHOW max_connections")).scalar())
+        open_connections = db.session.execute(text("SELECT count(*) FROM pg_stat_activity WHERE backend_type = 'client backend'")).scalar()
+        db.session.rollback()
+        return {"maxConnections": max_connections, "openConnections": open_connections}
+    except Exception as e:
+        db.session.rollback()
+        print(f"Could not read server connection counts: {str(e)}")
+        return None
+
+@bp.route("", methods=["GET"])
+@admin_required
+def get_metrics(current_user):
+    """Get this worker's in-process cache and pool statistics (admin only)"""
+    return jsonify({
+        "message": "Metrics retrieved successfully",
+        "status": 200,
+        "data": {
+            "authCache": user_cache.stats(),
+            "permissionCache": permission_cache.stats(),
+            "passwordHashing": password_hasher.stats(),
+            "dbPool": get_pool_stats(db.engine),
+            "dbServer": get_server_connections(),
+            "dbReplicas": get_replicas().stats() if get_replicas() else None
+        }
+    }), 200
@@ -0,0 +1,271 @@
+import uuid
+from flask import Blueprint, request, jsonify, current_app
+from marshmallow import ValidationError
+from app import db
+from app.models.document import Document
+from app.models.upload_session import UploadSession
+from app.schemas import UploadSessionSchema, DocumentSchema
+from app.utils.auth import token_required
+from app.utils.file_handler import get_file_type, register_blob
+from app.utils.upload_sessions import (
+    write_chunk, get_received_chunks, assemble_chunks, remove_session_files
+)
+
+bp = Blueprint("uploads", __name__, url_prefix="/api/uploads")
+
+# Schemas
+upload_session_schema = UploadSessionSchema()
+document_schema = DocumentSchema()
+
+# Helper functions
+def get_owned_session(user, session_id):
+    """Return the upload session if it belongs to the user, otherwise None"""
+    session = UploadSession.query.get(session_id)
+    if not session or session.created_by != user.id:
+        return None
+    return session
+
+def get_missing_chunks(session, received):
+    """Return the indexes of the chunks not received yet, from the sorted received list"""
+    missing = []
+    expected = 0
+    for index in received + [session.total_chunks]:
+        missing.extend(range(expected, min(index, session.total_chunks)))
+        expected = max(expected, index + 1)
+    return missing
+
+def dump_session(session):
+    """Serialize an upload session together with its progress"""
+    received = get_received_chunks(session)
+    data = upload_session_schema.dump(session)
+    data["received_chunks"] = received
+    data["missing_chunks"] = get_missing_chunks(session, received)
+    return data
+
+@bp.route("", methods=["POST"])
+@token_required
+def create_upload_session(current_user):
+    """Start a resumable upload"""
+    try:
+        # Validate request data
+        data = upload_session_schema.load(request.get_json())
+        
+        session = UploadSession(
+            id=uuid.uuid4().hex,
+            filename=data["filename"],
+            title=data["title"],
+            description=data.get("description", ""),
+            tags=data.get("tags", []),
+            folder_id=data.get("folder_id"),
+            total_size=data["total_size"],
+            chunk_size=data.get("chunk_size", current_app.config.get("UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)),
+            created_by=current_user.id
+        )
+        
+        # Bound the file and the chunk lists every status call returns
+        max_size = current_app.config.get("UPLOAD_MAX_SIZE")
+        if max_size and session.total_size > max_size:
+            return jsonify({
+                "message": f"Uploads can be at most {max_size} bytes",
+                "status": 413
+            }), 413
+        max_chunks = current_app.config.get("UPLOAD_MAX_CHUNKS")
+        if max_chunks and session.total_chunks > max_chunks:
+            return jsonify({
+                "message": f"Uploads can have at most {max_chunks} chunks, use a larger chunk_size",
+                "status": 400
+            }), 400
+        
+        # Add to database
+        db.session.add(session)
+        db.session.commit()
+        
+        return jsonify({
+            "message": "Upload session created successfully",
+            "status": 201,
+            "upload": dump_session(session)
+        }), 201
+        
+    except ValidationError as e:
+        return jsonify({
+            "message": "Validation error",
+            "errors": e.messages,
+            "status": 400
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<session_id>", methods=["GET"])
+@token_required
+def get_upload_session(current_user, session_id):
+    """Get an upload session and the chunks received so far"""
+    session = get_owned_session(current_user, session_id)
+    if not session:
+        return jsonify({
+            "message": "Upload session not found",
+            "status": 404
+        }), 404
+    
+    return jsonify({
+        "message": "Upload session retrieved successfully",
+        "status": 200,
+        "upload": dump_session(session)
+    }), 200
+
+@bp.route("/<session_id>/chunks/<int:index>", methods=["PUT"])
+@token_required
+def upload_chunk(current_user, session_id, index):
+    """Store one chunk of an upload; chunks may arrive in any order"""
+    session = get_owned_session(current_user, session_id)
+    if not session:
+        return jsonify({
+            "message": "Upload session not found",
+            "status": 404
+        }), 404
+    
+    if index < 0 or index >= session.total_chunks:
+        return jsonify({
+            "message": f"Chunk index must be between 0 and {session.total_chunks - 1}",
+            "status": 400
+        }), 400
+    
+    # Release the connection before the potentially slow transfer
+    db.session.close()
+    
+    if not write_chunk(session, index, request.stream):
+        return jsonify({
+            "message": f"Chunk {index} must be exactly {session.expected_chunk_size(index)} bytes",
+            "status": 400
+        }), 400
+    
+    return jsonify({
+        "message": "Chunk uploaded successfully",
+        "status": 200,
+        "data": {
+            "index": index
+        }
+    }), 200
+
+@bp.route("/<session_id>/complete", methods=["POST"])
+@token_required
+def complete_upload_session(current_user, session_id):
+    """Assemble the chunks of an upload and create the document"""
+    session = get_owned_session(current_user, session_id)
+    if not session:
+        return jsonify({
+            "message": "Upload session not found",
+            "status": 404
+        }), 404
+    
+    missing = get_missing_chunks(session, get_received_chunks(session))
+    if missing:
+        return jsonify({
+            "message": "Upload is incomplete",
+            "status": 409,
+            "data": {
+                "missingChunks": missing
+            }
+        }), 409
+    
+    # Release the connection before the potentially slow assembly
+    db.session.close()
+    
+    writer = None
+    try:
+        # Optionally verify the checksum computed by the client
+        data = request.get_json(silent=True) or {}
+        try:
+            writer = assemble_chunks(session, data.get("sha256"))
+        except FileNotFoundError:
+            # Another request completed or deleted the session meanwhile
+            return jsonify({
+                "message": "Upload session was already completed or deleted",
+                "status": 409
+            }), 409
+        if writer is None:
+            return jsonify({
+                "message": "Checksum mismatch",
+                "status": 422
+            }), 422
+        
+        # Only one of concurrent completions may turn the session into a document
+        session = UploadSession.query.filter_by(id=session_id, created_by=current_user.id).with_for_update().first()
+        if not session:
+            db.session.rollback()
+            writer.abort()
+            return jsonify({
+                "message": "Upload session was already completed or deleted",
+                "status": 409
+            }), 409
+        
+        filename, file_path, file_url, file_size = register_blob(writer)
+        
+        document = Document(
+            title=session.title,
+            description=session.description,
+            file_path=file_path,
+            file_url=file_url,
+            file_type=get_file_type(session.filename),
+            file_size=file_size,
+            tags=session.tags or [],
+            folder_id=session.folder_id,
+            created_by=current_user.id
+        )
+        
+        # Replace the session with the document in one transaction
+        db.session.add(document)
+        db.session.delete(session)
+        db.session.commit()
+        
+        remove_session_files(session_id)
+        
+        return jsonify({
+            "message": "Document created successfully",
+            "status": 201,
+            "document": document_schema.dump(document)
+        }), 201
+        
+    except Exception as e:
+        db.session.rollback()
+        if writer is not None:
+            writer.abort()
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
+
+@bp.route("/<session_id>", methods=["DELETE"])
+@token_required
+def delete_upload_session(current_user, session_id):
+    """Abort an upload and discard its chunks"""
+    session = get_owned_session(current_user, session_id)
+    if not session:
+        return jsonify({
+            "message": "Upload session not found",
+            "status": 404
+        }), 404
+    
+    try:
+        db.session.delete(session)
+        db.session.commit()
+        
+        remove_session_files(session_id)
+        
+        return jsonify({
+            "message": "Upload session deleted successfully",
+            "status": 200,
+            "data": None
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            "message": f"Error: {str(e)}",
+            "status": 500
+        }), 500
@@ -4,17 +4,30 @@ from app import db
 from app.models.user import User
 from app.schemas import UserSchema, UserUpdateSchema, LoginSchema, GoogleAuthSchema
 from app.utils.auth import token_required, admin_required, generate_token
+from app.utils.search import substring_filter, fuzzy_filter
+from app.utils.pagination import wants_cursor, keyset_paginate, InvalidCursor
+from app.utils.counts import count_rows
+from app.utils.serializers import compile_schema, json_response, parse_fields, load_only_options
+from app.utils.passwords import PasswordHashBusy
 import uuid
 
 bp = Blueprint("users", __name__, url_prefix="/api/users")
 
 # Schemas
 user_schema = UserSchema()
-users_schema = UserSchema(many=True)
 user_update_schema = UserUpdateSchema()
 login_schema = LoginSchema()
 google_auth_schema = GoogleAuthSchema()
 
+def hashing_busy_response():
+    """Ask the client to retry when this worker's password hashing pool is saturated"""
+    response = jsonify({
+        "message": "Server is busy, please try again shortly",
+        "status": 503
+    })
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
 @bp.route("/register", methods=["POST"])
 def register():
     """Register a new user"""
@@ -51,7 +64,7 @@ def register():
         db.session.commit()
         
         # Generate token
-        token = generate_token(user.id)
+        token = generate_token(user.id, user.token_version)
         
         return jsonify({
             "message": "User registered successfully",
@@ -66,6 +79,9 @@ def register():
             "errors": e.messages,
             "status": 400
         }), 400
+    except PasswordHashBusy:
+        db.session.rollback()
+        return hashing_busy_response()
     except Exception as e:
         db.session.rollback()
         # Log the error for debugging
@@ -97,9 +113,16 @@ def login():
                 "message": "Invalid email or password",
                 "status": 401
             }), 401
+        
+        # Upgrade hashes made with older parameters while the password is at hand
+        try:
+            if user.upgrade_password_hash(data["password"]):
+                db.session.commit()
+        except PasswordHashBusy:
+            pass
             
         # Generate token
-        token = generate_token(user.id)
+        token = generate_token(user.id, user.token_version)
         
         return jsonify({
             "message": "Login successful",
@@ -114,6 +137,9 @@ def login():
             "errors": e.messages,
             "status": 400
         }), 400
+    except PasswordHashBusy:
+        db.session.rollback()
+        return hashing_busy_response()
     except Exception as e:
         return jsonify({
             "message": f"Error: {str(e)}",
@@ -205,11 +231,17 @@ def update_user(current_user, user_id):
         # Save to database
         db.session.commit()
         
-        return jsonify({
+        response = {
             "message": "User profile updated successfully",
             "status": 200,
             "user": user_schema.dump(user)
-        }), 200
+        }
+        
+        # A new password revokes older tokens, so keep the current session signed in
+        if "password" in data and current_user.id == user.id:
+            response["token"] = generate_token(user.id, user.token_version)
+        
+        return jsonify(response), 200
         
     except ValidationError as e:
         return jsonify({
@@ -217,6 +249,9 @@ def update_user(current_user, user_id):
             "errors": e.messages,
             "status": 400
         }), 400
+    except PasswordHashBusy:
+        db.session.rollback()
+        return hashing_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -232,21 +267,77 @@ def get_all_users(current_user):
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("pageSize", 10, type=int)
     
-    # Get paginated users
-    pagination = User.query.paginate(page=page, per_page=per_page, error_out=False)
+    # Build query, optionally narrowed by a username/email search
+    query = User.query
+    search = request.args.get("search")
+    search_mode = request.args.get("searchMode", "substring")
+    if search_mode not in ("substring", "fuzzy"):
+        return jsonify({
+            "message": "searchMode must be one of: substring, fuzzy",
+            "status": 400
+        }), 400
+    
+    # Only load and return the requested fields
+    try:
+        fieldset = parse_fields(request.args, UserSchema)
+    except ValueError as e:
+        return jsonify({
+            "message": str(e),
+            "status": 400
+        }), 400
+    serializer = compile_schema(UserSchema, only=fieldset)
+    page_options = load_only_options(User, fieldset)
+    
+    keys = [("id", User.id)]
+    descending = False
+    if search and search_mode == "fuzzy":
+        condition, similarity = fuzzy_filter([User.username, User.email], search)
+        query = query.filter(condition).order_by(similarity.desc(), User.id.desc())
+        keys = [("similarity", similarity), ("id", User.id)]
+        descending = True
+    elif search:
+        query = query.filter(substring_filter([User.username, User.email], search))
+    
+    # Cursor pagination seeks past the last row instead of counting an OFFSET
+    if wants_cursor(request.args):
+        try:
+            users, next_cursor, prev_cursor = keyset_paginate(
+                query.options(*page_options), keys, descending, max(per_page, 1), request.args.get("cursor")
+            )
+        except InvalidCursor as e:
+            return jsonify({
+                "message": str(e),
+                "status": 400
+            }), 400
+        
+        return json_response({
+            "message": "Users retrieved successfully",
+            "status": 200,
+            "data": {
+                "items": serializer.dump_many(users),
+                "pageSize": per_page,
+                "nextCursor": next_cursor,
+                "prevCursor": prev_cursor
+            }
+        })
+    
+    # Get paginated users, counting them as cheaply as allowed
+    pagination = query.options(*page_options).paginate(page=page, per_page=per_page, error_out=False, count=False)
+    pagination.total, total_exact = count_rows(query, exact=request.args.get("exact") == "true")
     users = pagination.items
     
-    return jsonify({
+    return json_response({
         "message": "Users retrieved successfully",
         "status": 200,
         "data": {
-            "items": users_schema.dump(users),
+            "items": serializer.dump_many(users),
             "total": pagination.total,
+            "totalExact": total_exact,
             "page": page,
             "pageSize": per_page,
             "totalPages": pagination.pages
         }
-    }), 200
+    })
 
 @bp.route("/<int:user_id>", methods=["DELETE"])
 @admin_required
@@ -311,7 +402,7 @@ def google_auth():
         if user:
             print(f"Existing user found: {user.id}")
             # User exists, log them in
-            token = generate_token(user.id)
+            token = generate_token(user.id, user.token_version)
             return jsonify({
                 "message": "Login successful",
                 "status": 200,
@@ -358,7 +449,7 @@ def google_auth():
                 raise
             
             # Generate token
-            token = generate_token(user.id)
+            token = generate_token(user.id, user.token_version)
             
             return jsonify({
                 "message": "User registered successfully via Google",
@@ -374,6 +465,9 @@ def google_auth():
             "errors": e.messages,
             "status": 400
         }), 400
+    except PasswordHashBusy:
+        db.session.rollback()
+        return hashing_busy_response()
     except Exception as e:
         db.session.rollback()
         import traceback
@@ -1,3 +1,5 @@
 from app.schemas.user import UserSchema, UserUpdateSchema, LoginSchema, GoogleAuthSchema
 from app.schemas.document import DocumentSchema, DocumentUpdateSchema
-from app.schemas.folder import FolderSchema, FolderUpdateSchema 
\ No newline at end of file
+from app.schemas.folder import FolderSchema, FolderUpdateSchema
+from app.schemas.upload import UploadSessionSchema
+from app.schemas.group import GroupSchema, GroupUpdateSchema, GroupMembershipSchema, FolderGroupPermissionSchema
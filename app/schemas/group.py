@@ -0,0 +1,26 @@
+from marshmallow import Schema, fields, validate
+
+class GroupSchema(Schema):
+    """Schema for group data validation"""
+    id = fields.Int(dump_only=True)
+    name = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    description = fields.Str(allow_none=True)
+    created_at = fields.DateTime(dump_only=True)
+    updated_at = fields.DateTime(dump_only=True)
+    created_by = fields.Int(dump_only=True)
+
+class GroupUpdateSchema(Schema):
+    """Schema for group update validation"""
+    name = fields.Str(validate=validate.Length(min=1, max=255))
+    description = fields.Str(allow_none=True)
+
+class GroupMembershipSchema(Schema):
+    """Schema for group membership validation"""
+    user_id = fields.Int(required=True, data_key="userId")
+    role = fields.Str(validate=validate.OneOf(["member", "manager"]), load_default="member")
+    created_at = fields.DateTime(dump_only=True)
+
+class FolderGroupPermissionSchema(Schema):
+    """Schema for granting a group access to a folder"""
+    group_id = fields.Int(required=True, data_key="groupId")
+    permission_type = fields.Str(validate=validate.OneOf(["read", "write", "admin"]), load_default="read", data_key="permissionType")
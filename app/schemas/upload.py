@@ -0,0 +1,15 @@
+from marshmallow import Schema, fields, validate
+
+class UploadSessionSchema(Schema):
+    """Schema for resumable upload session validation"""
+    id = fields.Str(dump_only=True)
+    filename = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    title = fields.Str(required=True, validate=validate.Length(min=1, max=255))
+    description = fields.Str()
+    tags = fields.List(fields.Str(), default=[])
+    folder_id = fields.Int(allow_none=True)
+    total_size = fields.Int(required=True, validate=validate.Range(min=1))
+    chunk_size = fields.Int(validate=validate.Range(min=64 * 1024, max=256 * 1024 * 1024))
+    total_chunks = fields.Int(dump_only=True)
+    created_at = fields.DateTime(dump_only=True)
+    created_by = fields.Int(dump_only=True)
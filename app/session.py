@@ -0,0 +1,53 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session as BaseSession
+from flask_sqlalchemy.session import Session
+
+# session.info key holding the replica engine reads of the current request go to
+REPLICA_BIND_KEY = "replica_bind"
+# session.info key set once the current transaction has written to the primary
+PENDING_WRITE_KEY = "pending_primary_write"
+
+class RoutingSession(Session):
+    """Session that sends plain SELECTs to a read replica while one is assigned
+    
+    Everything else stays on the primary: flushes, DML, SELECT ... FOR UPDATE
+    and textual SQL, whose intent can't be told from the statement.
+    """
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get(REPLICA_BIND_KEY)
+        if replica is not None and bind is None and not self._flushing and is_plain_select(clause):
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+def is_plain_select(clause):
+    return getattr(clause, "is_select", False) and getattr(clause, "_for_update_arg", None) is None
+
+def reading_from_replica(session):
+    """Check if reads of a session currently go to a replica"""
+    return session.info.get(REPLICA_BIND_KEY) is not None
+
+@contextmanager
+def use_primary(session):
+    """Send the reads inside the block to the primary, e.g. to fill caches that commits invalidate"""
+    replica = session.info.pop(REPLICA_BIND_KEY, None)
+    try:
+        yield
+    finally:
+        if replica is not None and not session.info.get(PENDING_WRITE_KEY):
+            session.info[REPLICA_BIND_KEY] = replica
+
+def _pin_to_primary(session):
+    # The replica hasn't seen this write yet, so later reads must not go there
+    session.info.pop(REPLICA_BIND_KEY, None)
+    session.info[PENDING_WRITE_KEY] = True
+
+@event.listens_for(BaseSession, "after_flush")
+def _pin_after_flush(session, flush_context):
+    _pin_to_primary(session)
+
+@event.listens_for(BaseSession, "do_orm_execute")
+def _pin_after_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _pin_to_primary(orm_execute_state.session)
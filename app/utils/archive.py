@@ -0,0 +1,86 @@
+import io
+import mimetypes
+import os
+import zipfile
+from app.utils.codecs import open_blob
+
+# Size of the chunks read from stored files
+CHUNK_SIZE = 64 * 1024
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, unseekable stream collecting what ZipFile writes
+    
+    ZipFile falls back to data descriptors on unseekable output, so entries
+    never have to be rewritten and the archive can be sent as it is built.
+    """
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def flush(self):
+        pass
+    
+    def pop(self):
+        """Return and forget everything written since the last call"""
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def archive_name(title, file_type, used_names):
+    """Return a unique file name for a document inside an archive"""
+    name = (title or "document").replace("/", "_").replace("\\", "_").strip() or "document"
+    
+    ext = mimetypes.guess_extension(file_type or "") or ""
+    if ext and not name.lower().endswith(ext):
+        name += ext
+    
+    base, ext = os.path.splitext(name)
+    candidate, counter = name, 1
+    while candidate.lower() in used_names:
+        counter += 1
+        candidate = f"{base} ({counter}){ext}"
+    used_names.add(candidate.lower())
+    return candidate
+
+def iter_zip(entries):
+    """Yield a ZIP64 archive of stored files chunk by chunk
+    
+    ``entries`` is an iterable of (name, path, modified, compress_type). The
+    archive is never held in memory or on disk as a whole: each chunk is
+    yielded as soon as ZipFile has written it. Files missing on disk are
+    skipped.
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", allowZip64=True) as zf:
+        for name, path, modified, compress_type in entries:
+            if not os.path.exists(path):
+                print(f"Skipping missing file in archive: {path}")
+                continue
+            
+            info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+            info.compress_type = compress_type
+            info.external_attr = 0o644 << 16
+            
+            with open_blob(path) as src, zf.open(info, mode="w", force_zip64=True) as dest:
+                while True:
+                    data = src.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    dest.write(data)
+                    chunk = sink.pop()
+                    if chunk:
+                        yield chunk
+            yield sink.pop()
+    yield sink.pop()
@@ -2,15 +2,16 @@ import os
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify, current_app
-from app.models.user import User
+from flask import request, jsonify, current_app, g
+from app.utils.user_cache import load_user_identity
 
-def generate_token(user_id):
+def generate_token(user_id, token_version=0):
     """Generate a JWT token for a user"""
     payload = {
         'exp': datetime.utcnow() + timedelta(days=1),
         'iat': datetime.utcnow(),
-        'user_id': user_id
+        'user_id': user_id,
+        'tv': token_version
     }
     return jwt.encode(
         payload,
@@ -48,15 +49,25 @@ def token_required(f):
                 algorithms=['HS256']
             )
             
-            # Get the user from the database
-            current_user = User.query.get(payload['user_id'])
+            # Get the user's identity, usually from the per-process cache
+            current_user = load_user_identity(payload['user_id'])
             
             if not current_user:
                 return jsonify({
                     'message': 'User not found',
                     'status': 401
                 }), 401
+            
+            # Tokens issued before a password change are no longer valid
+            if payload.get('tv', 0) != current_user.token_version:
+                return jsonify({
+                    'message': 'Authentication token has been revoked',
+                    'status': 401
+                }), 401
                 
+            # Commits of this request count as the user's own writes
+            g.current_user_id = current_user.id
+            
             # Pass the user to the route
             return f(current_user, *args, **kwargs)
             
@@ -0,0 +1,107 @@
+import os
+import re
+import gzip
+import zlib
+from flask import current_app
+
+try:
+    import zstandard
+except ImportError:  # zstd support is optional
+    zstandard = None
+
+# MIME types compressed at rest unless STORAGE_COMPRESSION_TYPES says otherwise
+DEFAULT_COMPRESSIBLE_TYPES = (
+    "text/plain",
+    "text/csv",
+    "text/html",
+    "text/markdown",
+    "application/json",
+    "application/xml",
+)
+
+class GzipCodec:
+    """Gzip storage codec built on zlib"""
+    
+    name = "gzip"
+    suffix = ".gz"
+    
+    def __init__(self, level=6):
+        self.level = level
+    
+    def compressor(self):
+        """Return an object with compress() and flush() producing gzip data"""
+        return zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    
+    def open_reader(self, path):
+        """Open a stored file for reading its decompressed content"""
+        return gzip.open(path, "rb")
+
+class ZstdCodec:
+    """Zstandard storage codec, available when the zstandard package is installed"""
+    
+    name = "zstd"
+    suffix = ".zst"
+    
+    def __init__(self, level=3):
+        self.level = level
+    
+    def compressor(self):
+        """Return an object with compress() and flush() producing a zstd frame"""
+        return zstandard.ZstdCompressor(level=self.level).compressobj()
+    
+    def open_reader(self, path):
+        """Open a stored file for reading its decompressed content"""
+        if zstandard is None:
+            raise RuntimeError("The zstandard package is required to read zstd-compressed files")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+
+# Codecs usable for new blobs
+CODECS = {"gzip": GzipCodec}
+if zstandard is not None:
+    CODECS["zstd"] = ZstdCodec
+
+# Suffixes of every codec that may have written a stored file
+STORED_SUFFIXES = (GzipCodec.suffix, ZstdCodec.suffix)
+
+# Name of a blob compressed at rest: the content digest and the codec suffix.
+# Older uploads kept their original extension, so a plain "report.gz" is raw.
+ENCODED_BLOB_NAME = re.compile(r"^[0-9a-f]{64}(\.gz|\.zst)$")
+
+def get_codec(name, level=None):
+    """Return a codec instance by name, or None if it is not available"""
+    codec_class = CODECS.get(name)
+    if codec_class is None:
+        return None
+    return codec_class(level) if level else codec_class()
+
+def get_storage_codec(content_type):
+    """Return the codec new blobs of this type are compressed with, if any"""
+    name = current_app.config.get("STORAGE_COMPRESSION")
+    if not name:
+        return None
+    
+    types = current_app.config.get("STORAGE_COMPRESSION_TYPES") or DEFAULT_COMPRESSIBLE_TYPES
+    if content_type not in types:
+        return None
+    
+    codec = get_codec(name, current_app.config.get("STORAGE_COMPRESSION_LEVEL"))
+    if codec is None:
+        print(f"Storage compression codec {name} is not available, storing uncompressed")
+    return codec
+
+def get_codec_for_path(path):
+    """Return the codec a blob was compressed with at rest, based on its name"""
+    match = ENCODED_BLOB_NAME.match(os.path.basename(path))
+    if match is None:
+        return None
+    for codec_class in (GzipCodec, ZstdCodec):
+        if match.group(1) == codec_class.suffix:
+            return codec_class()
+    return None
+
+def open_blob(path):
+    """Open a stored file for reading its original, decompressed content"""
+    codec = get_codec_for_path(path)
+    if codec is None:
+        return open(path, "rb")
+    return codec.open_reader(path)
@@ -0,0 +1,281 @@
+import os
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import event, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models.document import Document
+from app.models.document_content import DocumentContent
+from app.utils.extractors import extract_text
+from app.utils.file_handler import resolve_blob_path, get_blob_sha256
+from app.utils.search import SEARCH_CONFIG
+
+# Advisory lock held by whichever process is currently indexing
+INDEX_LOCK_KEY = 7266330201
+DOCUMENTS_ADDED_KEY = "content_index_documents_added"
+
+# Set when new documents are committed, so the indexer picks them up promptly
+_wakeup = threading.Event()
+
+def get_content_hash(file_path):
+    """Return the content hash a document's file is stored under"""
+    return get_blob_sha256(os.path.basename(file_path))
+
+def _stored_content_hash():
+    """SQL equivalent of get_content_hash() for Document.file_path"""
+    return func.split_part(func.regexp_replace(Document.file_path, "^.*/", ""), ".", 1)
+
+def _resolve_path(file_path):
+    if not os.path.isabs(file_path):
+        file_path = os.path.normpath(os.path.join(current_app.root_path, "..", file_path))
+    if not os.path.exists(file_path):
+        file_path = resolve_blob_path(os.path.basename(file_path))
+    return file_path
+
+def get_pending_documents(limit, after_id=0, reindex=False):
+    """Return documents whose file has not been extracted in its current version
+    
+    Pending documents are found through the partial index on content_pending,
+    so polling costs next to nothing while there is nothing to do.
+    """
+    query = db.session.query(Document.id, Document.file_path, Document.file_type).filter(Document.id > after_id)
+    
+    if not reindex:
+        query = query.filter(Document.content_pending)
+    
+    return query.order_by(Document.id).limit(limit).all()
+
+def _content_values(document_id, content_hash, status, text, error, seconds):
+    return {
+        "document_id": document_id,
+        "content_hash": content_hash,
+        "status": status,
+        "body": text,
+        "search_vector": func.to_tsvector(SEARCH_CONFIG, text) if text else None,
+        "error": error,
+        "extract_time": seconds,
+        "extracted_at": datetime.utcnow()
+    }
+
+def _upsert_contents(values):
+    stmt = insert(DocumentContent).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DocumentContent.document_id],
+        set_={
+            column: stmt.excluded[column]
+            for column in ("content_hash", "status", "body", "search_vector", "error", "extract_time", "extracted_at")
+        }
+    )
+    db.session.execute(stmt)
+    
+    # Documents whose current file is now extracted are no longer pending
+    db.session.execute(update(Document).where(
+        Document.id.in_([value["document_id"] for value in values]),
+        Document.content_pending,
+        exists().where(
+            DocumentContent.document_id == Document.id,
+            DocumentContent.content_hash == _stored_content_hash()
+        )
+    ).values(content_pending=False, updated_at=Document.updated_at).execution_options(synchronize_session=False))
+
+def save_contents(results):
+    """Store extraction results, skipping documents deleted in the meantime"""
+    if not results:
+        return
+    
+    # Keep the documents from being deleted until the rows are in
+    existing = {
+        document_id for (document_id,) in db.session.query(Document.id).filter(
+            Document.id.in_([result[0] for result in results])
+        ).with_for_update(key_share=True)
+    }
+    values = [_content_values(*result) for result in results if result[0] in existing]
+    if not values:
+        db.session.commit()
+        return
+    
+    try:
+        _upsert_contents(values)
+        db.session.commit()
+    except Exception as e:
+        # One bad body (e.g. too many lexemes) must not lose the whole batch
+        db.session.rollback()
+        print(f"Error saving extracted content, retrying one by one: {str(e)}")
+        for value in values:
+            try:
+                _upsert_contents([value])
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                _upsert_contents([_content_values(
+                    value["document_id"], value["content_hash"], "failed", None, str(e)[:500], value["extract_time"]
+                )])
+                db.session.commit()
+
+def create_executor(workers=None):
+    """Create the process pool extraction runs in
+    
+    Workers are spawned rather than forked, since the web process has
+    threads and open connections, and run at a lower priority than requests.
+    """
+    workers = workers or current_app.config.get("CONTENT_EXTRACTION_WORKERS") or os.cpu_count()
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=os.nice if hasattr(os, "nice") else None,
+        initargs=(10,) if hasattr(os, "nice") else ()
+    )
+
+def index_documents(get_executor, batch_size=100, reindex=False):
+    """Extract and store text for every pending document
+    
+    get_executor is called for the process pool only once the indexing lock
+    is held, so processes that lose the race never start extraction workers.
+    Returns a Counter of the resulting statuses, or None when another
+    process already holds the indexing lock.
+    """
+    max_chars = current_app.config.get("CONTENT_INDEX_MAX_CHARS", 200_000)
+    counts = Counter()
+    
+    # Behind pgbouncer's transaction pooling a session lock could be taken and
+    # released on different server connections, so hold a transaction lock instead
+    transaction_lock = current_app.config.get("DB_PGBOUNCER", False)
+    
+    with db.engine.connect() as lock_conn:
+        if transaction_lock:
+            lock_conn.begin()
+            locked = lock_conn.execute(select(func.pg_try_advisory_xact_lock(INDEX_LOCK_KEY))).scalar()
+        else:
+            lock_conn = lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+            locked = lock_conn.execute(select(func.pg_try_advisory_lock(INDEX_LOCK_KEY))).scalar()
+        if not locked:
+            return None
+        
+        try:
+            executor = get_executor()
+            last_id = 0
+            while True:
+                documents = get_pending_documents(batch_size, last_id, reindex)
+                # Don't hold a transaction open while the pool works
+                db.session.commit()
+                if not documents:
+                    break
+                last_id = documents[-1].id
+                
+                results = []
+                futures = {}
+                for document in documents:
+                    content_hash = get_content_hash(document.file_path)
+                    path = _resolve_path(document.file_path)
+                    if not os.path.exists(path):
+                        results.append((document.id, content_hash, "failed", None, "File not found", None))
+                        continue
+                    future = executor.submit(extract_text, path, document.file_type, max_chars)
+                    futures[future] = (document.id, content_hash)
+                
+                for future in as_completed(futures):
+                    document_id, content_hash = futures[future]
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as e:
+                        result = ("failed", None, str(e)[:500], None)
+                    results.append((document_id, content_hash, *result))
+                
+                save_contents(results)
+                counts.update(result[2] for result in results)
+        finally:
+            if transaction_lock:
+                lock_conn.rollback()
+            else:
+                lock_conn.execute(select(func.pg_advisory_unlock(INDEX_LOCK_KEY)))
+    
+    return counts
+
+def notify_documents_changed():
+    """Wake the background indexer"""
+    _wakeup.set()
+
+@event.listens_for(Document, "before_update")
+def _mark_replaced_file_pending(mapper, connection, target):
+    """Extract a document's file again when it points to a different one"""
+    if db.inspect(target).attrs.file_path.history.has_changes():
+        target.content_pending = True
+
+@event.listens_for(Session, "after_flush")
+def _track_added_documents(session, flush_context):
+    """Remember whether a transaction adds documents that need extracting"""
+    if any(isinstance(obj, Document) for obj in session.new):
+        session.info[DOCUMENTS_ADDED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _wake_indexer(session):
+    if session.info.pop(DOCUMENTS_ADDED_KEY, False):
+        notify_documents_changed()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_added_documents(session):
+    session.info.pop(DOCUMENTS_ADDED_KEY, None)
+
+def start_content_indexer(app):
+    """Start a daemon thread that extracts text from new and changed files
+    
+    Uploads only wake the thread, so they don't wait on extraction. Every
+    process serving requests runs the thread from its first request on, but
+    an advisory lock lets one index at a time, and only the process holding
+    it starts the extraction pool.
+    """
+    if not app.config.get("CONTENT_INDEXING"):
+        return None
+    interval = app.config.get("CONTENT_INDEX_INTERVAL", 60)
+    
+    executor = None
+    
+    def get_executor():
+        nonlocal executor
+        if executor is None:
+            executor = create_executor()
+        return executor
+    
+    def run():
+        nonlocal executor
+        while True:
+            _wakeup.wait(interval)
+            _wakeup.clear()
+            with app.app_context():
+                try:
+                    counts = index_documents(get_executor)
+                    if counts:
+                        print(f"Indexed document contents: {dict(counts)}")
+                    elif counts is None and executor is not None:
+                        # Another process took over indexing, so free the idle workers
+                        executor.shutdown(wait=False)
+                        executor = None
+                except BrokenProcessPool as e:
+                    print(f"Content extraction pool died, restarting: {str(e)}")
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    executor = None
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error indexing document contents: {str(e)}")
+    
+    thread = threading.Thread(target=run, name="content-indexer", daemon=True)
+    start_lock = threading.Lock()
+    
+    # CLI commands like flask db upgrade create the app too but never serve
+    # a request, so the thread only starts in processes that do
+    def start_thread():
+        if thread.ident is None:
+            with start_lock:
+                if thread.ident is None:
+                    thread.start()
+    
+    app.before_request(start_thread)
+    return thread
@@ -0,0 +1,148 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.util import find_tables
+from app import db
+from app.session import reading_from_replica
+
+PENDING_COUNT_CHANGES_KEY = "count_cache_changes"
+
+# (sql, params) -> (tables, count, unfiltered, expires_at), least recently used first
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+def _tables_of(statement):
+    return frozenset(
+        table.name for table in find_tables(statement, include_joins=True, include_selects=True)
+        if hasattr(table, "name")
+    )
+
+def _cache_key(statement):
+    compiled = statement.compile(dialect=db.engine.dialect)
+    return str(compiled), repr(sorted(compiled.params.items()))
+
+def _get_cached(key):
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None:
+            return None
+        if entry[3] < time.monotonic():
+            del _cache[key]
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+def _set_cached(key, tables, count, unfiltered):
+    ttl = current_app.config.get("COUNT_CACHE_TTL", 60)
+    size = current_app.config.get("COUNT_CACHE_SIZE", 256)
+    if not ttl or not size:
+        return
+    with _lock:
+        _cache[key] = (tables, count, unfiltered, time.monotonic() + ttl)
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+
+def estimate_rows(statement):
+    """Return the planner's row estimate for a SELECT without running it"""
+    compiled = statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection(bind_arguments={"clause": statement}).exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def count_rows(query, exact=False):
+    """Count the rows of a listing query, as cheaply as the request allows
+    
+    Rows are always counted when ``exact`` is set. Otherwise counts come
+    from the cache when possible, small results are counted exactly and
+    cached, and results the planner expects to be larger than
+    COUNT_ESTIMATE_THRESHOLD get its estimate instead. Cached counts and
+    estimates are reported as inexact. Returns ``(total, is_exact)``.
+    """
+    statement = query.order_by(None).statement
+    key = _cache_key(statement)
+    
+    # Writes through other workers don't invalidate this worker's cache,
+    # so a cached count may be stale by up to COUNT_CACHE_TTL
+    cached = None if exact else _get_cached(key)
+    if cached is not None:
+        return cached, False
+    
+    unfiltered = statement.whereclause is None
+    if not exact and not unfiltered:
+        threshold = current_app.config.get("COUNT_ESTIMATE_THRESHOLD", 10000)
+        estimate = estimate_rows(statement)
+        if estimate > threshold:
+            return estimate, False
+    
+    total = db.session.execute(select(func.count()).select_from(statement.subquery())).scalar()
+    # Replica counts may predate a commit that already invalidated the cache
+    if not reading_from_replica(db.session):
+        _set_cached(key, _tables_of(statement), total, unfiltered)
+    return total, True
+
+def invalidate_counts(tables, deltas=None):
+    """Forget cached counts that involve the given tables
+    
+    Unfiltered counts of a table with a known row delta are adjusted in
+    place instead, so plain listings stay cached while rows come and go.
+    """
+    deltas = deltas or {}
+    with _lock:
+        for key, (entry_tables, count, unfiltered, expires_at) in list(_cache.items()):
+            if not entry_tables & tables:
+                continue
+            if unfiltered and len(entry_tables) == 1:
+                (table,) = entry_tables
+                if table in deltas:
+                    _cache[key] = (entry_tables, max(count + deltas[table], 0), unfiltered, expires_at)
+                    continue
+            del _cache[key]
+
+def _pending_changes(session):
+    return session.info.setdefault(PENDING_COUNT_CHANGES_KEY, {"tables": set(), "deltas": {}, "unknown": set()})
+
+@event.listens_for(Session, "after_flush")
+def _track_row_changes(session, flush_context):
+    """Record which tables a transaction inserts into, updates or deletes from"""
+    if not (session.new or session.deleted or session.dirty):
+        return
+    changes = _pending_changes(session)
+    for obj in session.new:
+        table = obj.__table__.name
+        changes["tables"].add(table)
+        changes["deltas"][table] = changes["deltas"].get(table, 0) + 1
+    for obj in session.deleted:
+        table = obj.__table__.name
+        changes["tables"].add(table)
+        changes["deltas"][table] = changes["deltas"].get(table, 0) - 1
+    for obj in session.dirty:
+        changes["tables"].add(obj.__table__.name)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_changes(orm_execute_state):
+    """Record tables changed by ORM-enabled insert/update/delete statements"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = orm_execute_state.statement.table.name
+        changes = _pending_changes(orm_execute_state.session)
+        changes["tables"].add(table)
+        # Row counts of bulk statements aren't known up front
+        changes["unknown"].add(table)
+
+@event.listens_for(Session, "after_commit")
+def _apply_row_changes(session):
+    changes = session.info.pop(PENDING_COUNT_CHANGES_KEY, None)
+    if changes:
+        deltas = {table: delta for table, delta in changes["deltas"].items() if table not in changes["unknown"]}
+        invalidate_counts(changes["tables"], deltas)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_row_changes(session):
+    session.info.pop(PENDING_COUNT_CHANGES_KEY, None)
@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool, NullPool
+
+# Checkouts waiting longer than this are counted as slow
+SLOW_CHECKOUT_SECONDS = 0.1
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait and how busy the pool gets"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.slow_checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+    
+    def recreate(self):
+        # Keep the telemetry class when SQLAlchemy rebuilds the pool after a disconnect
+        pool = super().recreate()
+        pool.checkouts = self.checkouts
+        pool.wait_total = self.wait_total
+        pool.wait_max = self.wait_max
+        pool.slow_checkouts = self.slow_checkouts
+        pool.timeouts = self.timeouts
+        pool.peak_checked_out = self.peak_checked_out
+        return pool
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+            if waited > SLOW_CHECKOUT_SECONDS:
+                self.slow_checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checkedout())
+        return connection
+
+def _env_bool(environ, name, default):
+    return environ.get(name, str(default)).lower() == "true"
+
+def get_engine_options(database_url, environ=os.environ):
+    """Build SQLALCHEMY_ENGINE_OPTIONS from DB_* environment variables
+    
+    With DB_PGBOUNCER=true the app expects a pgbouncer in transaction
+    pooling mode: the local pool only holds a few client connections to
+    pgbouncer, and no startup parameters are sent, since pgbouncer rejects
+    them. The statement timeout is applied per transaction instead.
+    """
+    if not database_url or database_url.startswith("sqlite"):
+        return {}
+    
+    pgbouncer = _env_bool(environ, "DB_PGBOUNCER", False)
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": int(environ.get("DB_POOL_SIZE", 2 if pgbouncer else 5)),
+        "max_overflow": int(environ.get("DB_MAX_OVERFLOW", 2 if pgbouncer else 10)),
+        "pool_timeout": int(environ.get("DB_POOL_TIMEOUT", 10)),
+        "pool_recycle": int(environ.get("DB_POOL_RECYCLE", 1800)),
+        "pool_pre_ping": _env_bool(environ, "DB_POOL_PRE_PING", True),
+        "connect_args": {"connect_timeout": int(environ.get("DB_CONNECT_TIMEOUT", 10))},
+    }
+    if environ.get("DB_POOL_SIZE") == "0":
+        # Open a connection per checkout, e.g. when pgbouncer does all the pooling
+        options = {key: value for key, value in options.items() if key not in ("pool_size", "max_overflow", "pool_timeout")}
+        options["poolclass"] = NullPool
+    
+    statement_timeout = int(environ.get("DB_STATEMENT_TIMEOUT", 0))
+    if statement_timeout and not pgbouncer:
+        options["connect_args"]["options"] = f"-c statement_timeout={statement_timeout}"
+    return options
+
+def configure_engine(engine, config):
+    """Install per-transaction settings that can't be sent as startup parameters"""
+    statement_timeout = config.get("DB_STATEMENT_TIMEOUT")
+    if not statement_timeout or not config.get("DB_PGBOUNCER"):
+        return
+    
+    @event.listens_for(engine, "begin")
+    def _set_statement_timeout(conn):
+        # SET LOCAL ends with the transaction, so it never leaks to other clients of pgbouncer
+        if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            conn.exec_driver_sql(f"SET LOCAL statement_timeout = {int(statement_timeout)}")
+
+def get_pool_stats(engine):
+    """Return checkout wait times and utilization of this process's connection pool"""
+    pool = engine.pool
+    stats = {"poolClass": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update({
+            "size": pool.size(),
+            "maxOverflow": pool._max_overflow,
+            "checkedOut": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "utilization": round(pool.checkedout() / capacity, 4) if capacity > 0 else None,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "peakCheckedOut": pool.peak_checked_out,
+                "checkouts": pool.checkouts,
+                "waitAvgMs": round(pool.wait_total / pool.checkouts * 1000, 3) if pool.checkouts else None,
+                "waitMaxMs": round(pool.wait_max * 1000, 3),
+                "slowCheckouts": pool.slow_checkouts,
+                "timeouts": pool.timeouts,
+            })
+    return stats
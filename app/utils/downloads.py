@@ -0,0 +1,229 @@
+import os
+import re
+import uuid
+import unicodedata
+from datetime import timezone
+from urllib.parse import quote
+from flask import request, current_app
+from werkzeug.datastructures import Headers
+from werkzeug.wsgi import wrap_file
+from app.utils.codecs import get_codec_for_path
+
+# Blob names are the hex SHA-256 of the content
+BLOB_NAME_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Requests asking for more ranges than this get the whole file instead
+MAX_RANGES = 16
+
+def make_etag(name, size, modified):
+    """Return a strong validator for a stored file
+    
+    Content-addressed files use their hash; older files fall back to the
+    size and modification timestamp.
+    """
+    sha256 = name.split(".", 1)[0]
+    if BLOB_NAME_RE.match(sha256):
+        return sha256
+    return f"{size:x}-{int(modified):x}"
+
+def get_document_etag(document):
+    """Return the validator for the stored content of a document"""
+    return make_etag(
+        os.path.basename(document.file_path),
+        document.file_size,
+        document.updated_at.timestamp()
+    )
+
+def _content_disposition(headers, download_name):
+    """Set an attachment Content-Disposition that survives non-ASCII names"""
+    try:
+        download_name.encode("ascii")
+        value = {"filename": download_name}
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        value = {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    headers.set("Content-Disposition", "attachment", **value)
+
+def _is_not_modified(etag, last_modified):
+    """Evaluate If-None-Match and If-Modified-Since against the validators"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified:
+        return last_modified <= request.if_modified_since
+    return False
+
+def _range_applies(etag, last_modified):
+    """Honour If-Range so clients never stitch together different versions"""
+    if_range = request.if_range
+    if if_range.etag:
+        return if_range.etag == etag
+    if if_range.date:
+        return last_modified is not None and last_modified <= if_range.date
+    return True
+
+def _resolve_ranges(size):
+    """Turn the Range header into absolute (start, stop) pairs
+    
+    Returns None when the whole file should be sent and an empty list when
+    no requested range can be satisfied.
+    """
+    rng = request.range
+    if rng is None or rng.units != "bytes" or len(rng.ranges) > MAX_RANGES:
+        return None
+    
+    ranges = []
+    for start, stop in rng.ranges:
+        if start < 0:
+            start, stop = max(size + start, 0), size
+        else:
+            stop = size if stop is None else min(stop, size)
+        if start < stop:
+            ranges.append((start, stop))
+    return ranges
+
+def _iter_file_range(path, start, stop, chunk_size=64 * 1024):
+    """Yield the bytes of a file between start and stop"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = stop - start
+        while remaining > 0:
+            data = f.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+
+def _iter_multipart_ranges(path, ranges, size, mimetype, boundary):
+    """Yield a multipart/byteranges body for several ranges"""
+    for start, stop in ranges:
+        yield (
+            f"\r\n--{boundary}\r\n"
+            f"Content-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+        ).encode("latin-1")
+        yield from _iter_file_range(path, start, stop)
+    yield f"\r\n--{boundary}--\r\n".encode("latin-1")
+
+def _iter_decoded_file(path, codec, chunk_size=64 * 1024):
+    """Yield the decompressed content of a stored file"""
+    with codec.open_reader(path) as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            yield data
+
+def _offload_header(path):
+    """Return the header handing the transfer to the proxy, if enabled
+    
+    ``x-accel-redirect`` maps the file to an internal nginx location under
+    DOWNLOAD_OFFLOAD_PREFIX, ``x-sendfile`` passes the absolute path for
+    Apache or lighttpd. Files outside UPLOAD_FOLDER are never offloaded.
+    """
+    mode = (current_app.config.get("DOWNLOAD_OFFLOAD") or "").lower()
+    if mode not in ("x-sendfile", "x-accel-redirect"):
+        return None
+    
+    upload_folder = os.path.abspath(current_app.config["UPLOAD_FOLDER"])
+    relative_path = os.path.relpath(os.path.abspath(path), upload_folder)
+    if relative_path == os.pardir or relative_path.startswith(os.pardir + os.sep):
+        return None
+    
+    if mode == "x-sendfile":
+        return "X-Sendfile", os.path.abspath(path)
+    
+    prefix = current_app.config.get("DOWNLOAD_OFFLOAD_PREFIX", "/protected-uploads/")
+    return "X-Accel-Redirect", prefix.rstrip("/") + "/" + quote(relative_path.replace(os.sep, "/"))
+
+def send_document_file(path, mimetype, download_name, etag, last_modified, size, headers=None):
+    """Send a stored file with validators, byte ranges and cheap HEAD support
+    
+    Answers conditional requests with 304, single ranges with 206, several
+    ranges with a multipart/byteranges 206 and unsatisfiable ranges with 416.
+    HEAD requests only get the headers and never open the file. When
+    DOWNLOAD_OFFLOAD is set, the bytes are streamed by the reverse proxy
+    instead, which also takes care of the ranges.
+    
+    Files compressed at rest are sent as-is with Content-Encoding to clients
+    that accept the codec, and decompressed on the fly (without range
+    support) for the others.
+    """
+    response_class = current_app.response_class
+    headers = Headers(headers or {})
+    if last_modified is not None and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=timezone.utc)
+    last_modified = last_modified.replace(microsecond=0) if last_modified else None
+    
+    # Pick the representation of files compressed at rest
+    codec = get_codec_for_path(path)
+    decode = False
+    if codec is not None:
+        headers["Vary"] = "Accept-Encoding"
+        if request.accept_encodings.quality(codec.name) > 0:
+            headers["Content-Encoding"] = codec.name
+            etag = f"{etag}-{codec.name}"
+            size = os.path.getsize(path)
+        else:
+            decode = True
+    
+    headers["Accept-Ranges"] = "none" if decode else "bytes"
+    if "Cache-Control" not in headers:
+        headers["Cache-Control"] = "private, no-cache"
+    _content_disposition(headers, download_name)
+    
+    response = response_class(None, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    
+    if _is_not_modified(etag, last_modified):
+        response.status_code = 304
+        response.headers.remove("Content-Disposition")
+        return response
+    
+    if decode:
+        response.status_code = 200
+        response.content_length = size
+        if request.method != "HEAD":
+            response.response = _iter_decoded_file(path, codec)
+        return response
+    
+    # The proxy would drop Content-Encoding, so compressed files stay in-process
+    offload = _offload_header(path) if codec is None else None
+    if offload:
+        header, value = offload
+        response.status_code = 200
+        response.headers[header] = value
+        response.automatically_set_content_length = False
+        return response
+    
+    ranges = _resolve_ranges(size) if _range_applies(etag, last_modified) else None
+    
+    if ranges == []:
+        response.status_code = 416
+        response.headers["Content-Range"] = f"bytes */{size}"
+        response.headers.remove("Content-Disposition")
+        return response
+    
+    if ranges is None:
+        response.status_code = 200
+        response.content_length = size
+        if request.method != "HEAD":
+            response.response = wrap_file(request.environ, open(path, "rb"))
+            response.direct_passthrough = True
+        return response
+    
+    response.status_code = 206
+    if len(ranges) == 1:
+        start, stop = ranges[0]
+        response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+        response.content_length = stop - start
+        if request.method != "HEAD":
+            response.response = _iter_file_range(path, start, stop)
+        return response
+    
+    boundary = uuid.uuid4().hex
+    response.headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+    if request.method != "HEAD":
+        response.response = _iter_multipart_ranges(path, ranges, size, mimetype, boundary)
+    return response
@@ -0,0 +1,129 @@
+import io
+import time
+import zipfile
+from xml.etree import ElementTree
+from app.utils.codecs import open_blob
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDF extraction is optional
+    PdfReader = None
+
+WORD_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+SHEET_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+class UnsupportedContent(Exception):
+    """Raised when no extractor can read a file type"""
+
+def _read_limited(stream, max_chars):
+    """Decode a text stream, stopping once max_chars have been read"""
+    reader = io.TextIOWrapper(stream, encoding="utf-8", errors="replace")
+    return reader.read(max_chars)
+
+def extract_plain_text(stream, max_chars):
+    """Read TXT and CSV files, whose bytes are already the text"""
+    return _read_limited(stream, max_chars)
+
+def extract_pdf(stream, max_chars):
+    """Extract the text layer of each page of a PDF"""
+    if PdfReader is None:
+        raise UnsupportedContent("pypdf is not installed")
+    
+    reader = PdfReader(stream)
+    parts = []
+    length = 0
+    for page in reader.pages:
+        text = page.extract_text() or ""
+        parts.append(text)
+        length += len(text)
+        if length >= max_chars:
+            break
+    return "\n".join(parts)
+
+def _iter_xml_text(archive, member, text_tag, break_tag):
+    """Yield the text of ``text_tag`` elements, with a newline after each ``break_tag``"""
+    with archive.open(member) as f:
+        for event, element in ElementTree.iterparse(f, events=("end",)):
+            if element.tag == text_tag and element.text:
+                yield element.text
+            elif element.tag == break_tag:
+                yield "\n"
+                # Paragraphs and cells are done with, keep memory flat
+                element.clear()
+
+def _collect(chunks, max_chars):
+    parts = []
+    length = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= max_chars:
+            break
+    return "".join(parts)
+
+def extract_docx(stream, max_chars):
+    """Extract paragraph text from a Word document"""
+    with zipfile.ZipFile(stream) as archive:
+        return _collect(
+            _iter_xml_text(archive, "word/document.xml", f"{WORD_NS}t", f"{WORD_NS}p"),
+            max_chars
+        )
+
+def extract_xlsx(stream, max_chars):
+    """Extract cell text from an Excel workbook
+    
+    Text cells live in the shared strings table; inline strings are read
+    from the worksheets themselves. Numeric cells are not indexed.
+    """
+    with zipfile.ZipFile(stream) as archive:
+        names = archive.namelist()
+        members = [("xl/sharedStrings.xml", f"{SHEET_NS}si")] if "xl/sharedStrings.xml" in names else []
+        members += [
+            (name, f"{SHEET_NS}c") for name in sorted(names)
+            if name.startswith("xl/worksheets/") and name.endswith(".xml")
+        ]
+        
+        def chunks():
+            for member, break_tag in members:
+                yield from _iter_xml_text(archive, member, f"{SHEET_NS}t", break_tag)
+        
+        return _collect(chunks(), max_chars)
+
+EXTRACTORS = {
+    "text/plain": extract_plain_text,
+    "text/csv": extract_plain_text,
+    "application/pdf": extract_pdf,
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": extract_docx,
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": extract_xlsx,
+}
+
+def extract_text(path, file_type, max_chars):
+    """Extract up to max_chars of searchable text from a stored file
+    
+    Runs in the extraction process pool, so it only takes plain values
+    and does not touch the app or the database. Returns
+    ``(status, text, error, seconds)`` where status is "indexed", "empty",
+    "unsupported" or "failed".
+    """
+    extractor = EXTRACTORS.get(file_type)
+    if extractor is None:
+        return "unsupported", None, None, 0.0
+    
+    start = time.perf_counter()
+    try:
+        with open_blob(path) as f:
+            # Zip based formats need to seek, which decompressing readers can't
+            if extractor in (extract_docx, extract_xlsx, extract_pdf) and not f.seekable():
+                f = io.BytesIO(f.read())
+            text = extractor(f, max_chars)
+    except UnsupportedContent as e:
+        return "unsupported", None, str(e), time.perf_counter() - start
+    except Exception as e:
+        return "failed", None, str(e)[:500], time.perf_counter() - start
+    elapsed = time.perf_counter() - start
+    
+    # Postgres text can't hold NUL characters
+    text = text[:max_chars].replace("\x00", "").strip()
+    if not text:
+        return "empty", None, None, elapsed
+    return "indexed", text, None, elapsed
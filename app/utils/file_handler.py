@@ -1,63 +1,338 @@
 import os
-import uuid
-from werkzeug.utils import secure_filename
+import time
+import hashlib
+import tempfile
+from datetime import datetime
 from flask import current_app
+from sqlalchemy import event, update, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+from app import db
+from app.models.blob import Blob
+from app.models.document import Document
+from app.utils.codecs import get_storage_codec, get_codec_for_path, STORED_SUFFIXES
+
+# Size of the chunks copied between streams and disk
+CHUNK_SIZE = 64 * 1024
+
+# Session key holding files to remove once the transaction commits
+PENDING_UNLINKS_KEY = "pending_unlinks"
+# Session key holding blobs placed by the transaction, removed again if it rolls back
+PLACED_BLOBS_KEY = "placed_blobs"
+
+# First key of the per-blob advisory locks; the second is the hash of the digest
+BLOB_LOCK_NAMESPACE = 2081
 
 def allowed_file(filename):
     """Check if a file has an allowed extension"""
     # Accept all file types
     return '.' in filename
 
-def save_file(file):
-    """Save a file to disk and return its filename and path"""
-    if not file or not allowed_file(file.filename):
-        return None, None, None
-    
-    # Create a unique filename
-    original_filename = secure_filename(file.filename)
-    ext = original_filename.rsplit('.', 1)[1].lower() if '.' in original_filename else ''
-    new_filename = f"{uuid.uuid4().hex}.{ext}" if ext else f"{uuid.uuid4().hex}"
+def get_blob_path(blob_name):
+    """Return the absolute path of a blob inside the upload folder
     
-    # Get the upload folder path
+    Files are fanned out over two directory levels taken from the start of
+    their name (``ab/cd/abcd...``) so no directory grows too large.
+    """
     upload_folder = current_app.config['UPLOAD_FOLDER']
+    return os.path.abspath(os.path.join(upload_folder, blob_name[:2], blob_name[2:4], blob_name))
+
+def get_flat_path(blob_name):
+    """Return the path a file had in the original flat upload folder"""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    return os.path.abspath(os.path.join(upload_folder, blob_name))
+
+def resolve_blob_path(blob_name):
+    """Return where a file currently lives, preferring the sharded layout"""
+    path = get_blob_path(blob_name)
+    if not os.path.exists(path) and os.path.exists(get_flat_path(blob_name)):
+        return get_flat_path(blob_name)
+    return path
+
+def get_blob_sha256(blob_name):
+    """Return the content hash part of a stored file name"""
+    return blob_name.split('.', 1)[0]
+
+class BlobWriter:
+    """Write bytes into the content-addressed blob store
+    
+    Data is written to a temporary file next to the blobs while its SHA-256
+    is computed. Once complete, acquire_blobs renames it to the digest while
+    holding the blob's lock. Identical content always ends up at the same
+    path, so it is stored only once. Types covered by STORAGE_COMPRESSION are
+    compressed on the way to disk and get the codec suffix appended to their
+    name; the hash is always of the original content.
+    """
     
-    # Ensure the upload folder exists
-    os.makedirs(upload_folder, exist_ok=True)
+    def __init__(self, content_type=None):
+        upload_folder = current_app.config['UPLOAD_FOLDER']
+        os.makedirs(upload_folder, exist_ok=True)
+        
+        fd, self.temp_path = tempfile.mkstemp(prefix='.upload-', dir=upload_folder)
+        self._file = os.fdopen(fd, 'wb')
+        self._hash = hashlib.sha256()
+        self.codec = get_storage_codec(content_type)
+        self._compressor = self.codec.compressor() if self.codec else None
+        self.content_type = content_type
+        self.size = 0
+        self.stored_size = 0
+        self.compress_time = 0.0
+        self.sha256 = None
+        self.file_path = None
     
-    # Create the path where the file will be saved
-    file_path = os.path.join(upload_folder, new_filename)
+    def write(self, chunk):
+        """Append a chunk of data to the blob"""
+        self._hash.update(chunk)
+        self.size += len(chunk)
+        if self._compressor is not None:
+            started = time.thread_time()
+            chunk = self._compressor.compress(chunk)
+            self.compress_time += time.thread_time() - started
+        self._file.write(chunk)
+        self.stored_size += len(chunk)
     
-    # Store the absolute path for better compatibility with send_file
-    abs_path = os.path.abspath(file_path)
+    def hexdigest(self):
+        """Return the SHA-256 of the data written so far"""
+        return self._hash.hexdigest()
     
-    print(f"Saving file {new_filename} to path: {abs_path}")
+    def commit(self):
+        """Finish writing the data and return its SHA-256
+        
+        The data stays in the temporary file until the blob is acquired.
+        """
+        if self._compressor is not None:
+            started = time.thread_time()
+            tail = self._compressor.flush()
+            self.compress_time += time.thread_time() - started
+            self._file.write(tail)
+            self.stored_size += len(tail)
+        self._file.close()
+        
+        self.sha256 = self.hexdigest()
+        return self.sha256
     
-    # Save the file
-    file.save(abs_path)
+    def place(self):
+        """Move the committed data to its content address and return the path
+        
+        Callers must hold the blob's lock, so a concurrent release can't
+        remove the file between placing and referencing it.
+        """
+        if self.file_path is not None:
+            return self.file_path
+        suffix = self.codec.suffix if self.codec else ''
+        
+        # Reuse the content if it is already stored with another encoding
+        for other_suffix in ('',) + STORED_SUFFIXES:
+            other_path = get_blob_path(self.sha256 + other_suffix)
+            if other_suffix != suffix and os.path.exists(other_path):
+                os.remove(self.temp_path)
+                self.codec = get_codec_for_path(other_path)
+                self.stored_size = os.path.getsize(other_path)
+                self.file_path = other_path
+                return self.file_path
+        
+        file_path = get_blob_path(self.sha256 + suffix)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        os.chmod(self.temp_path, 0o644)
+        
+        # Renaming over an existing blob is safe because the content is identical
+        os.replace(self.temp_path, file_path)
+        self.file_path = file_path
+        return self.file_path
+    
+    def abort(self):
+        """Discard data that has not been placed in the blob store"""
+        if self.file_path is not None:
+            return
+        self._file.close()
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None or self.sha256 is None:
+            self.abort()
+        return False
+
+def lock_blobs(session, sha256s):
+    """Take the transaction-level locks of blobs, in a fixed order to avoid deadlocks"""
+    for sha256 in sorted(set(sha256s)):
+        session.execute(select(func.pg_advisory_xact_lock(BLOB_LOCK_NAMESPACE, func.hashtext(sha256))))
+
+def acquire_blobs(writers):
+    """Place each committed blob in the store and add a reference to it
+    
+    The blobs stay locked until the current transaction ends, and all
+    references are added with a single upsert. The change becomes durable
+    when the caller commits together with the documents that reference the
+    blobs; if it rolls back instead, files nothing else references are
+    removed again.
+    """
+    if not writers:
+        return
+    
+    try:
+        lock_blobs(db.session, [writer.sha256 for writer in writers])
+        placed = db.session.info.setdefault(PLACED_BLOBS_KEY, {})
+        for writer in writers:
+            placed.setdefault(writer.sha256, set()).add(writer.place())
+    except Exception:
+        for writer in writers:
+            writer.abort()
+        raise
+    
+    # One row per blob, a statement cannot update the same row twice
+    rows = {}
+    for writer in writers:
+        row = rows.get(writer.sha256)
+        if row is not None:
+            row["ref_count"] += 1
+            continue
+        rows[writer.sha256] = {
+            "sha256": writer.sha256,
+            "file_path": writer.file_path,
+            "size": writer.size,
+            "stored_size": writer.stored_size,
+            "encoding": writer.codec.name if writer.codec else None,
+            "content_type": writer.content_type,
+            "compress_time": writer.compress_time,
+            "ref_count": 1,
+            "created_at": datetime.utcnow()
+        }
+    
+    stmt = insert(Blob).values(list(rows.values()))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Blob.sha256],
+        set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count}
+    )
+    db.session.execute(stmt)
+
+def acquire_blob(writer):
+    """Add a reference to a committed blob, registering it if it is new"""
+    acquire_blobs([writer])
+
+def get_blob_info(writer):
+    """Return the filename, path, URL and size of a committed blob"""
+    filename = os.path.basename(writer.file_path)
     
     # Generate a URL for the file
-    file_url = f"/api/documents/{new_filename}/download"
+    file_url = f"/api/documents/{filename}/download"
     
     # Return both the absolute path that can be used directly with send_file
-    return new_filename, abs_path, file_url
+    return filename, writer.file_path, file_url, writer.size
 
-def delete_file(filename):
-    """Delete a file from disk"""
+def register_blob(writer):
+    """Reference a committed blob and return its filename, path, URL and size"""
+    acquire_blob(writer)
+    return get_blob_info(writer)
+
+def write_file(file):
+    """Write an uploaded file to the blob store without referencing it
+    
+    Returns the committed BlobWriter, or None if the file is not allowed.
+    """
+    if not file or not allowed_file(file.filename):
+        return None
+    
+    # Stream the upload into the blob store while hashing it
+    with BlobWriter(get_file_type(file.filename)) as writer:
+        while True:
+            chunk = file.stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            writer.write(chunk)
+        writer.commit()
+    
+    return writer
+
+def save_file(file):
+    """Save a file to the blob store and return its filename, path, URL and size"""
+    writer = write_file(file)
+    if writer is None:
+        return None, None, None, None
+    
+    return register_blob(writer)
+
+def release_file(session, filename):
+    """Drop a reference to a stored file in the session's transaction
+    
+    Returns True if nothing references the file anymore; it is then removed
+    from disk once the transaction commits.
+    """
     if not filename:
         return False
     
-    file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-    abs_path = os.path.abspath(file_path)
+    # Drop one reference if the file lives in the blob store
+    sha256 = get_blob_sha256(filename)
+    lock_blobs(session, [sha256])
+    remaining = session.execute(
+        update(Blob)
+        .where(Blob.sha256 == sha256)
+        .values(ref_count=Blob.ref_count - 1)
+        .returning(Blob.ref_count)
+    ).scalar()
     
-    try:
-        if os.path.exists(abs_path):
-            os.remove(abs_path)
-            return True
-    except Exception as e:
-        print(f"Error deleting file: {str(e)}")
-        return False
+    if remaining is not None:
+        if remaining > 0:
+            return False
+        session.execute(delete(Blob).where(Blob.sha256 == sha256, Blob.ref_count <= 0))
     
-    return False
+    # Unlink only once the transaction that released the file has committed,
+    # covering files not yet moved out of the flat layout
+    paths = session.info.setdefault(PENDING_UNLINKS_KEY, {}).setdefault(sha256, set())
+    paths.add(get_blob_path(filename))
+    paths.add(get_flat_path(filename))
+    return True
+
+def delete_file(filename):
+    """Release a file, removing it from disk once nothing references it"""
+    return release_file(db.session, filename)
+
+def remove_unreferenced_files(paths_by_sha256):
+    """Remove stored files whose blob has no row, under each blob's lock
+    
+    Runs after the transaction that released or placed the files has
+    ended, so a concurrent upload of the same content either registered its
+    row before the check or places the file again after the removal.
+    """
+    for sha256, paths in paths_by_sha256.items():
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(select(func.pg_advisory_xact_lock(BLOB_LOCK_NAMESPACE, func.hashtext(sha256))))
+                if conn.execute(select(Blob.sha256).where(Blob.sha256 == sha256)).first() is not None:
+                    continue
+                for abs_path in paths:
+                    if os.path.exists(abs_path):
+                        os.remove(abs_path)
+        except Exception as e:
+            print(f"Error deleting file: {str(e)}")
+
+@event.listens_for(Session, "after_flush")
+def _release_deleted_documents(session, flush_context):
+    """Release the file of every deleted document, however it was deleted"""
+    for obj in list(session.deleted):
+        if isinstance(obj, Document) and obj.file_path:
+            release_file(session, os.path.basename(obj.file_path))
+
+@event.listens_for(Session, "after_commit")
+def _unlink_released_files(session):
+    """Remove files released by a committed transaction"""
+    session.info.pop(PLACED_BLOBS_KEY, None)
+    released = session.info.pop(PENDING_UNLINKS_KEY, None)
+    if released:
+        remove_unreferenced_files(released)
+
+@event.listens_for(Session, "after_rollback")
+def _remove_placed_files(session):
+    """Keep files whose release was rolled back, but drop blobs placed for nothing"""
+    session.info.pop(PENDING_UNLINKS_KEY, None)
+    placed = session.info.pop(PLACED_BLOBS_KEY, None)
+    if placed:
+        remove_unreferenced_files(placed)
 
 def get_file_type(filename):
     """Get the MIME type of a file based on its extension"""
@@ -0,0 +1,109 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from sqlalchemy import tuple_, cast, literal, BigInteger
+
+class InvalidCursor(ValueError):
+    """Raised for cursors that are malformed or belong to another ordering"""
+
+def wants_cursor(args):
+    """Whether a listing request asked for cursor instead of page pagination"""
+    return "cursor" in args or args.get("pagination") == "cursor"
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def _matches_type(value, key):
+    """Whether a decoded cursor value can be compared with a sort key in SQL"""
+    try:
+        expected = key.type.python_type
+    except NotImplementedError:
+        return True
+    if isinstance(value, bool):
+        return expected is bool
+    if expected is float:
+        return isinstance(value, (int, float))
+    if expected is int:
+        limit = 2 ** 63 if isinstance(key.type, BigInteger) else 2 ** 31
+        return isinstance(value, int) and -limit <= value < limit
+    if expected is str:
+        return isinstance(value, str) and "\x00" not in value
+    return isinstance(value, expected)
+
+def encode_cursor(ordering, values, direction):
+    """Build an opaque cursor pointing before or after a row's sort values"""
+    payload = {"o": ordering, "v": [_encode_value(value) for value in values], "d": direction}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor, ordering):
+    """Return ``(values, direction)`` from a cursor made for the same ordering"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(value) for value in payload["v"]]
+        direction = payload["d"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor("Invalid cursor")
+    
+    if payload.get("o") != ordering or direction not in ("next", "prev"):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return values, direction
+
+def keyset_paginate(query, keys, descending, per_page, cursor=None):
+    """Paginate a query by seeking past the sort values of the previous page
+    
+    ``keys`` lists ``(name, expression)`` pairs to sort by; the last one
+    must be unique (the primary key) so every row has a distinct position. Instead of OFFSET,
+    each page filters on the row comparison ``(key1, key2, ...) < cursor``
+    which an index on the same columns answers directly, so deep pages
+    cost the same as the first one.
+    
+    Returns ``(items, next_cursor, prev_cursor)``.
+    """
+    ordering = ",".join(name for name, _ in keys) + (":desc" if descending else ":asc")
+    keys = [key for _, key in keys]
+    
+    values, direction = decode_cursor(cursor, ordering) if cursor else (None, "next")
+    backwards = direction == "prev"
+    
+    # Walking backwards reverses the scan, then the page is flipped back
+    scan_descending = descending != backwards
+    if values is not None:
+        # A tampered value would otherwise fail the cast in the database
+        if len(values) != len(keys) or not all(_matches_type(value, key) for key, value in zip(keys, values)):
+            raise InvalidCursor("Invalid cursor")
+        bound = tuple_(*(cast(literal(value), key.type) for key, value in zip(keys, values)))
+        row = tuple_(*keys)
+        query = query.filter(row < bound if scan_descending else row > bound)
+    
+    query = query.add_columns(*keys).order_by(None).order_by(
+        *(key.desc() if scan_descending else key.asc() for key in keys)
+    )
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+    
+    items = [row[0] for row in rows]
+    if not rows:
+        return items, None, None
+    
+    first = list(rows[0][1:])
+    last = list(rows[-1][1:])
+    if backwards:
+        next_cursor = encode_cursor(ordering, last, "next")
+        prev_cursor = encode_cursor(ordering, first, "prev") if has_more else None
+    else:
+        next_cursor = encode_cursor(ordering, last, "next") if has_more else None
+        prev_cursor = encode_cursor(ordering, first, "prev") if values is not None else None
+    return items, next_cursor, prev_cursor
@@ -0,0 +1,114 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_HASH_METHOD = "pbkdf2"
+
+class PasswordHashBusy(Exception):
+    """Raised when too many password hashes are already queued in this process"""
+
+class PasswordHasher:
+    """Bounded per-process pool for password hashing and verification
+
+    Hashing is CPU-bound but runs in hashlib without the GIL, so a small
+    thread pool bounds how many cores it takes. The calling request thread
+    still waits for the result, which only leaves the process free for
+    other requests with threaded workers (gunicorn gthread, as in
+    entrypoint.sh); a sync worker is busy for the whole login either way.
+    At most ``queue_size`` operations may be running or waiting at once,
+    fewer than the request threads, so beyond that callers get
+    PasswordHashBusy instead of tying up every thread behind the pool.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self.workers = 0
+        self.queue_size = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self):
+        workers = current_app.config.get("PASSWORD_HASH_WORKERS", 2)
+        queue_size = current_app.config.get("PASSWORD_HASH_QUEUE_SIZE", 4)
+        with self._lock:
+            # Pools do not survive a fork, so every worker process starts its own
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+                self._slots = threading.BoundedSemaphore(max(queue_size, workers))
+                self._pid = os.getpid()
+                self.workers = workers
+                self.queue_size = max(queue_size, workers)
+                self.in_flight = 0
+            return self._executor, self._slots
+
+    def _release(self, slots):
+        slots.release()
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def run(self, fn, *args):
+        """Run a hashing function in the pool and wait for its result"""
+        if not has_app_context() or not current_app.config.get("PASSWORD_HASH_WORKERS", 2):
+            return fn(*args)
+
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashBusy("Too many password operations in progress")
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(lambda _: self._release(slots))
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queueSize": self.queue_size,
+                "inFlight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+password_hasher = PasswordHasher()
+
+def get_hash_method():
+    """Return the configured Werkzeug hash method, e.g. ``pbkdf2:sha256:600000`` or ``scrypt``"""
+    if not has_app_context():
+        return DEFAULT_HASH_METHOD
+    return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_HASH_METHOD
+
+@lru_cache(maxsize=8)
+def _canonical_method(method):
+    # Werkzeug fills in defaults (digest, iterations, cost) when hashing, so
+    # hash once to learn the full parameter prefix stored with each hash
+    return generate_password_hash("", method).split("$", 1)[0]
+
+def hash_password(password):
+    """Hash a password with the configured method in the hashing pool"""
+    return password_hasher.run(generate_password_hash, password, get_hash_method())
+
+def verify_password(password_hash, password):
+    """Check a password against a stored hash in the hashing pool"""
+    return password_hasher.run(check_password_hash, password_hash, password)
+
+def needs_rehash(password_hash):
+    """Return True if a stored hash was made with other parameters than the configured ones"""
+    return password_hash.split("$", 1)[0] != _canonical_method(get_hash_method())
@@ -0,0 +1,318 @@
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, case, delete, func, literal, or_, select, tuple_, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from app import db
+from app.session import use_primary
+from app.models.folder import Folder, FolderPermission, FolderGroupPermission, EffectiveFolderAccess
+from app.models.group import GroupMembership
+from app.models.document import Document
+
+PENDING_GRANT_CHANGES_KEY = "permission_cache_changes"
+PENDING_ACCESS_REBUILD_KEY = "folder_access_rebuild"
+
+# Advisory lock taken exclusively by full access rebuilds and shared by scoped refreshes
+ACCESS_LOCK_KEY = 7266330202
+
+# Namespaces of the per-folder, per-group and per-user locks of scoped refreshes
+FOLDER_LOCK_NAMESPACE = 2082
+GROUP_LOCK_NAMESPACE = 2083
+USER_LOCK_NAMESPACE = 2084
+
+# Access levels from weakest to strongest; owners created the folder
+LEVEL_RANKS = {"read": 1, "write": 2, "admin": 3, "owner": 4}
+OWNER_RANK = LEVEL_RANKS["owner"]
+
+# Tables effective_folder_access is derived from
+ACCESS_SOURCE_TABLES = ("folders", "folder_permissions", "folder_group_permissions", "group_memberships")
+
+class PermissionCache:
+    """Bounded per-process LRU cache of each user's folder grants with a TTL"""
+    
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, user_id):
+        """Return the cached ``{folder_id: access}`` of a user or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+    
+    def put(self, user_id, grants):
+        ttl = current_app.config.get("PERMISSION_CACHE_TTL", 30)
+        size = current_app.config.get("PERMISSION_CACHE_SIZE", 1024)
+        if not ttl or not size:
+            return
+        with self._lock:
+            self._entries[user_id] = (grants, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": current_app.config.get("PERMISSION_CACHE_SIZE", 1024),
+                "ttl": current_app.config.get("PERMISSION_CACHE_TTL", 30),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+permission_cache = PermissionCache()
+
+def load_folder_grants(user_id):
+    """Load every folder a user can access, with their access level, in one indexed query"""
+    rows = db.session.query(EffectiveFolderAccess.folder_id, EffectiveFolderAccess.level).filter(
+        EffectiveFolderAccess.user_id == user_id
+    )
+    return dict(rows)
+
+def get_folder_grants(user):
+    """Return ``{folder_id: access}`` for a user, from the cache when possible"""
+    grants = permission_cache.get(user.id)
+    if grants is None:
+        # A lagging replica could cache grants a commit already invalidated
+        with use_primary(db.session):
+            grants = load_folder_grants(user.id)
+        permission_cache.put(user.id, grants)
+    return grants
+
+def can_read_folder(user, folder):
+    """Check if a user may read a folder: its owner, an admin or explicitly granted"""
+    if user.role == "admin" or folder.created_by == user.id:
+        return True
+    return folder.id in get_folder_grants(user)
+
+def can_manage_folder(user, folder):
+    """Check if a user may change a folder or its contents: its owner or an admin"""
+    return user.role == "admin" or folder.created_by == user.id
+
+def can_manage_document(user, document):
+    """Check if a user may change a document: its creator or an admin"""
+    return user.role == "admin" or document.created_by == user.id
+
+def can_manage_group(user, group):
+    """Check if a user may change a group and its members: its creator, a manager or an admin"""
+    if user.role == "admin" or group.created_by == user.id:
+        return True
+    return GroupMembership.query.filter_by(group_id=group.id, user_id=user.id, role="manager").first() is not None
+
+def readable_folder_ids(user, folder_ids):
+    """Return the subset of ``folder_ids`` a user may read, without a query per folder"""
+    folder_ids = set(folder_ids)
+    if user.role == "admin":
+        return folder_ids
+    return folder_ids & get_folder_grants(user).keys()
+
+def readable_document_ids(user, document_ids):
+    """Return the subset of ``document_ids`` a user created or may read through their folder
+    
+    Needs at most one query for the documents' owners and folders, plus the
+    user's grants when they are not cached.
+    """
+    document_ids = set(document_ids)
+    if not document_ids or user.role == "admin":
+        return document_ids
+    grants = get_folder_grants(user)
+    rows = db.session.query(Document.id, Document.created_by, Document.folder_id).filter(
+        Document.id.in_(document_ids)
+    )
+    return {
+        document_id for document_id, created_by, folder_id in rows
+        if created_by == user.id or folder_id in grants
+    }
+
+def accessible_folder_ids(user):
+    """Return a subquery of the ids of the folders a user can access, for joins and IN filters"""
+    return select(EffectiveFolderAccess.folder_id).where(EffectiveFolderAccess.user_id == user.id)
+
+def filter_accessible_documents(query, user):
+    """Limit a document query to documents a user created or can read through their folder"""
+    if user.role == "admin":
+        return query
+    return query.filter(or_(
+        Document.created_by == user.id,
+        Document.folder_id.in_(accessible_folder_ids(user))
+    ))
+
+def _access_sources():
+    """Every (user_id, folder_id, rank) granting access, from ownership, user and group grants"""
+    return union_all(
+        select(Folder.created_by.label("user_id"), Folder.id.label("folder_id"), literal(OWNER_RANK).label("rank")),
+        select(FolderPermission.user_id, FolderPermission.folder_id, _rank(FolderPermission.permission_type)),
+        select(GroupMembership.user_id, FolderGroupPermission.folder_id, _rank(FolderGroupPermission.permission_type))
+        .join(FolderGroupPermission, FolderGroupPermission.group_id == GroupMembership.group_id),
+    ).subquery()
+
+def _rank(permission_type):
+    return case(LEVEL_RANKS, value=permission_type, else_=LEVEL_RANKS["read"])
+
+def _scope(user_col, folder_col, user_ids, folder_ids, pairs):
+    conditions = []
+    if user_ids:
+        conditions.append(user_col.in_(sorted(user_ids)))
+    if folder_ids:
+        conditions.append(folder_col.in_(sorted(folder_ids)))
+    if pairs:
+        conditions.append(tuple_(user_col, folder_col).in_(sorted(pairs)))
+    return or_(*conditions)
+
+def lock_folder_access(session, user_ids=(), folder_ids=(), group_ids=(), pairs=()):
+    """Take the transaction-level locks of the folders, groups and users an ACL change involves
+    
+    Two changes that feed the same (user, folder) row always share a lock:
+    the folder's, the group linking the user to it, or the user's. Groups
+    granting a locked folder are looked up once the folder is locked, so a
+    concurrent grant is seen. Locks go folders, groups, then users, each in
+    id order, to avoid deadlocks.
+    """
+    folder_ids = set(folder_ids) | {folder_id for _, folder_id in pairs}
+    user_ids = set(user_ids) | {user_id for user_id, _ in pairs}
+    session.execute(select(func.pg_advisory_xact_lock_shared(ACCESS_LOCK_KEY)))
+    for folder_id in sorted(folder_ids):
+        session.execute(select(func.pg_advisory_xact_lock(FOLDER_LOCK_NAMESPACE, folder_id)))
+    
+    group_ids = set(group_ids)
+    if folder_ids:
+        group_ids.update(session.execute(
+            select(FolderGroupPermission.group_id).where(FolderGroupPermission.folder_id.in_(sorted(folder_ids))).distinct()
+        ).scalars())
+    for group_id in sorted(group_ids):
+        session.execute(select(func.pg_advisory_xact_lock(GROUP_LOCK_NAMESPACE, group_id)))
+    for user_id in sorted(user_ids):
+        session.execute(select(func.pg_advisory_xact_lock(USER_LOCK_NAMESPACE, user_id)))
+
+def refresh_folder_access(session, user_ids=(), folder_ids=(), pairs=(), everything=False, group_ids=()):
+    """Recompute effective_folder_access rows for the given users, folders or (user, folder) pairs
+    
+    Only rows whose level actually changes are written. Concurrent changes
+    to memberships and grants that feed the same rows are serialized with
+    lock_folder_access, also given the ids of groups whose grants or
+    members changed, so they can't each miss the other's rows; a full
+    rebuild locks out every other ACL writer. Returns the ids of users whose
+    access changed.
+    """
+    if not everything and not (user_ids or folder_ids or pairs):
+        return set()
+    if everything:
+        session.execute(select(func.pg_advisory_xact_lock(ACCESS_LOCK_KEY)))
+    else:
+        lock_folder_access(session, user_ids, folder_ids, group_ids, pairs)
+    
+    table = EffectiveFolderAccess.__table__
+    sources = _access_sources()
+    computed = select(
+        sources.c.user_id, sources.c.folder_id,
+        case({rank: level for level, rank in LEVEL_RANKS.items()}, value=func.max(sources.c.rank))
+    ).group_by(sources.c.user_id, sources.c.folder_id)
+    current = select(sources.c.user_id, sources.c.folder_id)
+    stale = delete(table)
+    if not everything:
+        computed = computed.where(_scope(sources.c.user_id, sources.c.folder_id, user_ids, folder_ids, pairs))
+        current = current.where(_scope(sources.c.user_id, sources.c.folder_id, user_ids, folder_ids, pairs))
+        stale = stale.where(_scope(table.c.user_id, table.c.folder_id, user_ids, folder_ids, pairs))
+    
+    upsert = pg_insert(table).from_select(["user_id", "folder_id", "level"], computed)
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["user_id", "folder_id"],
+        set_={"level": upsert.excluded.level},
+        where=table.c.level != upsert.excluded.level
+    ).returning(table.c.user_id)
+    stale = stale.where(tuple_(table.c.user_id, table.c.folder_id).not_in(current)).returning(table.c.user_id)
+    
+    changed = set(session.execute(upsert).scalars())
+    changed.update(session.execute(stale).scalars())
+    return changed
+
+def _history_values(obj, attribute):
+    history = db.inspect(obj).attrs[attribute].history
+    return {value for value in (*history.unchanged, *history.added, *history.deleted) if value is not None}
+
+def _has_changes(obj, *attributes):
+    state = db.inspect(obj)
+    return any(state.attrs[attribute].history.has_changes() for attribute in attributes)
+
+@event.listens_for(Session, "after_flush")
+def _maintain_folder_access(session, flush_context):
+    """Bring effective_folder_access up to date with the grants written by this flush"""
+    user_ids, folder_ids, group_ids, pairs = set(), set(), set(), set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed = obj in session.new or obj in session.deleted
+        if isinstance(obj, Folder) and (changed or _has_changes(obj, "created_by")):
+            folder_ids.add(obj.id)
+            # Owners' rows also depend on memberships, so they are locked too
+            pairs.update((user_id, obj.id) for user_id in _history_values(obj, "created_by"))
+        elif isinstance(obj, FolderPermission) and (changed or _has_changes(obj, "user_id", "folder_id", "permission_type")):
+            pairs.update(
+                (user_id, folder_id)
+                for user_id in _history_values(obj, "user_id")
+                for folder_id in _history_values(obj, "folder_id")
+            )
+        elif isinstance(obj, FolderGroupPermission) and (changed or _has_changes(obj, "group_id", "folder_id", "permission_type")):
+            folder_ids.update(_history_values(obj, "folder_id"))
+            group_ids.update(_history_values(obj, "group_id"))
+        elif isinstance(obj, GroupMembership) and (changed or _has_changes(obj, "group_id", "user_id")):
+            user_ids.update(_history_values(obj, "user_id"))
+            group_ids.update(_history_values(obj, "group_id"))
+    
+    changed = refresh_folder_access(session, user_ids, folder_ids, pairs, group_ids=group_ids)
+    if changed:
+        session.info.setdefault(PENDING_GRANT_CHANGES_KEY, set()).update(changed)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_bulk_grant_changes(orm_execute_state):
+    """Bulk statements don't say whose grants they touch, so rebuild everything before commit"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        if orm_execute_state.statement.table.name in ACCESS_SOURCE_TABLES:
+            orm_execute_state.session.info[PENDING_ACCESS_REBUILD_KEY] = True
+
+@event.listens_for(Session, "before_commit")
+def _rebuild_folder_access(session):
+    if session.info.pop(PENDING_ACCESS_REBUILD_KEY, False):
+        refresh_folder_access(session, everything=True)
+        session.info.setdefault(PENDING_GRANT_CHANGES_KEY, set()).add(None)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_grants(session):
+    changed = session.info.pop(PENDING_GRANT_CHANGES_KEY, None)
+    if changed and None in changed:
+        permission_cache.clear()
+    elif changed:
+        permission_cache.invalidate(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_grant_changes(session):
+    session.info.pop(PENDING_GRANT_CHANGES_KEY, None)
+    session.info.pop(PENDING_ACCESS_REBUILD_KEY, None)
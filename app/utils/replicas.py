@@ -0,0 +1,194 @@
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from app import db
+from app.session import REPLICA_BIND_KEY, PENDING_WRITE_KEY
+from app.utils.db_pool import get_engine_options, configure_engine, get_pool_stats
+
+# Replay lag of a streaming replica; zero when it has replayed everything it received
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class ReplicaSet:
+    """Read replicas of one worker, handed out round-robin while healthy
+    
+    A replica is unhealthy until its first successful check, when a check
+    fails, when it lags more than DB_REPLICA_MAX_LAG seconds behind, or when
+    a query on it loses its connection.
+    """
+    
+    def __init__(self, engines):
+        self.engines = engines
+        self._lock = threading.Lock()
+        self._next = 0
+        self._healthy = [False] * len(engines)
+        self._lag = [None] * len(engines)
+        self._errors = [None] * len(engines)
+        self._reads = [0] * len(engines)
+        self.primary_reads = 0
+        self.recent_writer_reads = 0
+        for engine in engines:
+            event.listen(engine, "handle_error", self._handle_error)
+    
+    def choose(self, recent_writer=False):
+        """Return the next healthy replica engine, or None to read from the primary"""
+        with self._lock:
+            if recent_writer:
+                self.recent_writer_reads += 1
+                return None
+            for offset in range(len(self.engines)):
+                index = (self._next + offset) % len(self.engines)
+                if self._healthy[index]:
+                    self._next = index + 1
+                    self._reads[index] += 1
+                    return self.engines[index]
+            self.primary_reads += 1
+            return None
+    
+    def check(self, max_lag):
+        """Ping every replica and measure its replay lag"""
+        for index, engine in enumerate(self.engines):
+            try:
+                with engine.connect() as conn:
+                    lag = float(conn.execute(LAG_QUERY).scalar()) if engine.dialect.name == "postgresql" else 0.0
+                error = f"lagging {lag:.1f}s behind" if max_lag and lag > max_lag else None
+            except Exception as e:
+                lag, error = None, str(e).strip().split("\n")[0] or type(e).__name__
+            with self._lock:
+                if error and self._healthy[index]:
+                    print(f"Read replica {index} unhealthy: {error}")
+                elif not error and not self._healthy[index]:
+                    print(f"Read replica {index} healthy")
+                self._healthy[index] = error is None
+                self._lag[index] = lag
+                self._errors[index] = error
+    
+    def _handle_error(self, context):
+        # Stop routing to a replica that dropped its connection until the next check passes
+        if context.is_disconnect and context.engine in self.engines:
+            index = self.engines.index(context.engine)
+            with self._lock:
+                self._healthy[index] = False
+                self._errors[index] = "connection lost"
+    
+    def stats(self):
+        with self._lock:
+            return {
+                "primaryReads": self.primary_reads,
+                "recentWriterReads": self.recent_writer_reads,
+                "replicas": [
+                    {
+                        "url": engine.url.render_as_string(hide_password=True),
+                        "healthy": self._healthy[index],
+                        "lagSeconds": self._lag[index],
+                        "error": self._errors[index],
+                        "reads": self._reads[index],
+                        "pool": get_pool_stats(engine)
+                    }
+                    for index, engine in enumerate(self.engines)
+                ]
+            }
+
+class RecentWrites:
+    """When each user last committed a write through this worker"""
+    
+    def __init__(self):
+        self._writes = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def record(self, user_id, window):
+        now = time.monotonic()
+        with self._lock:
+            self._writes[user_id] = now
+            self._writes.move_to_end(user_id)
+            # Entries are in write order, so expired ones sit at the front
+            while self._writes and next(iter(self._writes.values())) < now - window:
+                self._writes.popitem(last=False)
+    
+    def wrote_within(self, user_id, window):
+        with self._lock:
+            written = self._writes.get(user_id)
+        return written is not None and written >= time.monotonic() - window
+
+recent_writes = RecentWrites()
+
+def get_replicas():
+    """Return the ReplicaSet of the current app, or None without replicas"""
+    return current_app.extensions.get("db_replicas")
+
+def init_replicas(app):
+    """Create engines for DATABASE_REPLICA_URLS and start checking their health"""
+    urls = app.config.get("DATABASE_REPLICA_URLS") or []
+    if not urls:
+        return None
+    
+    engines = []
+    for url in urls:
+        engine = create_engine(url, **get_engine_options(url))
+        configure_engine(engine, app.config)
+        engines.append(engine)
+    replicas = app.extensions["db_replicas"] = ReplicaSet(engines)
+    
+    interval = app.config.get("DB_REPLICA_CHECK_INTERVAL", 5)
+    max_lag = app.config.get("DB_REPLICA_MAX_LAG", 10)
+    
+    def run():
+        while True:
+            try:
+                replicas.check(max_lag)
+            except Exception as e:
+                print(f"Error checking read replicas: {str(e)}")
+            time.sleep(interval)
+    
+    if interval:
+        thread = threading.Thread(target=run, name="replica-health-check", daemon=True)
+        thread.start()
+    return replicas
+
+def replica_reads(f):
+    """Decorator sending the reads of a safe GET handler to a read replica
+    
+    Goes below token_required. Requests of users who wrote within the last
+    DB_REPLICA_WRITE_WINDOW seconds stay on the primary so they see their
+    own changes, as does everything after a write in the handler itself.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        replicas = get_replicas()
+        if replicas is None or request.method not in ("GET", "HEAD"):
+            return f(current_user, *args, **kwargs)
+        
+        window = current_app.config.get("DB_REPLICA_WRITE_WINDOW", 10)
+        engine = replicas.choose(recent_writer=recent_writes.wrote_within(current_user.id, window))
+        if engine is None:
+            return f(current_user, *args, **kwargs)
+        
+        db.session.info[REPLICA_BIND_KEY] = engine
+        try:
+            return f(current_user, *args, **kwargs)
+        finally:
+            db.session.info.pop(REPLICA_BIND_KEY, None)
+    
+    return decorated
+
+@event.listens_for(Session, "after_commit")
+def _record_user_write(session):
+    """Keep the author of a committed write on the primary for a while"""
+    if not session.info.pop(PENDING_WRITE_KEY, False) or not has_request_context():
+        return
+    user_id = g.get("current_user_id")
+    window = current_app.config.get("DB_REPLICA_WRITE_WINDOW", 10)
+    if user_id is not None and window and get_replicas() is not None:
+        recent_writes.record(user_id, window)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_write(session):
+    session.info.pop(PENDING_WRITE_KEY, None)
@@ -0,0 +1,159 @@
+import re
+import html
+from flask import current_app
+from sqlalchemy import case, cast, func, or_, select
+from sqlalchemy.dialects.postgresql import REAL
+from app import db
+from app.models.document import Document
+from app.models.document_content import DocumentContent
+
+# Text search configuration used by the search_vector trigger
+SEARCH_CONFIG = "english"
+
+# Options for the highlighted snippets returned with search results;
+# titles are short enough to highlight whole. Matches are delimited with
+# private-use characters that become <mark> tags once the text is escaped
+START_SEL, STOP_SEL = "\ue000", "\ue001"
+TITLE_HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}, HighlightAll=true"
+HEADLINE_OPTIONS = f"StartSel={START_SEL}, StopSel={STOP_SEL}, MaxFragments=2, MaxWords=20, MinWords=5"
+
+# Values accepted by the searchMode parameter
+SEARCH_MODES = ("fulltext", "substring", "fuzzy")
+
+TERM_RE = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def build_tsquery(text):
+    """Translate user search input into a to_tsquery() expression
+    
+    Quoted text becomes a phrase, bare words match as prefixes so results
+    update while the user is typing, and a leading ``-`` excludes a term.
+    All terms must match. Returns None if the input has no searchable words.
+    """
+    terms = []
+    for phrase_not, phrase, word_not, word in TERM_RE.findall(text or ""):
+        if phrase:
+            words = WORD_RE.findall(phrase)
+            if not words:
+                continue
+            term = " <-> ".join(words)
+            negate = phrase_not
+        else:
+            words = WORD_RE.findall(word)
+            if not words:
+                continue
+            term = " & ".join(f"{w}:*" for w in words)
+            negate = word_not
+        terms.append(f"!({term})" if negate else f"({term})")
+    
+    if not terms or all(term.startswith("!") for term in terms):
+        return None
+    return " & ".join(terms)
+
+def get_tsquery(text):
+    """Return the SQL tsquery for user input, or None if there is nothing to search"""
+    expression = build_tsquery(text)
+    if expression is None:
+        return None
+    return func.to_tsquery(SEARCH_CONFIG, expression)
+
+# How much a match in the file body counts next to one in the description
+CONTENT_RANK_WEIGHT = 0.5
+
+def match_documents(query, tsquery):
+    """Filter a Document query to rows whose metadata or file text matches
+    
+    Each side is looked up through its own GIN index and the ids combined,
+    which the planner can't do for an OR across the two tables.
+    """
+    matching_ids = select(Document.id).where(Document.search_vector.op("@@")(tsquery)).union(
+        select(DocumentContent.document_id).where(DocumentContent.search_vector.op("@@")(tsquery))
+    )
+    return query.filter(Document.id.in_(matching_ids))
+
+def rank_documents(tsquery):
+    """Return the ts_rank expression for ordering matches by relevance
+    
+    The result is a plain real so cursor pagination can compare it exactly.
+    """
+    content_rank = select(func.ts_rank(DocumentContent.search_vector, tsquery)).where(
+        DocumentContent.document_id == Document.id
+    ).scalar_subquery()
+    return cast(
+        func.coalesce(func.ts_rank(Document.search_vector, tsquery), 0) +
+        CONTENT_RANK_WEIGHT * func.coalesce(content_rank, 0),
+        REAL
+    )
+
+def to_highlight_html(headline):
+    """Escape a ts_headline snippet and turn its match delimiters into <mark> tags
+    
+    Titles, descriptions and file text are user content, so the snippet is
+    only safe to render as HTML once everything but the marks is escaped.
+    """
+    if headline is None:
+        return None
+    return html.escape(headline).replace(START_SEL, "<mark>").replace(STOP_SEL, "</mark>")
+
+def get_highlights(document_ids, tsquery):
+    """Return highlighted title, description and file text snippets by document id
+    
+    Headlines are only computed for the given (already paginated) rows,
+    since ts_headline has to re-parse the original text.
+    """
+    if not document_ids:
+        return {}
+    
+    rows = db.session.execute(
+        select(
+            Document.id,
+            func.ts_headline(SEARCH_CONFIG, Document.title, tsquery, TITLE_HEADLINE_OPTIONS),
+            func.ts_headline(SEARCH_CONFIG, func.coalesce(Document.description, ""), tsquery, HEADLINE_OPTIONS),
+            # Only bodies that actually match are worth re-parsing
+            case(
+                (DocumentContent.search_vector.op("@@")(tsquery),
+                 func.ts_headline(SEARCH_CONFIG, DocumentContent.body, tsquery, HEADLINE_OPTIONS)),
+                else_=None
+            )
+        ).outerjoin(DocumentContent, DocumentContent.document_id == Document.id).where(Document.id.in_(document_ids))
+    ).all()
+    
+    return {
+        document_id: {
+            "title": to_highlight_html(title),
+            "description": to_highlight_html(description),
+            "content": to_highlight_html(content)
+        }
+        for document_id, title, description, content in rows
+    }
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input matches literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def substring_filter(columns, term):
+    """Match rows where any of the columns contains term, ignoring case
+    
+    The pg_trgm GIN indexes on these columns serve the leading wildcard.
+    """
+    pattern = f"%{escape_like(term)}%"
+    return or_(*(column.ilike(pattern, escape="\\") for column in columns))
+
+def fuzzy_filter(columns, term):
+    """Match rows where term is similar to a word sequence in any of the columns
+    
+    Returns ``(condition, similarity)``; order by the similarity expression
+    to get the closest matches first. Typos are tolerated down to the
+    SEARCH_FUZZY_THRESHOLD word similarity.
+    """
+    threshold = current_app.config.get("SEARCH_FUZZY_THRESHOLD")
+    if threshold is not None:
+        # Only affects the current transaction
+        db.session.execute(
+            select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True))
+        )
+    
+    # column %> term is the indexable form of word_similarity(term, column) >= threshold
+    condition = or_(*(column.op("%>")(term) for column in columns))
+    similarity = func.greatest(*(func.word_similarity(term, column) for column in columns), type_=REAL)
+    return condition, similarity
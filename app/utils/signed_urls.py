@@ -0,0 +1,75 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+from urllib.parse import urlencode
+from flask import current_app
+
+# Expiry times are rounded up to this many seconds so repeated requests for
+# the same document produce identical, cacheable URLs
+EXPIRY_GRANULARITY = 60
+
+def _signing_key():
+    """Return the key used to sign download URLs"""
+    key = current_app.config.get("DOWNLOAD_URL_SECRET") or current_app.config.get("SECRET_KEY")
+    return key.encode("utf-8")
+
+def _signature(document_id, params):
+    """Compute the URL-safe HMAC over a document id and its signed parameters"""
+    message = "\n".join([str(document_id)] + [str(params[key]) for key in ("v", "n", "t", "s", "m", "exp")])
+    digest = hmac.new(_signing_key(), message.encode("utf-8"), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+def generate_download_url(document, download_name, expires_in=None):
+    """Mint a signed URL for downloading one version of a document
+    
+    Everything needed to serve the file (storage name, type, size, name and
+    modification time) travels in the signed query string, so the download
+    can be verified without a database lookup. Returns the URL and its
+    expiry timestamp.
+    """
+    ttl = current_app.config.get("DOWNLOAD_URL_TTL", 300)
+    expires_in = min(expires_in or ttl, ttl)
+    expires_at = -(-(int(time.time()) + expires_in) // EXPIRY_GRANULARITY) * EXPIRY_GRANULARITY
+    
+    params = {
+        "v": os.path.basename(document.file_path),
+        "n": download_name,
+        "t": document.file_type,
+        "s": document.file_size,
+        "m": int(document.updated_at.timestamp()),
+        "exp": expires_at
+    }
+    params["sig"] = _signature(document.id, params)
+    
+    return f"/api/documents/{document.id}/download?{urlencode(params)}", expires_at
+
+def verify_download_url(document_id, args):
+    """Check a signed download request and return its parameters
+    
+    Returns None if the signature is invalid, a parameter is missing or the
+    URL has expired.
+    """
+    try:
+        params = {
+            "v": args["v"],
+            "n": args["n"],
+            "t": args["t"],
+            "s": int(args["s"]),
+            "m": int(args["m"]),
+            "exp": int(args["exp"])
+        }
+    except (KeyError, ValueError):
+        return None
+    
+    if not hmac.compare_digest(_signature(document_id, params), args.get("sig", "")):
+        return None
+    if params["exp"] < time.time():
+        return None
+    
+    # The storage name is a bare file name inside the upload folder
+    if not params["v"] or os.path.basename(params["v"]) != params["v"] or params["v"].startswith("."):
+        return None
+    
+    return params
@@ -0,0 +1,148 @@
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.upload_session import UploadSession
+from app.utils.file_handler import BlobWriter, CHUNK_SIZE, get_file_type
+
+# Directory inside UPLOAD_FOLDER holding the chunks of open sessions
+SESSIONS_DIRNAME = ".sessions"
+
+def get_sessions_root():
+    """Return the directory holding all open upload sessions"""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    return os.path.abspath(os.path.join(upload_folder, SESSIONS_DIRNAME))
+
+def get_session_dir(session_id):
+    """Return the directory holding the chunks of an upload session"""
+    return os.path.join(get_sessions_root(), session_id)
+
+def get_chunk_path(session_id, index):
+    """Return the path of a stored chunk"""
+    return os.path.join(get_session_dir(session_id), f"{index}.part")
+
+def write_chunk(session, index, stream):
+    """Store one chunk of an upload session
+    
+    The chunk is written to a temporary file and renamed into place, so
+    chunks can arrive in parallel and in any order, and a retried chunk
+    simply replaces the previous attempt. Returns False if the number of
+    bytes received does not match the expected chunk size.
+    """
+    session_dir = get_session_dir(session.id)
+    os.makedirs(session_dir, exist_ok=True)
+    
+    expected = session.expected_chunk_size(index)
+    temp_path = os.path.join(session_dir, f".{index}.{os.getpid()}.{threading.get_ident()}.tmp")
+    size = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            while size <= expected:
+                data = stream.read(CHUNK_SIZE)
+                if not data:
+                    break
+                out.write(data)
+                size += len(data)
+        
+        if size != expected:
+            os.remove(temp_path)
+            return False
+        
+        os.replace(temp_path, get_chunk_path(session.id, index))
+        return True
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def get_received_chunks(session):
+    """Return the sorted indexes of the chunks stored so far"""
+    try:
+        names = os.listdir(get_session_dir(session.id))
+    except FileNotFoundError:
+        return []
+    
+    return sorted(int(name[:-5]) for name in names if name.endswith(".part"))
+
+def assemble_chunks(session, expected_sha256=None):
+    """Concatenate the chunks of a session into the blob store
+    
+    Returns a committed BlobWriter for the caller to register, or None if
+    the content does not match ``expected_sha256``.
+    """
+    with BlobWriter(get_file_type(session.filename)) as writer:
+        for index in range(session.total_chunks):
+            with open(get_chunk_path(session.id, index), 'rb') as part:
+                while True:
+                    data = part.read(CHUNK_SIZE)
+                    if not data:
+                        break
+                    writer.write(data)
+        
+        if expected_sha256 and expected_sha256.lower() != writer.hexdigest():
+            return None
+        writer.commit()
+    
+    return writer
+
+def remove_session_files(session_id):
+    """Delete the chunks of an upload session"""
+    shutil.rmtree(get_session_dir(session_id), ignore_errors=True)
+
+def cleanup_stale_sessions():
+    """Delete upload sessions that have not received a chunk within the TTL"""
+    ttl = current_app.config.get("UPLOAD_SESSION_TTL", 24 * 60 * 60)
+    cutoff = time.time() - ttl
+    removed = 0
+    
+    sessions = UploadSession.query.filter(
+        UploadSession.created_at < datetime.utcnow() - timedelta(seconds=ttl)
+    ).all()
+    for session in sessions:
+        # Chunk uploads touch the directory, so active sessions are kept
+        session_dir = get_session_dir(session.id)
+        if os.path.isdir(session_dir) and os.path.getmtime(session_dir) >= cutoff:
+            continue
+        remove_session_files(session.id)
+        db.session.delete(session)
+        removed += 1
+    db.session.commit()
+    
+    # Remove chunk directories left behind without a session row
+    sessions_root = get_sessions_root()
+    if os.path.isdir(sessions_root):
+        for name in os.listdir(sessions_root):
+            session_dir = os.path.join(sessions_root, name)
+            try:
+                stale = os.path.getmtime(session_dir) < cutoff
+            except OSError:
+                continue
+            if stale and not UploadSession.query.get(name):
+                shutil.rmtree(session_dir, ignore_errors=True)
+    
+    return removed
+
+def start_session_gc(app):
+    """Start a daemon thread that periodically removes stale upload sessions"""
+    interval = app.config.get("UPLOAD_SESSION_GC_INTERVAL")
+    if not interval:
+        return None
+    
+    def run():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    removed = cleanup_stale_sessions()
+                    if removed:
+                        print(f"Removed {removed} stale upload sessions")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error cleaning up upload sessions: {str(e)}")
+    
+    thread = threading.Thread(target=run, name="upload-session-gc", daemon=True)
+    thread.start()
+    return thread
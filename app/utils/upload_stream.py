@@ -0,0 +1,92 @@
+from flask import request, current_app
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import MultipartDecoder, Field, File, Data, Epilogue, NeedData
+from app.utils.file_handler import BlobWriter, CHUNK_SIZE, allowed_file, register_blob, get_file_type
+
+class StreamedUpload:
+    """File part of a multipart request written straight to the blob store"""
+    
+    def __init__(self, filename, writer):
+        self.filename = filename
+        self.writer = writer
+    
+    def save(self):
+        """Commit the upload and return its filename, path, URL and size"""
+        if not allowed_file(self.filename):
+            self.discard()
+            return None, None, None, None
+        
+        self.writer.commit()
+        return register_blob(self.writer)
+    
+    def discard(self):
+        """Drop the upload if it has not been saved"""
+        self.writer.abort()
+
+def parse_streamed_upload(file_field="file"):
+    """Parse the multipart request body chunk by chunk
+    
+    Form fields are collected in memory while the file part named
+    ``file_field`` is written into a BlobWriter as it arrives, so the body is
+    never spooled and size and hash are computed in the same pass. Returns the
+    form fields and the upload, or None when there is no such file part.
+    
+    Raises RequestEntityTooLarge once more than MAX_CONTENT_LENGTH bytes
+    have been received.
+    """
+    mimetype, options = parse_options_header(request.headers.get("Content-Type", ""))
+    boundary = options.get("boundary")
+    if mimetype != "multipart/form-data" or not boundary:
+        return MultiDict(), None
+    
+    max_length = current_app.config.get("MAX_CONTENT_LENGTH")
+    decoder = MultipartDecoder(
+        boundary.encode("latin-1"),
+        max_form_memory_size=request.max_form_memory_size
+    )
+    
+    form = MultiDict()
+    upload = None
+    current = None
+    field_data = []
+    received = 0
+    
+    try:
+        while True:
+            chunk = request.stream.read(CHUNK_SIZE)
+            received += len(chunk)
+            if max_length is not None and received > max_length:
+                raise RequestEntityTooLarge()
+            
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File):
+                    # Only the requested file part is kept, others are skipped
+                    if event.name == file_field and upload is None:
+                        upload = StreamedUpload(event.filename, BlobWriter(get_file_type(event.filename)))
+                        current = upload
+                    else:
+                        current = None
+                elif isinstance(event, Field):
+                    current = event
+                    field_data = []
+                elif isinstance(event, Data):
+                    if current is upload and upload is not None:
+                        upload.writer.write(event.data)
+                    elif isinstance(current, Field):
+                        field_data.append(event.data)
+                        if not event.more_data:
+                            form.add(current.name, b"".join(field_data).decode("utf-8", "replace"))
+                event = decoder.next_event()
+            
+            if isinstance(event, Epilogue) or not chunk:
+                break
+    except Exception:
+        if upload is not None:
+            upload.discard()
+        raise
+    
+    return form, upload
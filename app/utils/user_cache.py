@@ -0,0 +1,125 @@
+import time
+import threading
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models.user import User
+
+PENDING_USER_CHANGES_KEY = "user_cache_changes"
+
+class CachedUser:
+    """Identity of an authenticated user, as needed for authorization
+    
+    Only the id, role and token version come from the cache. Reading any
+    other attribute loads the full User row once for the request.
+    """
+    
+    def __init__(self, id, role, token_version):
+        self.id = id
+        self.role = role
+        self.token_version = token_version
+    
+    def __getattr__(self, name):
+        if name.startswith("__") or name == "_user":
+            raise AttributeError(name)
+        user = self.__dict__.get("_user")
+        if user is None:
+            user = self.__dict__["_user"] = db.session.get(User, self.id)
+            if user is None:
+                raise AttributeError(name)
+        return getattr(user, name)
+    
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.role}>"
+
+class UserCache:
+    """Bounded per-process LRU cache of user identities with a TTL"""
+    
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+    
+    def get(self, user_id):
+        """Return the cached ``(id, role, token_version)`` or None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] >= time.monotonic():
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+    
+    def put(self, user_id, identity):
+        ttl = current_app.config.get("AUTH_CACHE_TTL", 30)
+        size = current_app.config.get("AUTH_CACHE_SIZE", 1024)
+        if not ttl or not size:
+            return
+        with self._lock:
+            self._entries[user_id] = (identity, time.monotonic() + ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "capacity": current_app.config.get("AUTH_CACHE_SIZE", 1024),
+                "ttl": current_app.config.get("AUTH_CACHE_TTL", 30),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+user_cache = UserCache()
+
+def load_user_identity(user_id):
+    """Return a CachedUser for an authenticated request, or None if the user is gone"""
+    identity = user_cache.get(user_id)
+    if identity is None:
+        identity = db.session.query(User.id, User.role, User.token_version).filter_by(id=user_id).first()
+        if identity is None:
+            return None
+        identity = tuple(identity)
+        user_cache.put(user_id, identity)
+    return CachedUser(*identity)
+
+@event.listens_for(Session, "after_flush")
+def _track_user_changes(session, flush_context):
+    """Remember users changed or deleted by a transaction"""
+    changed = [obj.id for obj in list(session.dirty) + list(session.deleted) if isinstance(obj, User)]
+    if changed:
+        session.info.setdefault(PENDING_USER_CHANGES_KEY, set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    changed = session.info.pop(PENDING_USER_CHANGES_KEY, None)
+    if changed:
+        user_cache.invalidate(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_user_changes(session):
+    session.info.pop(PENDING_USER_CHANGES_KEY, None)
@@ -0,0 +1,187 @@
+"""EXPLAIN ANALYZE report for the hot-path listing and permission queries
+
+Runs the queries behind folder listings, document listings (page and cursor
+sorts), owner checks and permission lookups with EXPLAIN (ANALYZE, BUFFERS)
+and prints each plan's scans, buffers and execution time. Save a report
+before applying a migration and compare against it afterwards:
+
+    python benchmarks/index_report.py --output before.json
+    flask db upgrade
+    python benchmarks/index_report.py --compare before.json
+
+The database comes from --database or DATABASE_URL. --seed N first fills a
+scratch database with N synthetic documents (never use it on real data).
+"""
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from sqlalchemy import text
+from app import create_app, db
+from app.utils.permissions import refresh_folder_access
+
+QUERIES = [
+    ("folder documents", """
+        SELECT * FROM documents WHERE folder_id = :folder_id ORDER BY id
+    """),
+    ("documents by created_at", """
+        SELECT * FROM documents ORDER BY created_at DESC LIMIT 10 OFFSET 100
+    """),
+    ("documents by updated_at", """
+        SELECT * FROM documents ORDER BY updated_at DESC LIMIT 10 OFFSET 100
+    """),
+    ("documents cursor page", """
+        SELECT * FROM documents WHERE (created_at, id) < (:created_at, :document_id)
+        ORDER BY created_at DESC, id DESC LIMIT 10
+    """),
+    ("documents of owner", """
+        SELECT id FROM documents WHERE created_by = :user_id
+    """),
+    ("accessible documents", """
+        SELECT * FROM documents
+        WHERE created_by = :user_id
+           OR folder_id IN (SELECT folder_id FROM effective_folder_access WHERE user_id = :user_id)
+        ORDER BY created_at DESC LIMIT 10
+    """),
+    ("folders of owner", """
+        SELECT * FROM folders WHERE created_by = :user_id
+    """),
+    ("folder permission check", """
+        SELECT id FROM folder_permissions WHERE folder_id = :folder_id AND user_id = :user_id
+    """),
+    ("folders shared with user", """
+        SELECT folder_id FROM folder_permissions WHERE user_id = :user_id
+    """),
+]
+
+def seed(rows):
+    """Insert synthetic users, folders, grants and documents"""
+    users = max(rows // 1000, 10)
+    folders = max(rows // 100, 10)
+    statements = [
+        f"""INSERT INTO users (username, email, password_hash, role, token_version, created_at, updated_at)
+            SELECT 'seed' || n || '_' || md5(random()::text), 'seed' || n || '_' || md5(random()::text) || '@example.com',
+                   'x', 'user', 0, now(), now()
+            FROM generate_series(1, {users}) AS n""",
+        f"""INSERT INTO folders (name, type, created_at, updated_at, created_by)
+            SELECT 'Folder ' || n, 'team', now(), now(), u.ids[1 + n % cardinality(u.ids)]
+            FROM generate_series(1, {folders}) AS n, (SELECT array_agg(id ORDER BY id) AS ids FROM users) AS u""",
+        """INSERT INTO folder_permissions (folder_id, user_id, permission_type, created_at)
+            SELECT f.id, u.ids[1 + (f.id * 7 + k) % cardinality(u.ids)], 'read', now()
+            FROM folders AS f, generate_series(1, 3) AS k, (SELECT array_agg(id ORDER BY id) AS ids FROM users) AS u
+            ON CONFLICT DO NOTHING""",
+        f"""INSERT INTO documents (title, description, file_path, file_url, file_type, file_size, tags,
+                                   folder_id, created_at, updated_at, created_by)
+            SELECT 'Document ' || n, 'Seeded document', 'seed/' || n, '/seed/' || n, 'application/pdf', n % 100000,
+                   ARRAY['seed'], f.ids[1 + n % cardinality(f.ids)],
+                   now() - (n || ' minutes')::interval, now() - ((n % 977) || ' minutes')::interval,
+                   u.ids[1 + n % cardinality(u.ids)]
+            FROM generate_series(1, {rows}) AS n,
+                 (SELECT array_agg(id ORDER BY id) AS ids FROM users) AS u,
+                 (SELECT array_agg(id ORDER BY id) AS ids FROM folders) AS f""",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement))
+    refresh_folder_access(db.session, everything=True)
+    db.session.commit()
+    for table in ("users", "folders", "folder_permissions", "documents", "effective_folder_access"):
+        db.session.execute(text(f"ANALYZE {table}"))
+    db.session.commit()
+
+def sample_parameters():
+    """Pick a busy user and folder and a cursor position deep in the listing"""
+    user_id = db.session.execute(text(
+        "SELECT created_by FROM documents GROUP BY created_by ORDER BY count(*) DESC LIMIT 1"
+    )).scalar()
+    folder_id = db.session.execute(text(
+        "SELECT folder_id FROM documents WHERE folder_id IS NOT NULL GROUP BY folder_id ORDER BY count(*) DESC LIMIT 1"
+    )).scalar()
+    cursor = db.session.execute(text(
+        "SELECT created_at, id FROM documents ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET 1000"
+    )).first() or db.session.execute(text(
+        "SELECT created_at, id FROM documents ORDER BY created_at, id LIMIT 1"
+    )).first()
+    return {
+        "user_id": user_id,
+        "folder_id": folder_id,
+        "created_at": cursor[0] if cursor else None,
+        "document_id": cursor[1] if cursor else None,
+    }
+
+def describe(plan):
+    """List the scans of a plan, e.g. 'Index Scan using ix_documents_created_by on documents'"""
+    scans = []
+    def walk(node):
+        node_type = node["Node Type"]
+        if "Scan" in node_type:
+            description = node_type
+            if node.get("Index Name"):
+                description += f" using {node['Index Name']}"
+            if node.get("Relation Name"):
+                description += f" on {node['Relation Name']}"
+            scans.append(description)
+        for child in node.get("Plans", []):
+            walk(child)
+    walk(plan)
+    return scans
+
+def explain(sql, params):
+    plan = db.session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]["Plan"]
+    return {
+        "time": plan[0]["Execution Time"],
+        "buffers": root.get("Shared Hit Blocks", 0) + root.get("Shared Read Blocks", 0),
+        "scans": describe(root),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database", default=os.environ.get("DATABASE_URL"), help="Database URL (defaults to DATABASE_URL)")
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    parser.add_argument("--compare", help="Compare against a report written earlier with --output")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic documents first (scratch databases only)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per query (fastest is reported)")
+    args = parser.parse_args()
+    if not args.database:
+        parser.error("--database or DATABASE_URL is required")
+
+    app = create_app({"SQLALCHEMY_DATABASE_URI": args.database, "CONTENT_INDEXING": False, "UPLOAD_SESSION_GC_INTERVAL": 0})
+    with app.app_context():
+        if args.seed:
+            seed(args.seed)
+        params = sample_parameters()
+        report = {}
+        for name, sql in QUERIES:
+            runs = [explain(sql, params) for _ in range(max(args.repeat, 1))]
+            report[name] = min(runs, key=lambda run: run["time"])
+        db.session.rollback()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    for name, result in report.items():
+        line = f"{name:<26} {result['time']:>9.3f} ms {result['buffers']:>7} buffers"
+        if baseline and name in baseline:
+            before = baseline[name]
+            speedup = before["time"] / result["time"] if result["time"] else float("inf")
+            line += f"   (before {before['time']:.3f} ms, {before['buffers']} buffers, {speedup:.1f}x)"
+        print(line)
+        for scan in result["scans"]:
+            print(f"    {scan}")
+        if baseline and name in baseline and baseline[name]["scans"] != result["scans"]:
+            for scan in baseline[name]["scans"]:
+                print(f"    was: {scan}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark for password verification throughput
+
+Simulates a login storm: ``--clients`` request threads each verify a stored
+password hash as fast as they can, once for every hashing pool size in
+``--workers``. Reports logins per second, latency percentiles and how many
+logins were turned away with 503 by admission control. No database is
+needed:
+
+    python benchmarks/password_hashing.py [--workers 0,1,2,4] [--clients 16] [--seconds 5]
+
+A pool size of 0 verifies inline on the request thread, as before. The
+clients stand in for the request threads of one gthread worker process;
+under sync gunicorn workers there is only one request thread per process,
+so the pool size makes no difference there.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import create_app
+from app.utils.passwords import PasswordHasher, PasswordHashBusy, hash_password
+from app.utils import passwords
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+def run(app, clients, seconds, stored_hash):
+    latencies = []
+    rejected = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        own = []
+        busy = 0
+        with app.app_context():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    assert passwords.verify_password(stored_hash, "correct horse battery staple")
+                except PasswordHashBusy:
+                    busy += 1
+                    # A rejected client backs off as it would on Retry-After
+                    time.sleep(0.01)
+                    continue
+                own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+            rejected[0] += busy
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return len(latencies) / elapsed, latencies, rejected[0]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="0,1,2,4", help="Comma-separated hashing pool sizes")
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent login threads")
+    parser.add_argument("--seconds", type=float, default=5, help="Duration of each run")
+    parser.add_argument("--method", default="pbkdf2", help="Werkzeug hash method")
+    parser.add_argument("--queue-size", type=int, default=16, help="Admission limit per process")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, method {args.method}")
+    print(f"{'workers':>8} {'logins/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'rejected':>9}")
+    for workers in [int(w) for w in args.workers.split(",")]:
+        app = create_app({
+            "SQLALCHEMY_DATABASE_URI": "sqlite://",
+            "PASSWORD_HASH_METHOD": args.method,
+            "PASSWORD_HASH_WORKERS": workers,
+            "PASSWORD_HASH_QUEUE_SIZE": args.queue_size,
+            "CONTENT_INDEXING": False,
+            "UPLOAD_SESSION_GC_INTERVAL": 0,
+        })
+        # Start every run with a fresh pool of the requested size
+        passwords.password_hasher = PasswordHasher()
+        with app.app_context():
+            stored_hash = hash_password("correct horse battery staple")
+        rate, latencies, rejected = run(app, args.clients, args.seconds, stored_hash)
+        print(f"{workers:>8} {rate:>10.1f} {percentile(latencies, 0.5) * 1000:>8.1f} "
+              f"{percentile(latencies, 0.99) * 1000:>8.1f} {rejected:>9}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Micro-benchmark for list response serialization
+
+Compares marshmallow schemas + jsonify, Model.to_dict() + jsonify and the
+compiled serializers + dumps_json on pages of transient model objects, and
+checks that the compiled output matches marshmallow exactly. No database is
+needed:
+
+    python benchmarks/serialization.py [--pages 10,100,1000] [--repeat 5]
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from app import create_app
+from app.models import Document, Folder, User
+from app.schemas import DocumentSchema, FolderSchema, UserSchema
+from app.utils.serializers import compile_schema, dumps_json, orjson
+
+def make_documents(count):
+    now = datetime(2024, 1, 1)
+    return [
+        Document(
+            id=i, title=f"Quarterly report {i}", description="Lorem ipsum dolor sit amet " * 8,
+            file_path=f"/srv/uploads/ab/cd/{i:064x}.pdf", file_url=f"/api/documents/{i:064x}/download",
+            file_type="application/pdf", file_size=1024 * i, tags=["finance", "q3", f"tag{i % 7}"],
+            folder_id=i % 10, created_at=now + timedelta(minutes=i), updated_at=now + timedelta(hours=i),
+            created_by=1
+        )
+        for i in range(count)
+    ]
+
+def make_folders(count):
+    now = datetime(2024, 1, 1)
+    return [
+        Folder(id=i, name=f"Folder {i}", type="team" if i % 2 else "private",
+               created_at=now, updated_at=now, created_by=1)
+        for i in range(count)
+    ]
+
+def make_users(count):
+    now = datetime(2024, 1, 1)
+    return [
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", first_name="Ada", last_name="Lovelace",
+             role="user", created_at=now, updated_at=now)
+        for i in range(count)
+    ]
+
+CASES = [
+    ("Document", make_documents, DocumentSchema),
+    ("Folder", make_folders, FolderSchema),
+    ("User", make_users, UserSchema),
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="10,100,1000", help="Comma-separated page sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions (best is reported)")
+    args = parser.parse_args()
+    page_sizes = [int(size) for size in args.pages.split(",")]
+    
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "postgresql://localhost/unused"})
+    with app.app_context():
+        print(f"JSON encoder: {'orjson' if orjson else 'json (stdlib)'}")
+        print(f"{'model':<10}{'page':>6}{'marshmallow':>14}{'to_dict':>12}{'compiled':>12}{'speedup':>10}")
+        
+        for name, factory, schema_class in CASES:
+            schema = schema_class(many=True)
+            serializer = compile_schema(schema_class)
+            
+            for size in page_sizes:
+                objs = factory(size)
+                
+                # The compiled serializer must not change a single value
+                expected = schema.dump(objs)
+                assert serializer.dump_many(objs) == expected, f"{name} output differs from marshmallow"
+                assert json.loads(dumps_json({"items": serializer.dump_many(objs)})) == \
+                    json.loads(app.json.dumps({"items": expected}))
+                
+                number = max(1, 20000 // size)
+                timings = {
+                    "marshmallow": lambda: app.json.dumps({"items": schema.dump(objs)}),
+                    "to_dict": lambda: app.json.dumps({"items": [obj.to_dict() for obj in objs]}),
+                    "compiled": lambda: dumps_json({"items": serializer.dump_many(objs)}),
+                }
+                results = {
+                    label: min(timeit.repeat(fn, number=number, repeat=args.repeat)) / number
+                    for label, fn in timings.items()
+                    if label != "to_dict" or hasattr(objs[0], "to_dict")
+                }
+                
+                to_dict = f"{results['to_dict'] * 1000:>10.3f}ms" if "to_dict" in results else f"{'-':>12}"
+                print(
+                    f"{name:<10}{size:>6}{results['marshmallow'] * 1000:>12.3f}ms{to_dict}"
+                    f"{results['compiled'] * 1000:>10.3f}ms{results['marshmallow'] / results['compiled']:>9.1f}x"
+                )
+
+if __name__ == "__main__":
+    main()
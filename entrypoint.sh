@@ -3,9 +3,13 @@
 # Set default port if not provided
 PORT=${PORT:-8000}
 
+# Threaded workers, so requests waiting on password hashing or I/O don't block the process
+WEB_CONCURRENCY=${WEB_CONCURRENCY:-2}
+GUNICORN_THREADS=${GUNICORN_THREADS:-8}
+
 if [ "$FLASK_ENV" = "production" ]; then
   echo "Running in production mode on port $PORT"
-  gunicorn --bind 0.0.0.0:$PORT "app:create_app()"
+  gunicorn --bind 0.0.0.0:$PORT --worker-class gthread --workers $WEB_CONCURRENCY --threads $GUNICORN_THREADS "app:create_app()"
 else
   echo "Running in development mode on port $PORT"
   flask run --host=0.0.0.0 --port=$PORT
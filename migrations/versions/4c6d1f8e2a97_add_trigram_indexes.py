@@ -0,0 +1,55 @@
+"""add trigram indexes
+
+Revision ID: 4c6d1f8e2a97
+Revises: e2c84f17ab35
+Create Date: 2026-10-17 17:20:09.118342
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4c6d1f8e2a97'
+down_revision = 'e2c84f17ab35'
+branch_labels = None
+depends_on = None
+
+# (table, index name, column); built without blocking writes to the tables
+INDEXES = [
+    ('documents', 'ix_documents_title_trgm', 'title'),
+    ('documents', 'ix_documents_description_trgm', 'description'),
+    ('users', 'ix_users_username_trgm', 'username'),
+    ('users', 'ix_users_email_trgm', 'email'),
+]
+
+
+def drop_invalid_index(name):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+                WHERE pg_class.relname = '{name}' AND NOT pg_index.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {name}';
+            END IF;
+        END $$
+    """)
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, name, column in INDEXES:
+            drop_invalid_index(name)
+            op.create_index(name, table, [column], unique=False, postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'}, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for table, name, column in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,43 @@
+"""add document tags index
+
+Revision ID: 8a5f3c2d9e61
+Revises: 4c6d1f8e2a97
+Create Date: 2026-10-17 18:02:44.690215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a5f3c2d9e61'
+down_revision = '4c6d1f8e2a97'
+branch_labels = None
+depends_on = None
+
+
+def drop_invalid_index(name):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+                WHERE pg_class.relname = '{name}' AND NOT pg_index.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {name}';
+            END IF;
+        END $$
+    """)
+
+
+def upgrade():
+    # CONCURRENTLY can't run inside a transaction, and keeps documents writable while the index builds
+    with op.get_context().autocommit_block():
+        drop_invalid_index('ix_documents_tags')
+        op.create_index('ix_documents_tags', 'documents', ['tags'], unique=False, postgresql_using='gin', postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_documents_tags', table_name='documents', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,76 @@
+"""add document content pending flag
+
+Revision ID: a9d4e2f71b86
+Revises: f3b8d62a1c49
+Create Date: 2026-10-20 14:06:51.830442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d4e2f71b86'
+down_revision = 'f3b8d62a1c49'
+branch_labels = None
+depends_on = None
+
+# Rows backfilled per transaction
+BATCH_SIZE = 5000
+
+
+def drop_invalid_index(name):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+                WHERE pg_class.relname = '{name}' AND NOT pg_index.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {name}';
+            END IF;
+        END $$
+    """)
+
+
+def upgrade():
+    # Adding the column with a constant default doesn't rewrite the table;
+    # new documents are pending from here on
+    op.add_column('documents', sa.Column('content_pending', sa.Boolean(), server_default=sa.false(), nullable=False))
+    op.alter_column('documents', 'content_pending', server_default=sa.true(), existing_type=sa.Boolean(), existing_nullable=False)
+
+    # Flag existing documents without text extracted from their current file
+    backfill = """
+        UPDATE documents SET content_pending = true
+        WHERE NOT content_pending AND NOT EXISTS (
+            SELECT 1 FROM document_contents
+            WHERE document_contents.document_id = documents.id
+            AND document_contents.content_hash = split_part(regexp_replace(documents.file_path, '^.*/', ''), '.', 1)
+        )
+    """
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            op.execute(backfill)
+        else:
+            connection = op.get_bind()
+            max_id = connection.execute(sa.text("SELECT max(id) FROM documents")).scalar() or 0
+            for start in range(0, max_id, BATCH_SIZE):
+                connection.execute(
+                    sa.text(f"{backfill} AND id > :start AND id <= :end"),
+                    {"start": start, "end": start + BATCH_SIZE}
+                )
+
+        drop_invalid_index('ix_documents_content_pending')
+        op.create_index('ix_documents_content_pending', 'documents', ['id'], unique=False, postgresql_where=sa.text('content_pending'), postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_documents_content_pending', table_name='documents', postgresql_concurrently=True, if_exists=True)
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('content_pending')
+
+    # ### end Alembic commands ###
@@ -0,0 +1,81 @@
+"""add hot path indexes
+
+Revision ID: c3e8a1f4b6d2
+Revises: 5f1a9c7e3b20
+Create Date: 2026-10-17 22:14:05.390128
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3e8a1f4b6d2'
+down_revision = '5f1a9c7e3b20'
+branch_labels = None
+depends_on = None
+
+# (table, index name, columns); built without blocking writes to the tables
+INDEXES = [
+    ('documents', 'ix_documents_folder_id_id', ['folder_id', 'id']),
+    ('documents', 'ix_documents_created_by', ['created_by']),
+    ('documents', 'ix_documents_created_at_id', ['created_at', 'id']),
+    ('documents', 'ix_documents_updated_at_id', ['updated_at', 'id']),
+    ('folders', 'ix_folders_created_by', ['created_by']),
+    ('folder_permissions', 'ix_folder_permissions_user_id_folder_id', ['user_id', 'folder_id']),
+]
+
+UNIQUE_NAME = 'uq_folder_permissions_folder_id_user_id'
+
+
+def drop_invalid_index(name):
+    # A failed CREATE INDEX CONCURRENTLY leaves an invalid index behind
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid
+                WHERE pg_class.relname = '{name}' AND NOT pg_index.indisvalid
+            ) THEN
+                EXECUTE 'DROP INDEX {name}';
+            END IF;
+        END $$
+    """)
+
+
+def upgrade():
+    # Keep the strongest of any duplicate grants so the unique index can be built
+    op.execute("""
+        DELETE FROM folder_permissions
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (
+                    PARTITION BY folder_id, user_id
+                    ORDER BY CASE permission_type WHEN 'admin' THEN 3 WHEN 'write' THEN 2 ELSE 1 END DESC, id
+                ) AS position
+                FROM folder_permissions
+            ) AS ranked
+            WHERE position > 1
+        )
+    """)
+
+    # CONCURRENTLY can't run inside a transaction
+    with op.get_context().autocommit_block():
+        for table, name, columns in INDEXES:
+            drop_invalid_index(name)
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+        drop_invalid_index(UNIQUE_NAME)
+        op.create_index(UNIQUE_NAME, 'folder_permissions', ['folder_id', 'user_id'], unique=True, postgresql_concurrently=True, if_not_exists=True)
+
+    # Promoting the prebuilt index only takes a brief lock
+    op.execute(f"ALTER TABLE folder_permissions ADD CONSTRAINT {UNIQUE_NAME} UNIQUE USING INDEX {UNIQUE_NAME}")
+
+
+def downgrade():
+    with op.batch_alter_table('folder_permissions', schema=None) as batch_op:
+        batch_op.drop_constraint(UNIQUE_NAME, type_='unique')
+
+    with op.get_context().autocommit_block():
+        for table, name, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,80 @@
+"""widen document file size
+
+Changing the column type in place would rewrite documents and all of its
+indexes under an ACCESS EXCLUSIVE lock. Instead a bigint copy is added,
+kept in sync by a trigger while it is backfilled in batches, and swapped
+in with only brief locks. The downgrade does rewrite the table.
+
+Revision ID: e71b9a4d2c58
+Revises: c3e8a1f4b6d2
+Create Date: 2026-10-18 09:12:44.207315
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e71b9a4d2c58'
+down_revision = 'c3e8a1f4b6d2'
+branch_labels = None
+depends_on = None
+
+# Rows backfilled per transaction
+BATCH_SIZE = 5000
+
+NOT_NULL_CHECK = 'ck_documents_file_size_bigint_not_null'
+
+
+def upgrade():
+    op.add_column('documents', sa.Column('file_size_bigint', sa.BigInteger(), nullable=True))
+    op.execute("""
+        CREATE FUNCTION documents_file_size_bigint_update() RETURNS trigger AS $$
+        BEGIN
+            NEW.file_size_bigint := NEW.file_size;
+            RETURN NEW;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER documents_file_size_bigint_trigger
+        BEFORE INSERT OR UPDATE OF file_size ON documents
+        FOR EACH ROW EXECUTE FUNCTION documents_file_size_bigint_update()
+    """)
+
+    # Copy existing rows outside the migration transaction, so documents stay writable
+    backfill = "UPDATE documents SET file_size_bigint = file_size WHERE file_size_bigint IS NULL"
+    with op.get_context().autocommit_block():
+        if op.get_context().as_sql:
+            op.execute(backfill)
+        else:
+            connection = op.get_bind()
+            max_id = connection.execute(sa.text("SELECT max(id) FROM documents")).scalar() or 0
+            for start in range(0, max_id, BATCH_SIZE):
+                connection.execute(
+                    sa.text(f"{backfill} AND id > :start AND id <= :end"),
+                    {"start": start, "end": start + BATCH_SIZE}
+                )
+
+        # Validating a NOT VALID check only takes a lock that allows writes
+        op.execute(f"ALTER TABLE documents ADD CONSTRAINT {NOT_NULL_CHECK} CHECK (file_size_bigint IS NOT NULL) NOT VALID")
+        op.execute(f"ALTER TABLE documents VALIDATE CONSTRAINT {NOT_NULL_CHECK}")
+
+    # SET NOT NULL uses the validated check instead of scanning the table
+    op.alter_column('documents', 'file_size_bigint', existing_type=sa.BigInteger(), nullable=False)
+    op.drop_constraint(NOT_NULL_CHECK, 'documents', type_='check')
+    op.execute("DROP TRIGGER documents_file_size_bigint_trigger ON documents")
+    op.execute("DROP FUNCTION documents_file_size_bigint_update()")
+    op.drop_column('documents', 'file_size')
+    op.alter_column('documents', 'file_size_bigint', new_column_name='file_size', existing_type=sa.BigInteger(), existing_nullable=False)
+
+
+def downgrade():
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.alter_column('file_size',
+               existing_type=sa.BigInteger(),
+               type_=sa.INTEGER(),
+               existing_nullable=False)
+
+    # ### end Alembic commands ###
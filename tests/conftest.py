@@ -0,0 +1,103 @@
+import io
+import os
+import shutil
+import pytest
+from app import create_app, db
+from app.models.user import User
+from app.utils.auth import generate_token
+
+# The tests need a disposable Postgres database, e.g.
+# TEST_DATABASE_URL=postgresql://postgres@localhost/dataroom_test
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+@pytest.fixture(scope="session")
+def app(tmp_path_factory):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": TEST_DATABASE_URL,
+        "SECRET_KEY": "test-secret",
+        "JWT_SECRET_KEY": "test-jwt-secret",
+        "UPLOAD_FOLDER": str(tmp_path_factory.mktemp("uploads")),
+        "TESTING": True,
+        # Per-process caches would outlive the rows truncated between tests
+        "AUTH_CACHE_TTL": 0,
+        "PERMISSION_CACHE_TTL": 0,
+        "COUNT_CACHE_TTL": 0
+    })
+    
+    with app.app_context():
+        try:
+            db.session.execute(db.text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            db.session.commit()
+        except Exception:
+            # Trigram indexes only speed up search, which these tests don't cover
+            db.session.rollback()
+            for table in db.metadata.tables.values():
+                for index in list(table.indexes):
+                    if "gin_trgm_ops" in str(index.dialect_options["postgresql"].get("ops") or ""):
+                        table.indexes.discard(index)
+        db.drop_all()
+        db.create_all()
+    
+    yield app
+    
+    with app.app_context():
+        db.drop_all()
+
+@pytest.fixture(autouse=True)
+def clean_state(app):
+    """Empty every table and the upload folder before each test"""
+    with app.app_context():
+        tables = ", ".join(table.name for table in db.metadata.sorted_tables)
+        db.session.execute(db.text(f"TRUNCATE {tables} RESTART IDENTITY CASCADE"))
+        db.session.commit()
+    
+    upload_folder = app.config["UPLOAD_FOLDER"]
+    shutil.rmtree(upload_folder, ignore_errors=True)
+    os.makedirs(upload_folder)
+    yield
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def users(app):
+    """Create an admin and two regular users and return their ids and auth headers"""
+    with app.app_context():
+        created = {}
+        for username, role in (("admin", "admin"), ("alice", "user"), ("bob", "user")):
+            user = User(username=username, email=f"{username}@example.com", role=role)
+            user.password = "secret123"
+            db.session.add(user)
+            created[username] = user
+        db.session.commit()
+        
+        return {
+            username: {
+                "id": user.id,
+                "headers": {"Authorization": f"Bearer {generate_token(user.id, user.token_version)}"}
+            }
+            for username, user in created.items()
+        }
+
+@pytest.fixture
+def upload(client):
+    """Return a helper that uploads a document and returns the response"""
+    def upload(headers, content=b"hello world", filename="hello.txt", title="Hello", **form):
+        data = {"title": title, "file": (io.BytesIO(content), filename), **form}
+        return client.post("/api/documents", data=data, headers=headers, content_type="multipart/form-data")
+    return upload
+
+@pytest.fixture
+def stored_files(app):
+    """Return a helper listing every file under the upload folder"""
+    def stored_files():
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(app.config["UPLOAD_FOLDER"])
+            for name in names
+        )
+    return stored_files
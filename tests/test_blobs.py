@@ -0,0 +1,86 @@
+import io
+from app.models.blob import Blob
+from app.models.document import Document
+
+def get_blobs(app):
+    with app.app_context():
+        return {blob.sha256: (blob.ref_count, blob.file_path) for blob in Blob.query.all()}
+
+def test_identical_uploads_share_one_blob(app, users, upload, stored_files):
+    first = upload(users["alice"]["headers"], b"same content")
+    second = upload(users["bob"]["headers"], b"same content")
+    assert first.status_code == 201
+    assert second.status_code == 201
+    
+    blobs = get_blobs(app)
+    assert len(blobs) == 1
+    ref_count, file_path = next(iter(blobs.values()))
+    assert ref_count == 2
+    assert stored_files() == [file_path]
+    assert first.json["document"]["file_path"] == second.json["document"]["file_path"] == file_path
+
+def test_deleting_documents_releases_the_blob(app, client, users, upload, stored_files):
+    headers = users["alice"]["headers"]
+    first = upload(headers, b"shared bytes").json["document"]["id"]
+    second = upload(headers, b"shared bytes").json["document"]["id"]
+    
+    assert client.delete(f"/api/documents/{first}", headers=headers).status_code == 200
+    blobs = get_blobs(app)
+    assert [ref_count for ref_count, _ in blobs.values()] == [1]
+    assert len(stored_files()) == 1
+    
+    assert client.delete(f"/api/documents/{second}", headers=headers).status_code == 200
+    assert get_blobs(app) == {}
+    assert stored_files() == []
+
+def test_failed_delete_keeps_the_file(app, client, users, upload, stored_files):
+    headers = users["alice"]["headers"]
+    document_id = upload(headers, b"kept bytes").json["document"]["id"]
+    
+    # Another user may not delete the document, so nothing is released
+    assert client.delete(f"/api/documents/{document_id}", headers=users["bob"]["headers"]).status_code == 403
+    assert [ref_count for ref_count, _ in get_blobs(app).values()] == [1]
+    assert len(stored_files()) == 1
+
+def test_rolled_back_upload_leaves_no_file(app, users, upload, stored_files):
+    # The folder does not exist, so the insert fails after the file is placed
+    response = upload(users["alice"]["headers"], b"orphan bytes", folder_id="9999")
+    assert response.status_code == 500
+    assert get_blobs(app) == {}
+    assert stored_files() == []
+
+def test_rolled_back_upload_keeps_an_existing_blob(app, users, upload, stored_files):
+    headers = users["alice"]["headers"]
+    upload(headers, b"existing bytes")
+    
+    response = upload(headers, b"existing bytes", folder_id="9999")
+    assert response.status_code == 500
+    assert [ref_count for ref_count, _ in get_blobs(app).values()] == [1]
+    assert len(stored_files()) == 1
+
+def test_deleting_a_user_releases_their_blobs(app, client, users, upload, stored_files):
+    upload(users["alice"]["headers"], b"alice only")
+    upload(users["alice"]["headers"], b"alice and bob")
+    upload(users["bob"]["headers"], b"alice and bob")
+    
+    response = client.delete(f"/api/users/{users['alice']['id']}", headers=users["admin"]["headers"])
+    assert response.status_code == 200
+    
+    blobs = get_blobs(app)
+    assert [ref_count for ref_count, _ in blobs.values()] == [1]
+    assert stored_files() == [file_path for _, file_path in blobs.values()]
+    with app.app_context():
+        assert Document.query.count() == 1
+
+def test_batch_upload_counts_every_reference(app, client, users, stored_files):
+    response = client.post(
+        "/api/documents/batch",
+        data={"files": [(io.BytesIO(b"batch bytes"), "a.txt"), (io.BytesIO(b"batch bytes"), "b.txt")]},
+        headers=users["alice"]["headers"],
+        content_type="multipart/form-data"
+    )
+    assert response.status_code == 201
+    
+    blobs = get_blobs(app)
+    assert [ref_count for ref_count, _ in blobs.values()] == [2]
+    assert len(stored_files()) == 1
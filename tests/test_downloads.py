@@ -0,0 +1,137 @@
+import pytest
+from app import db
+from app.models.document import Document
+
+CONTENT = b"0123456789abcdefghij"
+
+@pytest.fixture
+def document(users, upload):
+    response = upload(users["alice"]["headers"], CONTENT, filename="digits.bin")
+    assert response.status_code == 201
+    return response.json["document"]
+
+def download(client, users, document, method="GET", **headers):
+    return client.open(
+        f"/api/documents/{document['id']}/download",
+        method=method,
+        headers={**users["alice"]["headers"], **headers}
+    )
+
+def test_full_download_has_validators(client, users, document):
+    response = download(client, users, document)
+    assert response.status_code == 200
+    assert response.data == CONTENT
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+    assert response.headers["Content-Length"] == str(len(CONTENT))
+
+def test_single_range(client, users, document):
+    response = download(client, users, document, Range="bytes=2-5")
+    assert response.status_code == 206
+    assert response.data == CONTENT[2:6]
+    assert response.headers["Content-Range"] == f"bytes 2-5/{len(CONTENT)}"
+    assert response.headers["Content-Length"] == "4"
+
+def test_suffix_and_open_ranges(client, users, document):
+    response = download(client, users, document, Range="bytes=-3")
+    assert response.status_code == 206
+    assert response.data == CONTENT[-3:]
+    
+    response = download(client, users, document, Range="bytes=15-")
+    assert response.status_code == 206
+    assert response.data == CONTENT[15:]
+    
+    # A range running past the end is cut at the last byte
+    response = download(client, users, document, Range="bytes=18-100")
+    assert response.status_code == 206
+    assert response.data == CONTENT[18:]
+    assert response.headers["Content-Range"] == f"bytes 18-19/{len(CONTENT)}"
+
+def test_multiple_ranges(client, users, document):
+    response = download(client, users, document, Range="bytes=0-1,10-11")
+    assert response.status_code == 206
+    assert response.mimetype == "multipart/byteranges"
+    body = response.data.decode("latin-1")
+    assert f"Content-Range: bytes 0-1/{len(CONTENT)}\r\n\r\n01\r\n" in body
+    assert f"Content-Range: bytes 10-11/{len(CONTENT)}\r\n\r\nab\r\n" in body
+    assert body.endswith(f"--{response.mimetype_params['boundary']}--\r\n")
+
+def test_unsatisfiable_range(client, users, document):
+    response = download(client, users, document, Range="bytes=100-200")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(CONTENT)}"
+    assert response.data == b""
+
+def test_if_none_match(client, users, document):
+    etag = download(client, users, document).headers["ETag"]
+    
+    response = download(client, users, document, **{"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    
+    response = download(client, users, document, **{"If-None-Match": '"something-else"'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+def test_if_modified_since(client, users, document):
+    last_modified = download(client, users, document).headers["Last-Modified"]
+    response = download(client, users, document, **{"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+def test_if_range(client, users, document):
+    etag = download(client, users, document).headers["ETag"]
+    
+    response = download(client, users, document, Range="bytes=0-3", **{"If-Range": etag})
+    assert response.status_code == 206
+    assert response.data == CONTENT[:4]
+    
+    # A changed file must be sent whole rather than patched into the old copy
+    response = download(client, users, document, Range="bytes=0-3", **{"If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.data == CONTENT
+
+def test_head(client, users, document):
+    response = download(client, users, document, method="HEAD")
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers["Content-Length"] == str(len(CONTENT))
+    assert response.headers["ETag"]
+
+@pytest.mark.parametrize("mode, header", [("x-accel-redirect", "X-Accel-Redirect"), ("x-sendfile", "X-Sendfile")])
+def test_offload_to_proxy(app, client, users, document, monkeypatch, mode, header):
+    monkeypatch.setitem(app.config, "DOWNLOAD_OFFLOAD", mode)
+    response = download(client, users, document)
+    assert response.status_code == 200
+    assert response.data == b""
+    assert response.headers[header].endswith(document["file_path"].rsplit("/", 1)[1])
+
+def test_files_outside_upload_folder_are_not_offloaded(app, client, users, document, monkeypatch, tmp_path):
+    outside = tmp_path / "outside.bin"
+    outside.write_bytes(CONTENT)
+    with app.app_context():
+        db.session.get(Document, document["id"]).file_path = str(outside)
+        db.session.commit()
+    
+    for mode in ("x-accel-redirect", "x-sendfile"):
+        monkeypatch.setitem(app.config, "DOWNLOAD_OFFLOAD", mode)
+        response = download(client, users, document)
+        assert response.status_code == 200
+        assert "X-Accel-Redirect" not in response.headers
+        assert "X-Sendfile" not in response.headers
+        assert response.data == CONTENT
+
+def test_compressed_file_is_decoded_for_plain_clients(app, client, users, upload, monkeypatch):
+    monkeypatch.setitem(app.config, "STORAGE_COMPRESSION", "gzip")
+    text = b"compressible text " * 200
+    document = upload(users["alice"]["headers"], text, filename="notes.txt").json["document"]
+    
+    response = download(client, users, document)
+    assert response.status_code == 200
+    assert response.data == text
+    assert "Content-Encoding" not in response.headers
+    
+    response = download(client, users, document, **{"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.data) < len(text)
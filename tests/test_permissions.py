@@ -0,0 +1,183 @@
+import pytest
+from app import db
+from app.models.document import Document
+from app.models.folder import EffectiveFolderAccess
+from app.models.user import User
+from app.utils.permissions import readable_document_ids, readable_folder_ids, refresh_folder_access
+
+@pytest.fixture
+def folder(client, users):
+    response = client.post("/api/folders", json={"name": "Deals", "type": "team"}, headers=users["alice"]["headers"])
+    assert response.status_code == 201
+    return response.json["folder"]
+
+@pytest.fixture
+def group(client, users):
+    response = client.post("/api/groups", json={"name": "Reviewers"}, headers=users["alice"]["headers"])
+    assert response.status_code == 201
+    return response.json["group"]
+
+def share(client, users, folder, group, permission_type="read"):
+    response = client.post(
+        f"/api/folders/{folder['id']}/groups",
+        json={"groupId": group["id"], "permissionType": permission_type},
+        headers=users["alice"]["headers"]
+    )
+    assert response.status_code == 200
+
+def add_member(client, users, group, username, role="member", as_user="alice"):
+    return client.post(
+        f"/api/groups/{group['id']}/members",
+        json={"userId": users[username]["id"], "role": role},
+        headers=users[as_user]["headers"]
+    )
+
+def folder_documents(client, users, folder, username):
+    return client.get(f"/api/folders/{folder['id']}/documents", headers=users[username]["headers"])
+
+def accessible_titles(client, users, username):
+    response = client.get("/api/documents?scope=accessible&pageSize=100", headers=users[username]["headers"])
+    assert response.status_code == 200
+    return sorted(item["title"] for item in response.json["items"])
+
+def access_rows(app):
+    with app.app_context():
+        return sorted(db.session.query(
+            EffectiveFolderAccess.user_id, EffectiveFolderAccess.folder_id, EffectiveFolderAccess.level
+        ).all())
+
+def assert_access_is_consistent(app):
+    """The incrementally maintained access rows must match a full rebuild"""
+    maintained = access_rows(app)
+    with app.app_context():
+        refresh_folder_access(db.session, everything=True)
+        db.session.commit()
+    assert maintained == access_rows(app)
+
+def test_folder_documents_need_a_grant(app, client, users, upload, folder):
+    upload(users["alice"]["headers"], b"in folder", title="Term sheet", folder_id=str(folder["id"]))
+    
+    assert folder_documents(client, users, folder, "alice").status_code == 200
+    assert folder_documents(client, users, folder, "admin").status_code == 200
+    assert folder_documents(client, users, folder, "bob").status_code == 403
+
+def test_group_grant_needs_membership(app, client, users, upload, folder, group):
+    upload(users["alice"]["headers"], b"in folder", title="Term sheet", folder_id=str(folder["id"]))
+    share(client, users, folder, group)
+    
+    # Sharing with a group bob is not in gives him nothing
+    assert folder_documents(client, users, folder, "bob").status_code == 403
+    assert accessible_titles(client, users, "bob") == []
+    
+    assert add_member(client, users, group, "bob").status_code == 201
+    response = folder_documents(client, users, folder, "bob")
+    assert response.status_code == 200
+    assert [item["title"] for item in response.json["documents"]] == ["Term sheet"]
+    assert accessible_titles(client, users, "bob") == ["Term sheet"]
+    assert_access_is_consistent(app)
+
+def test_removing_membership_revokes_access(app, client, users, upload, folder, group):
+    upload(users["alice"]["headers"], b"in folder", title="Term sheet", folder_id=str(folder["id"]))
+    share(client, users, folder, group)
+    add_member(client, users, group, "bob")
+    assert folder_documents(client, users, folder, "bob").status_code == 200
+    
+    response = client.delete(f"/api/groups/{group['id']}/members/{users['bob']['id']}", headers=users["alice"]["headers"])
+    assert response.status_code == 200
+    assert folder_documents(client, users, folder, "bob").status_code == 403
+    assert accessible_titles(client, users, "bob") == []
+    assert_access_is_consistent(app)
+
+def test_unsharing_and_deleting_the_group_revoke_access(app, client, users, upload, folder, group):
+    upload(users["alice"]["headers"], b"in folder", title="Term sheet", folder_id=str(folder["id"]))
+    share(client, users, folder, group)
+    add_member(client, users, group, "bob")
+    
+    response = client.delete(f"/api/folders/{folder['id']}/groups/{group['id']}", headers=users["alice"]["headers"])
+    assert response.status_code == 200
+    assert folder_documents(client, users, folder, "bob").status_code == 403
+    
+    share(client, users, folder, group)
+    assert folder_documents(client, users, folder, "bob").status_code == 200
+    
+    assert client.delete(f"/api/groups/{group['id']}", headers=users["alice"]["headers"]).status_code == 200
+    assert folder_documents(client, users, folder, "bob").status_code == 403
+    assert_access_is_consistent(app)
+
+def test_accessible_scope(app, client, users, upload, folder, group):
+    upload(users["alice"]["headers"], b"alice loose", title="Alice loose")
+    upload(users["alice"]["headers"], b"alice foldered", title="Alice foldered", folder_id=str(folder["id"]))
+    upload(users["bob"]["headers"], b"bob loose", title="Bob loose")
+    
+    assert accessible_titles(client, users, "alice") == ["Alice foldered", "Alice loose"]
+    assert accessible_titles(client, users, "bob") == ["Bob loose"]
+    assert accessible_titles(client, users, "admin") == ["Alice foldered", "Alice loose", "Bob loose"]
+    
+    share(client, users, folder, group)
+    add_member(client, users, group, "bob")
+    assert accessible_titles(client, users, "bob") == ["Alice foldered", "Bob loose"]
+
+def test_batch_checks_match_single_checks(app, client, users, upload, folder, group):
+    foldered = upload(users["alice"]["headers"], b"a", title="Foldered", folder_id=str(folder["id"])).json["document"]["id"]
+    loose = upload(users["alice"]["headers"], b"b", title="Loose").json["document"]["id"]
+    own = upload(users["bob"]["headers"], b"c", title="Own").json["document"]["id"]
+    
+    with app.app_context():
+        bob = db.session.get(User, users["bob"]["id"])
+        admin = db.session.get(User, users["admin"]["id"])
+        assert readable_document_ids(bob, [foldered, loose, own]) == {own}
+        assert readable_folder_ids(bob, [folder["id"]]) == set()
+        assert readable_document_ids(admin, [foldered, loose, own]) == {foldered, loose, own}
+    
+    share(client, users, folder, group)
+    add_member(client, users, group, "bob")
+    
+    with app.app_context():
+        bob = db.session.get(User, users["bob"]["id"])
+        assert readable_document_ids(bob, [foldered, loose, own]) == {foldered, own}
+        assert readable_folder_ids(bob, [folder["id"], folder["id"] + 1]) == {folder["id"]}
+
+def test_group_details_are_limited_to_members(client, users, group):
+    assert client.get(f"/api/groups/{group['id']}", headers=users["bob"]["headers"]).status_code == 403
+    assert client.get(f"/api/groups/{group['id']}", headers=users["admin"]["headers"]).status_code == 200
+    assert client.get("/api/groups", headers=users["bob"]["headers"]).json["groups"] == []
+    
+    add_member(client, users, group, "bob")
+    response = client.get(f"/api/groups/{group['id']}", headers=users["bob"]["headers"])
+    assert response.status_code == 200
+    assert sorted(member["userId"] for member in response.json["group"]["members"]) == sorted(
+        [users["alice"]["id"], users["bob"]["id"]]
+    )
+    assert [g["id"] for g in client.get("/api/groups", headers=users["bob"]["headers"]).json["groups"]] == [group["id"]]
+
+def test_only_managers_change_membership(client, users, group):
+    # Outsiders and plain members cannot add anyone
+    assert add_member(client, users, group, "bob", as_user="bob").status_code == 403
+    add_member(client, users, group, "bob")
+    assert add_member(client, users, group, "admin", as_user="bob").status_code == 403
+    response = client.delete(f"/api/groups/{group['id']}/members/{users['alice']['id']}", headers=users["bob"]["headers"])
+    assert response.status_code == 403
+    
+    # Managers can, and members may always leave
+    assert add_member(client, users, group, "bob", role="manager").status_code == 200
+    assert add_member(client, users, group, "admin", as_user="bob").status_code == 201
+    response = client.delete(f"/api/groups/{group['id']}/members/{users['bob']['id']}", headers=users["bob"]["headers"])
+    assert response.status_code == 200
+
+def test_only_the_owner_shares_a_folder(client, users, folder, group):
+    response = client.post(
+        f"/api/folders/{folder['id']}/groups",
+        json={"groupId": group["id"]},
+        headers=users["bob"]["headers"]
+    )
+    assert response.status_code == 403
+
+def test_deleting_the_folder_drops_its_access(app, client, users, folder, group):
+    share(client, users, folder, group)
+    add_member(client, users, group, "bob")
+    assert any(row[1] == folder["id"] for row in access_rows(app))
+    
+    assert client.delete(f"/api/folders/{folder['id']}", headers=users["alice"]["headers"]).status_code == 200
+    assert access_rows(app) == []
+    with app.app_context():
+        assert Document.query.count() == 0
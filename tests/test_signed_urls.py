@@ -0,0 +1,100 @@
+import time
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import pytest
+from app.utils import signed_urls
+
+CONTENT = b"signed download content"
+
+@pytest.fixture
+def document(users, upload):
+    response = upload(users["alice"]["headers"], CONTENT, filename="report.pdf", title="Report")
+    assert response.status_code == 201
+    return response.json["document"]
+
+def create_url(client, users, document, **data):
+    return client.post(
+        f"/api/documents/{document['id']}/download-url",
+        json=data,
+        headers=users["alice"]["headers"]
+    )
+
+def with_params(url, **changes):
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    params.update(changes)
+    return f"{parts.path}?{urlencode(params)}"
+
+def test_signed_url_downloads_without_a_token(client, users, document):
+    response = create_url(client, users, document, filename="custom name.pdf")
+    assert response.status_code == 201
+    
+    download = client.get(response.json["data"]["url"])
+    assert download.status_code == 200
+    assert download.data == CONTENT
+    assert 'filename="custom name.pdf"' in download.headers["Content-Disposition"]
+    assert download.headers["Cache-Control"].startswith("public, max-age=")
+
+@pytest.mark.parametrize("param, value", [
+    ("n", "other.pdf"),
+    ("t", "text/html"),
+    ("s", "5"),
+    ("m", "0"),
+    ("exp", "9999999999"),
+    ("v", "0" * 64),
+    ("sig", "A" * 43),
+])
+def test_tampered_url_is_rejected(client, users, document, param, value):
+    url = create_url(client, users, document).json["data"]["url"]
+    response = client.get(with_params(url, **{param: value}))
+    assert response.status_code == 403
+
+def test_url_for_another_document_is_rejected(client, users, document, upload):
+    other = upload(users["alice"]["headers"], b"other content", filename="other.pdf").json["document"]
+    url = create_url(client, users, document).json["data"]["url"]
+    response = client.get(url.replace(f"/documents/{document['id']}/", f"/documents/{other['id']}/"))
+    assert response.status_code == 403
+
+def test_missing_parameter_is_rejected(client, users, document):
+    url = create_url(client, users, document).json["data"]["url"]
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    del params["exp"]
+    response = client.get(f"{parts.path}?{urlencode(params)}")
+    assert response.status_code == 403
+
+def test_expired_url_is_rejected(client, users, document, monkeypatch):
+    url = create_url(client, users, document).json["data"]["url"]
+    expires_at = int(dict(parse_qsl(urlsplit(url).query))["exp"])
+    
+    monkeypatch.setattr(signed_urls, "time", SimpleNamespace(time=lambda: expires_at + 1))
+    assert client.get(url).status_code == 403
+    
+    monkeypatch.setattr(signed_urls, "time", SimpleNamespace(time=lambda: expires_at - 1))
+    assert client.get(url).status_code == 200
+
+def test_expiry_is_capped_by_the_ttl(app, client, users, document):
+    response = create_url(client, users, document, expiresIn=10 ** 9)
+    ttl = app.config.get("DOWNLOAD_URL_TTL", 300)
+    assert response.json["data"]["expiresAt"] <= time.time() + ttl + signed_urls.EXPIRY_GRANULARITY
+
+def test_storage_name_must_stay_in_the_upload_folder(app, client, document):
+    # Even a correctly signed URL must not reach outside the upload folder
+    with app.test_request_context():
+        params = {"v": "../secret", "n": "x", "t": "text/plain", "s": 1, "m": 0, "exp": int(time.time()) + 60}
+        params["sig"] = signed_urls._signature(document["id"], params)
+    response = client.get(f"/api/documents/{document['id']}/download?{urlencode(params)}")
+    assert response.status_code == 403
+
+@pytest.mark.parametrize("filename", ["bad\nname.pdf", "bad\rname.pdf", "bad\x00name.pdf", "tab\tname.pdf", 42])
+def test_invalid_filename_is_rejected(client, users, document, filename):
+    response = create_url(client, users, document, filename=filename)
+    assert response.status_code == 400
+
+def test_unicode_filename_is_allowed(client, users, document):
+    response = create_url(client, users, document, filename="Prüfbericht.pdf")
+    assert response.status_code == 201
+    
+    download = client.get(response.json["data"]["url"])
+    assert download.status_code == 200
+    assert "filename*=UTF-8''Pr%C3%BCfbericht.pdf" in download.headers["Content-Disposition"]